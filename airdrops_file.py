@@ -0,0 +1,126 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Binary format of processed airdrops, an alternative to the json list of [address, amount] pairs
+
+Layout (all integers big-endian):
+ - header: magic (8 bytes), version (2 bytes), reserved (2 bytes), number of records (8 bytes),
+   SHA256 of all the records (32 bytes)
+ - records: address (20 bytes), amount (32 bytes), one per airdrop, in the order of the json list
+"""
+
+import binascii
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+MAGIC = 'OMGDROP\x00'
+VERSION = 1
+HEADER = struct.Struct('>8sHHQ32s')
+ADDRESS_WIDTH = 20
+AMOUNT_WIDTH = 32
+RECORD_WIDTH = ADDRESS_WIDTH + AMOUNT_WIDTH
+
+
+class AirdropsFileException(Exception):
+    pass
+
+
+class AirdropsFile(object):
+    """
+    Read-only, memory-mapped view of a binary processed airdrops file.
+    Behaves like the list of [address, amount] pairs loaded from json, records are decoded only when accessed
+    """
+
+    def __init__(self, f, verify=True):
+        # checked before mapping, an empty file can't be mapped at all
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise AirdropsFileException("file too short for the header")
+
+        self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, checksum = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            raise AirdropsFileException("not a binary airdrops file")
+        if version != VERSION:
+            raise AirdropsFileException("unsupported binary airdrops file version {}".format(version))
+        if len(self.mmap) != HEADER.size + count * RECORD_WIDTH:
+            raise AirdropsFileException("file length doesn't match {} records".format(count))
+
+        self.count = count
+        self.checksum = checksum
+
+        if verify and hashlib.sha256(self.mmap[HEADER.size:]).digest() != checksum:
+            raise AirdropsFileException("checksum mismatch")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in xrange(*index.indices(self.count))]
+
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("airdrop index out of range")
+        return self._record(index)
+
+    def __iter__(self):
+        for index in xrange(self.count):
+            yield self._record(index)
+
+    def _record(self, index):
+        start = HEADER.size + index * RECORD_WIDTH
+        address = '0x' + binascii.hexlify(self.mmap[start:start + ADDRESS_WIDTH])
+        amount = int(binascii.hexlify(self.mmap[start + ADDRESS_WIDTH:start + RECORD_WIDTH]), 16)
+        return [address, amount]
+
+
+def write_airdrops(f, airdrops):
+    """
+    Writes airdrops in the binary format
+    :param f: file opened for binary writing
+    :param airdrops: iterable of address-amount pairs, addresses 0x-prefixed
+    """
+    records = bytearray()
+
+    for address, amount in airdrops:
+        if address[2:] != address[2:].lower():
+            # binary addresses don't carry capitalization, it wouldn't convert back to the same json
+            raise AirdropsFileException("address not lowercase {}".format(address))
+        raw_address = binascii.unhexlify(address[2:])
+        if len(raw_address) != ADDRESS_WIDTH or not 0 <= amount < 2 ** (8 * AMOUNT_WIDTH):
+            raise AirdropsFileException("airdrop doesn't fit a record {}".format([address, amount]))
+        records += raw_address
+        records += binascii.unhexlify('{:064x}'.format(amount))
+
+    f.write(HEADER.pack(MAGIC, VERSION, 0, len(records) // RECORD_WIDTH, hashlib.sha256(records).digest()))
+    f.write(records)
+
+
+def load_airdrops(f):
+    """
+    Loads processed airdrops from either a binary (memory-mapped) or a json file
+    :param f: file opened for binary reading
+    :return: AirdropsFile or list of address-amount pairs
+    """
+    magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return AirdropsFile(f)
+
+    return json.loads(magic + f.read())
@@ -0,0 +1,124 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import socket
+from itertools import chain
+from multiprocessing.pool import ThreadPool
+
+import requests
+
+
+class BatchRPCException(Exception):
+    pass
+
+
+class BatchRPC(object):
+    """
+    Minimal JSON-RPC client, which sends many requests per JSON-RPC batch payload
+    and keeps several payloads in flight at once. web3 doesn't support batching.
+    """
+
+    def __init__(self, endpoint, batch_size, concurrency, timeout=120):
+        """
+        :param endpoint: http(s) URI of the node, or path to its IPC socket
+        :param batch_size: how many requests to send in a single payload
+        :param concurrency: how many payloads to have in flight at once
+        """
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def request(self, method, params_list):
+        """
+        Calls `method` once for every item of `params_list`
+        :return: list of results, in the order of `params_list`
+        """
+        params_list = list(params_list)
+        payloads = [self._payload(method, params_list[start:start + self.batch_size], start)
+                    for start in xrange(0, len(params_list), self.batch_size)]
+
+        pool = ThreadPool(self.concurrency)
+        try:
+            results = pool.map(self._send, payloads, chunksize=1)
+        finally:
+            pool.terminate()
+
+        return list(chain.from_iterable(results))
+
+    def _payload(self, method, params_chunk, start_id):
+        return [dict(jsonrpc="2.0", id=start_id + offset, method=method, params=params)
+                for offset, params in enumerate(params_chunk)]
+
+    def _send(self, payload):
+        if self.endpoint.startswith('http://') or self.endpoint.startswith('https://'):
+            responses = self._send_http(payload)
+        else:
+            responses = self._send_ipc(payload)
+
+        if not isinstance(responses, list):
+            # a single error response is what nodes answer with, when the whole payload is bad
+            raise BatchRPCException("batch request failed: {}".format(responses))
+
+        by_id = {response.get('id'): response for response in responses}
+        results = []
+        for request in payload:
+            response = by_id.get(request['id'])
+            if response is None:
+                raise BatchRPCException("no response for {}".format(request))
+            if 'error' in response:
+                raise BatchRPCException("error for {}: {}".format(request, response['error']))
+            results.append(response['result'])
+
+        return results
+
+    def _send_http(self, payload):
+        response = requests.post(self.endpoint,
+                                 data=json.dumps(payload),
+                                 headers={'Content-Type': 'application/json'},
+                                 timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _send_ipc(self, payload):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.endpoint)
+            sock.sendall(json.dumps(payload))
+
+            decoder = json.JSONDecoder()
+            received = ''
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    raise BatchRPCException("IPC connection closed before a full response")
+                received += chunk
+                try:
+                    responses, _ = decoder.raw_decode(received.lstrip())
+                    return responses
+                except ValueError:
+                    continue
+        finally:
+            sock.close()
+
+
+def provider_endpoint(provider):
+    """
+    :return: endpoint of a web3 HTTP or IPC provider, to be given to BatchRPC
+    """
+    if hasattr(provider, 'endpoint_uri'):
+        return provider.endpoint_uri
+    return provider.ipc_path
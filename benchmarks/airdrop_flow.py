@@ -0,0 +1,77 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Times the entire flow, creating, signing and sending the transactions of random airdrops,
+against the in-process tester chain (see chain_backend.py), run from the repo root:
+
+    python -m benchmarks.airdrop_flow [--airdrops 900] [--window 1] [--packed-calldata]
+
+Requires `populus compile` for the Airdropper
+"""
+
+import logging
+import time
+
+import click
+from populus.wait import Wait
+
+from benchmarks.encode_multisend import synthetic_airdrops
+from chain_backend import connect
+from constants import BATCH_SIZE, PACKED_BATCH_SIZE, GAS_LIMIT, GAS_PRICE, GAS_RESERVE
+from utils import get_contracts, Creator, Signer, Sender
+
+
+@click.command()
+@click.option('--airdrops', 'count', default=10 * BATCH_SIZE, help='How many random airdrops to send')
+@click.option('--window', default=1, help='How many transactions to have waiting for receipts at once')
+@click.option('--packed-calldata', is_flag=True, help='Call multisendPacked instead of multisend')
+def airdrop_flow(count, window, packed_calldata):
+    # the per-transaction progress would drown the results
+    logging.disable(logging.INFO)
+
+    web3 = connect('tester')()
+    airdropper, omg_token = get_contracts(web3)
+
+    airdrops = synthetic_airdrops(count)
+    Wait(web3).for_receipt(omg_token.transact().mint(airdropper.address, sum(amount for _, amount in airdrops)))
+
+    creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                      packed=packed_calldata)
+    stages = []
+
+    started = time.time()
+    transactions = creator.create_txs(airdrops, PACKED_BATCH_SIZE if packed_calldata else BATCH_SIZE)
+    stages.append(("create_txs", time.time() - started))
+
+    started = time.time()
+    signed = Signer(web3).sign_transactions(transactions)
+    stages.append(("sign", time.time() - started))
+
+    started = time.time()
+    Sender(web3, window=window).send_transactions(signed, transactions)
+    stages.append(("send", time.time() - started))
+
+    for address, amount in airdrops[::max(1, count // 100)]:
+        assert omg_token.call().balanceOf(address) == amount
+
+    click.echo("{} airdrops in {} transactions, {} gas estimated".format(
+        count, len(transactions), sum(tx['gasEstimate'] for tx in transactions)))
+    for stage, seconds in stages:
+        click.echo("{:<12}{:.2f}s, {:.1f}ms per transaction".format(
+            stage + ':', seconds, 1000 * seconds / len(transactions)))
+
+
+if __name__ == '__main__':
+    airdrop_flow()
@@ -0,0 +1,78 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Compares MultisendEncoder with web3's encodeABI over the full list of airdrops, run from the repo root:
+
+    python -m benchmarks.encode_multisend [--processed-file data/processed.json]
+
+Requires `populus compile` for the Airdropper ABI
+"""
+
+import json
+import os
+import random
+import time
+
+import click
+from web3 import Web3
+
+from airdrops_file import load_airdrops
+from constants import BATCH_SIZE
+from encoding import MultisendEncoder
+
+ELIGIBLE_ACCOUNTS = 466508
+
+
+def synthetic_airdrops(count, total=None):
+    """
+    Random airdrops, in place of the real ones, the same for the same count
+    :param total: if given, all of the airdrops together fit in it
+    """
+    random.seed(count)
+    amount = (lambda: random.randint(1, total // count)) if total else (lambda: random.getrandbits(80))
+    return [['0x{:040x}'.format(random.getrandbits(160)), amount()] for _ in xrange(count)]
+
+
+@click.command()
+@click.option('--processed-file', type=click.File('rb'), default=None,
+              help='Processed airdrops, by default random airdrops of the same count are used')
+def encode_multisend(processed_file):
+    airdrops = load_airdrops(processed_file) if processed_file else synthetic_airdrops(ELIGIBLE_ACCOUNTS + 1)
+    batches = [zip(*airdrops[start:start + BATCH_SIZE]) for start in xrange(0, len(airdrops), BATCH_SIZE)]
+
+    with open(os.path.join("build", "contracts.json")) as f:
+        airdropper_abi = json.loads(f.read())['Airdropper']['abi']
+    Airdropper = Web3(None).eth.contract(abi=airdropper_abi)
+    token_address = '0x{:040x}'.format(random.getrandbits(160))
+
+    started = time.time()
+    web3_encoded = [Airdropper.encodeABI('multisend', args=(token_address, addresses, amounts))
+                    for addresses, amounts in batches]
+    web3_time = time.time() - started
+
+    started = time.time()
+    encoder = MultisendEncoder(token_address)
+    offline_encoded = [encoder.encode(addresses, amounts) for addresses, amounts in batches]
+    offline_time = time.time() - started
+
+    assert web3_encoded == offline_encoded
+
+    click.echo("{} airdrops in {} batches, identical calldata".format(len(airdrops), len(batches)))
+    click.echo("encodeABI:        {:.2f}s".format(web3_time))
+    click.echo("MultisendEncoder: {:.2f}s ({:.1f}x)".format(offline_time, web3_time / offline_time))
+
+
+if __name__ == '__main__':
+    encode_multisend()
@@ -0,0 +1,68 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Times filtering out sent airdrops at full airdrop scale, as in a failure late in the airdrop, run from the repo root:
+
+    python -m benchmarks.filter_sent [--processed-file data/processed.json] [--sent-fraction 0.99]
+
+The former list-based filtering is quadratic, it's timed on a sample and extrapolated
+"""
+
+import time
+
+import click
+
+from airdrops_file import load_airdrops
+from benchmarks.encode_multisend import ELIGIBLE_ACCOUNTS, synthetic_airdrops
+from utils import remove_sent_airdrops
+
+QUADRATIC_SAMPLE = 5000
+
+
+def list_filter(airdrops, sent_airdrops):
+    return filter(lambda airdrop: airdrop not in sent_airdrops, airdrops)
+
+
+@click.command()
+@click.option('--processed-file', type=click.File('rb'), default=None,
+              help='Processed airdrops, by default random airdrops of the same count are used')
+@click.option('--sent-fraction', default=0.99, help='Which part of the airdrops is already sent')
+def filter_sent(processed_file, sent_fraction):
+    airdrops = list(load_airdrops(processed_file)) if processed_file else synthetic_airdrops(ELIGIBLE_ACCOUNTS + 1)
+    sent_count = int(len(airdrops) * sent_fraction)
+    # like from Transfer logs, capitalization of addresses needn't match
+    sent_airdrops = [[address.upper().replace('0X', '0x'), amount] for address, amount in airdrops[:sent_count]]
+
+    started = time.time()
+    unsent = remove_sent_airdrops(airdrops, sent_airdrops)
+    multiset_time = time.time() - started
+
+    assert unsent == airdrops[sent_count:]
+
+    sample = airdrops[:QUADRATIC_SAMPLE]
+    sample_sent = [list(airdrop) for airdrop in sample[:int(len(sample) * sent_fraction)]]
+    started = time.time()
+    list_unsent = list_filter(sample, sample_sent)
+    list_time = (time.time() - started) * (1.0 * len(airdrops) / len(sample)) ** 2
+
+    assert list_unsent == remove_sent_airdrops(sample, sample_sent)
+
+    click.echo("{} airdrops, {} sent".format(len(airdrops), sent_count))
+    click.echo("list filter (extrapolated from {}): {:.0f}s".format(len(sample), list_time))
+    click.echo("remove_sent_airdrops:              {:.2f}s ({:.0f}x)".format(multiset_time, list_time / multiset_time))
+
+
+if __name__ == '__main__':
+    filter_sent()
@@ -0,0 +1,74 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Times building the Merkle tree of the airdrops at full airdrop scale and looking up claims, run from the repo root:
+
+    python -m benchmarks.merkle_tree [--processed-file data/processed.json] [--proof-file /tmp/proofs.bin]
+"""
+
+import os
+import random
+import resource
+import tempfile
+import time
+
+import click
+
+from airdrops_file import load_airdrops
+from benchmarks.encode_multisend import ELIGIBLE_ACCOUNTS, synthetic_airdrops
+from merkle import build_tree, leaf_hash, verify_proof, MerkleProofs
+
+LOOKUPS = 1000
+
+
+@click.command()
+@click.option('--processed-file', type=click.File('rb'), default=None,
+              help='Processed airdrops, by default random airdrops of the same count are used')
+@click.option('--proof-file', type=click.Path(dir_okay=False), default=None,
+              help='Where to build the tree, by default a temporary file, removed afterwards')
+def merkle_tree(processed_file, proof_file):
+    airdrops = load_airdrops(processed_file) if processed_file else synthetic_airdrops(ELIGIBLE_ACCOUNTS + 1)
+    path = proof_file or os.path.join(tempfile.mkdtemp(), 'proofs.bin')
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.time()
+    root = build_tree(airdrops, path)
+    build_time = time.time() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    random.seed(0)
+    addresses = [airdrops[random.randrange(len(airdrops))][0] for _ in xrange(LOOKUPS)]
+    with open(path, 'rb') as f:
+        proofs = MerkleProofs(f)
+        started = time.time()
+        claims = [claim for address in addresses for claim in proofs.claims(address)]
+        lookup_time = time.time() - started
+
+    for claim in claims:
+        proof = [node[2:].decode('hex') for node in claim['proof']]
+        assert verify_proof(leaf_hash(claim['index'], claim['account'], claim['amount']), proof, root)
+
+    click.echo("{} airdrops, root 0x{}".format(len(airdrops), root.encode('hex')))
+    click.echo("build_tree:   {:.2f}s, proof file {:.1f}MB, peak RSS grew by {:.1f}MB".format(
+        build_time, os.path.getsize(path) / 1e6, (rss_after - rss_before) / 1e3))
+    click.echo("claims:       {:.2f}ms per address, proofs of {} nodes".format(
+        1000 * lookup_time / LOOKUPS, len(claims[0]['proof'])))
+
+    if not proof_file:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    merkle_tree()
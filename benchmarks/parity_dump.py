@@ -0,0 +1,122 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Writes a synthetic Parity state dump, laid out like the dump at 3988888, including the brackets `process` canonicalizes,
+for the processing to be benchmarked without the real dump, run from the repo root:
+
+    python -m benchmarks.parity_dump [--accounts 10000] [--eligible 0.1] [--distribution pareto] data/synthetic.json
+
+The balances don't add up to the golden numbers of the real dump. What they add up to is printed as json,
+to be given to `processor.process_table` as total_eth and total_eth_above_cutoff, as benchmarks/pipeline.py does
+"""
+
+import json
+import random
+
+import click
+
+from constants import CUTOFF, DEAD
+
+DISTRIBUTIONS = ('pareto', 'lognormal', 'uniform')
+PARETO_ALPHA = 1.1  # heavy-tailed, a few accounts holding much of the eth, like in the real state
+EMPTY_FRACTION = 0.2  # of the non-eligible accounts, with a zero balance
+CONTRACT_FRACTION = 0.1  # of all accounts, with code and storage
+CONTRACT_CODE = "0x6060604052"
+
+
+def eligible_balance(distribution):
+    """
+    :return: random balance above CUTOFF, in wei
+    """
+    if distribution == 'pareto':
+        ether_tenths = random.paretovariate(PARETO_ALPHA)
+    elif distribution == 'lognormal':
+        ether_tenths = 1 + random.lognormvariate(0, 3)
+    elif distribution == 'uniform':
+        ether_tenths = random.uniform(1, 10000)
+    else:
+        raise ValueError("unknown distribution {}, expected one of {}".format(distribution, ', '.join(DISTRIBUTIONS)))
+    # down to the wei, so that ties are as rare as in the real state
+    return CUTOFF + int(CUTOFF * (ether_tenths - 1)) + random.getrandbits(32) + 1
+
+
+def non_eligible_balance():
+    """
+    :return: random balance of at most CUTOFF, in wei
+    """
+    if random.random() < EMPTY_FRACTION:
+        return 0
+    return random.randint(1, CUTOFF)
+
+
+def write_dump(f, accounts, eligible=0.1, distribution='pareto', seed=0):
+    """
+    Writes the dump, streaming, so any number of accounts fits in memory.
+    The first accounts are DEAD, eligible like in the real state, and one holding exactly CUTOFF,
+    the largest non-eligible balance `process_table` checks for. The rest are random
+    :param eligible: fraction of the accounts to hold more than CUTOFF
+    :return: dict with the number of accounts, of eligible accounts, and the totals of the balances,
+             total_eth and total_eth_above_cutoff, as `process_table` takes them
+    """
+    if accounts < 2:
+        raise ValueError("the dump needs at least DEAD and an account at the cutoff, {} accounts asked".format(accounts))
+
+    random.seed(seed)
+    totals = dict(accounts=accounts, eligible=0, total_eth=0, total_eth_above_cutoff=0)
+
+    f.write('{ "state": [\n')
+
+    for index in xrange(accounts):
+        if index == 0:
+            address, balance = DEAD, eligible_balance(distribution)
+        elif index == 1:
+            address, balance = '0x{:040x}'.format(random.getrandbits(160)), CUTOFF
+        elif random.random() < eligible:
+            address, balance = '0x{:040x}'.format(random.getrandbits(160)), eligible_balance(distribution)
+        else:
+            address, balance = '0x{:040x}'.format(random.getrandbits(160)), non_eligible_balance()
+
+        totals['total_eth'] += balance
+        if balance > CUTOFF:
+            totals['eligible'] += 1
+            totals['total_eth_above_cutoff'] += balance
+
+        # Parity writes a zero balance as a bare 0x
+        account = '"{}": {{"balance": "0x{}", "nonce": "0x{:x}"'.format(
+            address, '{:x}'.format(balance) if balance else '', random.randint(0, 100))
+        if random.random() < CONTRACT_FRACTION:
+            account += ', "code": "{}", "storage": {{"0x01": "0x{:x}"}}'.format(CONTRACT_CODE, random.getrandbits(64))
+
+        f.write((',\n' if index else '') + account + '}')
+
+    f.write('\n]}')
+
+    return totals
+
+
+@click.command()
+@click.option('--accounts', default=10000, help='How many accounts in the state')
+@click.option('--eligible', default=0.1, help='Fraction of the accounts holding more than the cutoff')
+@click.option('--distribution', type=click.Choice(DISTRIBUTIONS), default='pareto',
+              help='Distribution of the eligible balances')
+@click.option('--seed', default=0, help='Seed of the random balances and addresses')
+@click.argument('dump-file', type=click.File('wb'))
+def parity_dump(accounts, eligible, distribution, seed, dump_file):
+    totals = write_dump(dump_file, accounts, eligible, distribution, seed)
+    click.echo(json.dumps(totals, sort_keys=True))
+
+
+if __name__ == '__main__':
+    parity_dump()
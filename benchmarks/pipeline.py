@@ -0,0 +1,251 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Times and memory-profiles the whole pipeline on synthetic Parity dumps (see benchmarks/parity_dump.py)
+of every size given, writing the results as json, to track regressions. Run from the repo root:
+
+    python -m benchmarks.pipeline [--accounts 10000 --accounts 1000000 --accounts 10000000] [--output results.json]
+
+Per dump size, the stages are:
+ - generate: writing the dump
+ - process_file, process: processing the dump streamed, then loaded whole
+ - check_transactions: the auditor's `audits/phildaian/check_transactions.py`, run on a copy with its checklist
+   and its golden numbers taken from the synthetic dump instead of the real one
+ - create_txs, sign, send, recover_unsent_airdrops: Creator, Signer and Sender against the in-process tester chain
+   (see chain_backend.py), on the largest --chain-airdrops airdrops only, the chain being much slower than a node.
+   The last quarter of the transactions is left unsent, for recover_unsent_airdrops to find.
+   Requires `populus compile` for the Airdropper
+
+Every stage, or all the chain stages together, runs in a child process, forked from this small one,
+so that the peak RSS reported is the stage's own (that of the audit script for check_transactions)
+and a stage failing, e.g. running out of memory, is reported as its error, without stopping the others
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+import click
+from populus.wait import Wait
+
+from airdrops_file import load_airdrops
+from benchmarks.parity_dump import DISTRIBUTIONS, write_dump
+from chain_backend import connect
+from constants import BATCH_SIZE, CUTOFF, GAS_LIMIT, GAS_PRICE, GAS_RESERVE, TOTAL_ETH_ABOVE_CUTOFF
+from processor import load_balance_table, process, process_file
+from utils import get_contracts, Creator, Signer, Sender
+
+AUDIT_DIR = os.path.join("audits", "phildaian")
+AUDIT_REMAINDER = 240306  # the remainder to DEAD at 3988888, checked for by check_transactions.py
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1e3
+
+
+def _stage(stage, started, who=resource.RUSAGE_SELF, **extra):
+    return dict(extra, stage=stage, seconds=round(time.time() - started, 3), peak_rss_mb=_peak_rss_mb(who))
+
+
+def _in_child(stages, job, *args):
+    """
+    Runs the job in a forked child process
+    :param stages: names of the stages the job times, to report the error for if the child fails
+    :param job: returns a list of results of its stages, see `_stage`
+    :return: the job's results, or an error for every stage
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+
+    def _run():
+        try:
+            sender.send(job(*args))
+        except BaseException:
+            sender.send(traceback.format_exc().strip().splitlines()[-1])
+
+    child = multiprocessing.Process(target=_run)
+    child.start()
+    sender.close()
+    try:
+        results = receiver.recv()
+    except EOFError:
+        results = None
+    child.join()
+
+    if isinstance(results, list):
+        return results
+    error = results or "child process exited with {}".format(child.exitcode)
+    return [dict(stage=stage, error=error) for stage in stages]
+
+
+def _generate(dump_path, accounts, eligible, distribution):
+    started = time.time()
+    with open(dump_path, 'wb') as f:
+        totals = write_dump(f, accounts, eligible, distribution)
+    return [_stage('generate', started, totals=totals, dump_mb=os.path.getsize(dump_path) / 1e6)]
+
+
+def _process_file(dump_path, processed_path, totals):
+    started = time.time()
+    airdrops = process_file(dump_path, totals['total_eth'], totals['total_eth_above_cutoff'])
+    result = _stage('process_file', started, airdrops=len(airdrops))
+
+    with open(processed_path, 'wb') as f:
+        f.write(json.dumps(airdrops))
+    return [result]
+
+
+def _process(dump_path, totals):
+    started = time.time()
+    with open(dump_path, 'rb') as f:
+        airdrops = process(f.read(), totals['total_eth'], totals['total_eth_above_cutoff'])
+    return [_stage('process', started, airdrops=len(airdrops))]
+
+
+def _check_transactions(dump_path, processed_path, workdir, totals):
+    """
+    Runs the audit script, on a copy made to check the synthetic dump
+    """
+    audit_dir = os.path.join(workdir, "audit")
+    shutil.copytree(AUDIT_DIR, audit_dir)
+
+    # the checklist extract_checklist.py would write, eligible balances by address without 0x
+    table = load_balance_table(dump_path)
+    eligible, _ = table.partition(CUTOFF)
+    airdrops_owed = dict((table.address(i)[2:], table.balance(i)) for i in eligible)
+    with open(os.path.join(audit_dir, "parsed_dumps", "airdrop_data.py"), 'wb') as f:
+        f.write("airdrops_owed = " + str(airdrops_owed).replace(" ", ""))
+    airdrops_owed = table = eligible = None
+
+    with open(processed_path, 'rb') as f:
+        remainder = json.load(f)[-1][1]
+
+    script_path = os.path.join(audit_dir, "check_transactions.py")
+    with open(script_path, 'rb') as f:
+        script = f.read()
+    for golden, synthetic in [(TOTAL_ETH_ABOVE_CUTOFF, totals['total_eth_above_cutoff']), (AUDIT_REMAINDER, remainder)]:
+        if str(golden) not in script:
+            raise Exception("{} not found in {}, can't adapt it to the synthetic dump".format(golden, script_path))
+        script = script.replace(str(golden), str(synthetic))
+    with open(script_path, 'wb') as f:
+        f.write(script)
+
+    started = time.time()
+    with open(os.devnull, 'wb') as devnull:
+        # prints its verdict, which would end up in the results json
+        subprocess.check_call([sys.executable, script_path, os.path.abspath(processed_path)], cwd=audit_dir,
+                              stdout=devnull)
+    return [_stage('check_transactions', started, who=resource.RUSAGE_CHILDREN)]
+
+
+def _chain(processed_path, chain_airdrops):
+    with open(processed_path, 'rb') as f:
+        airdrops = load_airdrops(f)[:chain_airdrops]
+
+    web3 = connect('tester')()
+    airdropper, omg_token = get_contracts(web3)
+    Wait(web3).for_receipt(omg_token.transact().mint(airdropper.address, sum(amount for _, amount in airdrops)))
+    results = []
+
+    started = time.time()
+    creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE)
+    transactions = creator.create_txs(airdrops, BATCH_SIZE)
+    results.append(_stage('create_txs', started, airdrops=len(airdrops), transactions=len(transactions)))
+
+    started = time.time()
+    signed = Signer(web3).sign_transactions(transactions)
+    results.append(_stage('sign', started))
+
+    sent = max(1, len(signed) * 3 // 4)
+    started = time.time()
+    Sender(web3).send_transactions(signed[:sent], transactions[:sent])
+    results.append(_stage('send', started, transactions=sent))
+
+    started = time.time()
+    unsent = Sender(web3).recover_unsent_airdrops(airdrops, signed, airdropper, omg_token)
+    results.append(_stage('recover_unsent_airdrops', started, unsent=len(unsent)))
+
+    assert len(unsent) == sum(len(transaction['rawBatch']) for transaction in transactions[sent:])
+
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD']).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.command()
+@click.option('--accounts', type=int, multiple=True, help='Accounts in the dump, give several for several sizes. '
+                                                          'By default 10k, 1M and 10M')
+@click.option('--eligible', default=0.1, help='Fraction of the accounts holding more than the cutoff')
+@click.option('--distribution', type=click.Choice(DISTRIBUTIONS), default='pareto',
+              help='Distribution of the eligible balances')
+@click.option('--chain-airdrops', default=10 * BATCH_SIZE, help='How many airdrops to send on the chain')
+@click.option('--workdir', type=click.Path(file_okay=False), default=None,
+              help='Where to write the dumps and processed airdrops, by default a temporary directory, removed after')
+@click.option('--output', type=click.File('wb'), default='-', help='Where to write the results json')
+def pipeline(accounts, eligible, distribution, chain_airdrops, workdir, output):
+    # the per-transaction progress would drown the results
+    logging.disable(logging.INFO)
+
+    base_dir = workdir or tempfile.mkdtemp()
+    runs = []
+
+    for count in accounts or (10 ** 4, 10 ** 6, 10 ** 7):
+        run_dir = os.path.join(base_dir, str(count))
+        os.makedirs(run_dir)
+        dump_path = os.path.join(run_dir, "balances_airdrop.json")
+        processed_path = os.path.join(run_dir, "processed.json")
+
+        stages = _in_child(['generate'], _generate, dump_path, count, eligible, distribution)
+        totals = stages[0].get('totals')
+        if totals:
+            stages += _in_child(['process_file'], _process_file, dump_path, processed_path, totals)
+            stages += _in_child(['process'], _process, dump_path, totals)
+        if os.path.exists(processed_path):
+            stages += _in_child(['check_transactions'], _check_transactions, dump_path, processed_path, run_dir, totals)
+            stages += _in_child(['create_txs', 'sign', 'send', 'recover_unsent_airdrops'], _chain,
+                                processed_path, chain_airdrops)
+
+        for stage in stages:
+            click.echo("{} accounts, {}: {}".format(count, stage['stage'], stage.get('error') or
+                                                    "{seconds:.2f}s, peak RSS {peak_rss_mb:.0f}MB".format(**stage)),
+                       err=True)
+        runs.append(dict(accounts=count, stages=stages))
+
+        if not workdir:
+            shutil.rmtree(run_dir)
+
+    if not workdir:
+        os.rmdir(base_dir)
+
+    output.write(json.dumps(dict(commit=_commit(), python=platform.python_version(), platform=platform.platform(),
+                                 cpus=multiprocessing.cpu_count(), eligible=eligible, distribution=distribution,
+                                 chain_airdrops=chain_airdrops, runs=runs), indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    pipeline()
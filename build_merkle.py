@@ -0,0 +1,41 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import json
+
+import click
+
+from airdrops_file import load_airdrops
+from merkle import build_tree
+
+logging.basicConfig(level=logging.INFO)
+
+
+@click.command()
+@click.argument('processed-file', type=click.File('rb'))
+@click.argument('proof-file', type=click.Path(dir_okay=False))
+def build_merkle(processed_file, proof_file):
+    airdrops = load_airdrops(processed_file)
+
+    root = build_tree(airdrops, proof_file)
+
+    # what MerkleAirdrop is deployed with and needs to be funded with
+    click.echo(json.dumps(dict(root='0x' + root.encode('hex'),
+                               count=len(airdrops),
+                               total=sum(amount for _, amount in airdrops)), sort_keys=True))
+
+
+if __name__ == '__main__':
+    build_merkle()
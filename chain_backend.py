@@ -0,0 +1,132 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Chains to run the airdrop against: a geth node over IPC, e.g. the dev mode node used by the tests,
+or an in-process pyethereum chain (eth-testrpc), which mines every transaction instantly and needs no node at all.
+
+The in-process chain lacks a few methods the airdrop relies on, `TesterProvider` fills them in:
+ - eth_signTransaction, signing with the keys of the chain's accounts, like a node does with its unlocked accounts
+ - eth_newBlockFilter, with eth_getFilterChanges returning hashes of blocks mined since the last poll
+ - eth_getLogs, via a log filter
+ - personal_unlockAccount, succeeding for the chain's accounts, which are always unlocked
+and eth_sendRawTransaction returns the hash of a failing transaction, mined using up its gas like on a node,
+instead of raising
+"""
+
+import binascii
+import itertools
+import threading
+
+import rlp
+from ethereum import tester
+from ethereum.transactions import Transaction
+from web3 import Web3, IPCProvider
+from web3.providers.tester import EthereumTesterProvider
+
+GETH_IPC_PATH = "/tmp/ethereum_dev_mode/geth.ipc"
+BACKENDS = ('geth', 'tester')
+
+
+class ChainBackendException(Exception):
+    pass
+
+
+class TesterProvider(EthereumTesterProvider):
+    """
+    In-process chain, requests are served one at a time, so that connections can be shared between threads
+    """
+
+    def __init__(self):
+        super(TesterProvider, self).__init__()
+        self.lock = threading.RLock()
+        self.keys = {'0x' + binascii.hexlify(address): key for address, key in zip(tester.accounts, tester.keys)}
+        self.block_filters = {}  # filter id -> number of the last block returned
+        self.block_filter_ids = itertools.count()
+
+    def make_request(self, method, params):
+        with self.lock:
+            if method == 'eth_signTransaction':
+                return dict(result=self._sign_transaction(*params))
+            if method == 'eth_newBlockFilter':
+                return dict(result=self._new_block_filter())
+            if method == 'eth_getFilterChanges' and params[0] in self.block_filters:
+                return dict(result=self._block_filter_changes(params[0]))
+            if method == 'eth_uninstallFilter' and params[0] in self.block_filters:
+                del self.block_filters[params[0]]
+                return dict(result=True)
+            if method == 'eth_getLogs':
+                return dict(result=self._get_logs(*params))
+            if method == 'personal_unlockAccount':
+                return dict(result=params[0].lower() in self.keys)
+            if method == 'eth_sendRawTransaction':
+                return dict(result=self._send_raw_transaction(*params))
+            return super(TesterProvider, self).make_request(method, params)
+
+    def _sign_transaction(self, tx):
+        """
+        :return: like geth's eth_signTransaction, the signed, RLP-encoded transaction as raw and the transaction as tx
+        """
+        key = self.keys.get(tx['from'].lower())
+        if key is None:
+            raise ValueError("unknown account {}".format(tx['from']))
+
+        transaction = Transaction(int(tx['nonce'], 16), int(tx['gasPrice'], 16), int(tx['gas'], 16), tx['to'],
+                                  int(tx['value'], 16), binascii.unhexlify(tx['data'][2:]))
+        transaction.sign(key)
+
+        return dict(raw='0x' + binascii.hexlify(rlp.encode(transaction)), tx=tx)
+
+    def _send_raw_transaction(self, raw_tx):
+        try:
+            return self.rpc_methods.eth_sendRawTransaction(raw_tx)
+        except tester.TransactionFailed:
+            # already mined, failed
+            return '0x' + binascii.hexlify(self.rpc_methods.client.evm.last_tx.hash)
+
+    def _block_number(self):
+        return self.rpc_methods.client.get_block_number()
+
+    def _new_block_filter(self):
+        # distinct from log filter ids, which are plain numbers
+        filter_id = 'block{}'.format(next(self.block_filter_ids))
+        self.block_filters[filter_id] = self._block_number()
+        return filter_id
+
+    def _block_filter_changes(self, filter_id):
+        last = self._block_number()
+        numbers = xrange(self.block_filters[filter_id] + 1, last + 1)
+        self.block_filters[filter_id] = last
+        return [self.rpc_methods.eth_getBlockByNumber(number, False)['hash'] for number in numbers]
+
+    def _get_logs(self, filter_params):
+        filter_id = self.rpc_methods.eth_newFilter(filter_params)
+        try:
+            return self.rpc_methods.eth_getFilterLogs(filter_id)
+        finally:
+            self.rpc_methods.eth_uninstallFilter(filter_id)
+
+
+def connect(backend='geth', ipc_path=GETH_IPC_PATH):
+    """
+    :param backend: one of BACKENDS
+    :return: function returning a new connection to the chain on every call, e.g. to be Creator's web3_factory.
+             Connections to the in-process chain all share that single chain
+    """
+    if backend == 'geth':
+        return lambda: Web3(IPCProvider(ipc_path))
+    if backend == 'tester':
+        provider = TesterProvider()
+        return lambda: Web3(provider)
+    raise ChainBackendException("unknown chain backend {}, expected one of {}".format(backend, ', '.join(BACKENDS)))
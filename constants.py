@@ -20,6 +20,20 @@ GAS_RESERVE = 20000
 # 91  # suitable for testrpc
 # 90  # suitable for Kovan testnet (parity), Geth dev chain,
 BATCH_SIZE = 89  # worst case scenario from theoretical_gas calculation
+PACKED_BATCH_SIZE = 93  # same, for packed calldata (multisendPacked)
+# gas model, see Creator._estimates
+GAS_MODEL_CALIBRATION_BATCHES = 10  # batches estimated with the node to calibrate the model
+GAS_MODEL_SHORT_BATCHES = (1, 20)  # sizes of short batches also calibrating, to tell base from per-recipient gas
+GAS_MODEL_SAMPLE_EVERY = 50  # every n-th batch is still estimated with the node
+GAS_MODEL_RISK = 0.95  # batches predicted above this fraction of GAS_LIMIT are estimated with the node
+PACKING_MARGIN = 200000  # packed batches are predicted to use at most GAS_LIMIT less this, below GAS_MODEL_RISK
+# JSON-RPC batching, e.g. when verifying eth balances
+RPC_BATCH_SIZE = 200  # requests per payload
+RPC_CONCURRENCY = 4  # payloads in flight
+VERIFY_CHUNK_BATCHES = 100  # batches whose eth balances are fetched together, when verifying eth in bulk
+# scanning Transfer logs of sent airdrops
+LOG_SCAN_CHUNK = 5000  # blocks per eth_getLogs request
+LOG_SCAN_SAFE_DEPTH = 12  # blocks this close to the head aren't cached, could be reorged
 
 # process balances related
 RESERVE_AIRDROP = 7012269912256639039461982L
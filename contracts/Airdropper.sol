@@ -32,4 +32,17 @@ contract Airdropper is Ownable {
         }
         return(i);
     }
+
+    // every word packs an airdrop: amount in the high 96 bits, address in the low 160 bits
+    function multisendPacked(address _tokenAddr, bytes32[] packed)
+    onlyOwner
+    returns (uint256) {
+        uint256 i = 0;
+        while (i < packed.length) {
+           uint256 word = uint256(packed[i]);
+           ERC20(_tokenAddr).transfer(address(word), word / 2 ** 160);
+           i += 1;
+        }
+        return(i);
+    }
 }
@@ -0,0 +1,69 @@
+/*
+Copyright 2017 OmiseGO Pte Ltd
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+ */
+
+pragma solidity ^0.4.11;
+
+import "zeppelin-solidity/contracts/ownership/Ownable.sol";
+import "zeppelin-solidity/contracts/token/ERC20.sol";
+
+
+// airdrops are claimed by anyone with a proof of the airdrop in the tree with `root`, see merkle.py,
+// until `deadline`, after which the owner can withdraw what's left unclaimed
+contract MerkleAirdrop is Ownable {
+
+    address public tokenAddr;
+    bytes32 public root;
+    uint256 public deadline;
+    mapping (uint256 => bool) public claimed;
+
+    event Claimed(uint256 index, address account, uint256 amount);
+
+    function MerkleAirdrop(address _tokenAddr, bytes32 _root, uint256 _deadline) {
+        tokenAddr = _tokenAddr;
+        root = _root;
+        deadline = _deadline;
+    }
+
+    function claim(uint256 index, address account, uint256 amount, bytes32[] proof)
+    returns (bool) {
+        require(now <= deadline);
+        require(!claimed[index]);
+
+        bytes32 node = keccak256(index, account, amount);
+        uint256 i = 0;
+        while (i < proof.length) {
+            if (node < proof[i]) {
+                node = keccak256(node, proof[i]);
+            } else {
+                node = keccak256(proof[i], node);
+            }
+            i += 1;
+        }
+        require(node == root);
+
+        claimed[index] = true;
+        ERC20(tokenAddr).transfer(account, amount);
+        Claimed(index, account, amount);
+        return true;
+    }
+
+    // unclaimed airdrops can be returned after the claiming period
+    function withdraw(uint256 amount)
+    onlyOwner {
+        require(now > deadline);
+        ERC20(tokenAddr).transfer(owner, amount);
+    }
+}
@@ -0,0 +1,38 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+
+import click
+
+from airdrops_file import load_airdrops, write_airdrops
+
+
+@click.command()
+@click.option('--to', 'to_format', type=click.Choice(['json', 'binary']), required=True,
+              help='Format to convert the processed airdrops to')
+@click.argument('processed-file', type=click.File('rb'))
+@click.argument('converted-file', type=click.File('wb'))
+def convert(to_format, processed_file, converted_file):
+
+    airdrops = load_airdrops(processed_file)
+
+    if to_format == 'binary':
+        write_airdrops(converted_file, airdrops)
+    else:
+        converted_file.write(json.dumps(list(airdrops)))
+
+
+if __name__ == '__main__':
+    convert()
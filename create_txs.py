@@ -14,12 +14,19 @@
 
 import logging
 import json
+import os
+from functools import partial
 
 import click
 from web3 import Web3, IPCProvider
 from web3.providers.rpc import RPCProvider
 
-from constants import GAS_RESERVE, GAS_PRICE, GAS_LIMIT, BATCH_SIZE
+from airdrops_file import load_airdrops
+from batch_rpc import BatchRPC, provider_endpoint
+from constants import GAS_RESERVE, GAS_PRICE, GAS_LIMIT, BATCH_SIZE, PACKED_BATCH_SIZE, RPC_BATCH_SIZE, RPC_CONCURRENCY
+from gas_model import GasModel
+from lanes import split_lanes, lane_paths, run_lanes
+from tx_journal import TxJournal, file_sha256, read_header
 from utils import get_contracts, Creator
 
 logging.basicConfig(level=logging.INFO)
@@ -29,36 +36,174 @@ logging.basicConfig(level=logging.INFO)
 @click.option('--ipc-path', default=None, help='The IPC to connect to.')
 @click.option('--rpc-host', default=None, help='e.g. localhost')
 @click.option('--rpc-port', default=None, help='e.g. 8545')
-@click.option('--signer-addr', help='Signer address')
-@click.option('--airdropper-addr', help='Airdropper contract address')
+@click.option('--signer-addr', multiple=True,
+              help='Signer address. Give several to split the airdrops into lanes, one per signer, see lanes.py')
+@click.option('--airdropper-addr', multiple=True,
+              help='Airdropper contract address, with several signers one per signer, each owned by its signer')
 @click.option('--omgtoken-addr', help='OMGToken contract address')
 @click.option('--verify-eth', is_flag=True, help='If true, creation will verify the airdrop amounts vs '
                                                  'the eth balance at 3988888')
-@click.argument('processed-file', type=click.File('rb'))
-@click.argument('unsigned-file', type=click.File('wb'))
+@click.option('--rpc-batch-size', default=RPC_BATCH_SIZE,
+              help='With --verify-eth, how many balance requests to send in a single JSON-RPC batch')
+@click.option('--rpc-concurrency', default=RPC_CONCURRENCY,
+              help='With --verify-eth, how many JSON-RPC batches to have in flight at once')
+@click.option('--workers', default=1, help='How many batches to estimate gas for concurrently, '
+                                           'each worker uses a separate connection to the node')
+@click.option('--gas-model', is_flag=True, help='Predict gas with a model calibrated on a sample of batches, '
+                                                'estimating with the node only the sampled and risky batches')
+@click.option('--gas-model-file', type=click.Path(dir_okay=False), default=None,
+              help='With --gas-model, json calibration of the model: loaded if the file exists, otherwise calibrated '
+                   'on the first batches and written. Share it between runs, which are to create the same transactions')
+@click.option('--pack', is_flag=True, help='With --gas-model and --gas-model-file, fill every transaction as far as '
+                                           'the model allows, instead of using fixed-size batches')
+@click.option('--packed-calldata', is_flag=True,
+              help='Call multisendPacked, with every airdrop packed in a single word of calldata, '
+                   'fitting {} instead of {} airdrops in a batch'.format(PACKED_BATCH_SIZE, BATCH_SIZE))
+@click.option('--omg-holders-file', type=click.File('rb'), default=None,
+              help='With --gas-model, json list of addresses already holding OMG, the rest are assumed new holders')
+@click.option('--gas-report', type=click.File('wb'), default=None,
+              help='With --gas-model, where to write predicted vs measured gas of batches estimated with the node')
+@click.option('--journal', type=click.Path(dir_okay=False), default=None,
+              help='Where to journal finished transactions, to resume from after a crash. '
+                   'Defaults to the unsigned file path with .journal appended, removed after success')
+@click.argument('processed-file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('unsigned-file', type=click.Path(dir_okay=False))
 def create_txs(ipc_path, rpc_host, rpc_port, signer_addr, airdropper_addr, omgtoken_addr, verify_eth,
-               processed_file, unsigned_file):
+               rpc_batch_size, rpc_concurrency, workers, gas_model, gas_model_file, pack, packed_calldata,
+               omg_holders_file, gas_report, journal, processed_file, unsigned_file):
 
     if ipc_path and (rpc_host or rpc_port):
         raise Exception("both ipc and rpc cannot be specified")
-    if ipc_path:
-        web3 = Web3(IPCProvider(ipc_path))
-    else:
-        web3 = Web3(RPCProvider(host=rpc_host,
-                                port=rpc_port))
 
-    airdropper, omgToken = get_contracts(web3,
-                                         airdropper_addr=airdropper_addr,
-                                         omgtoken_addr=omgtoken_addr)
+    if gas_model_file and not gas_model:
+        raise Exception("--gas-model-file requires --gas-model")
 
-    creator = Creator(signer_addr, airdropper, omgToken, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
-                      verify_eth=verify_eth)
+    if pack and not gas_model_file:
+        # calibrated anew, the batches would depend on the node's estimates, differing from run to run
+        raise Exception("--pack requires --gas-model-file")
 
-    airdrops = json.loads(processed_file.read())
+    lanes = len(signer_addr)
+    if not lanes:
+        raise Exception("--signer-addr is required")
+    if lanes > 1 and len(airdropper_addr) != lanes:
+        raise Exception("every signer needs an Airdropper of its own, {} signers vs {} airdroppers".format(
+            lanes, len(airdropper_addr)))
 
-    unsigned = creator.create_txs(airdrops, BATCH_SIZE)
+    def connect():
+        if ipc_path:
+            return Web3(IPCProvider(ipc_path))
+        else:
+            return Web3(RPCProvider(host=rpc_host,
+                                    port=rpc_port))
 
-    unsigned_file.write(json.dumps(unsigned, sort_keys=True))
+    web3 = connect()
+
+    batch_rpc = BatchRPC(provider_endpoint(web3.currentProvider), rpc_batch_size, rpc_concurrency)
+    holders = json.loads(omg_holders_file.read()) if omg_holders_file else None
+    batch_size = PACKED_BATCH_SIZE if packed_calldata else BATCH_SIZE
+    processed_sha256 = file_sha256(processed_file)
+
+    with open(processed_file, 'rb') as f:
+        airdrops = load_airdrops(f)
+
+    # resolved once, deploying what isn't given, for the calibration and every lane to use the same contracts
+    contracts = [get_contracts(web3, airdropper_addr=airdropper_addr[0] if airdropper_addr else None,
+                               omgtoken_addr=omgtoken_addr)]
+    contracts += [get_contracts(web3, airdropper_addr=airdropper_addr[lane], omgtoken_addr=contracts[0][1].address)
+                  for lane in xrange(1, lanes)]
+
+    def make_creator(lane, calibration=None):
+        airdropper, omgToken = contracts[lane]
+
+        model = None
+        if gas_model:
+            model = GasModel(holders=holders)
+            if calibration:
+                model.load_calibration(calibration)
+
+        return Creator(signer_addr[lane], airdropper, omgToken, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                       verify_eth=verify_eth, workers=workers, web3_factory=connect, batch_rpc=batch_rpc,
+                       gas_model=model, packed=packed_calldata)
+
+    unsigned_paths = lane_paths(unsigned_file, lanes)
+    journal_paths = lane_paths(journal, lanes) if journal else [path + '.journal' for path in unsigned_paths]
+
+    # calibrated once for all the lanes, before any transactions, to be in the journal headers
+    calibration = None
+    if gas_model_file and os.path.exists(gas_model_file):
+        with open(gas_model_file, 'rb') as f:
+            calibration = json.loads(f.read())
+    elif gas_model:
+        # resuming, the transactions journaled were created with this calibration
+        calibration = (read_header(journal_paths[0]) or {}).get('gas_model')
+        if calibration is None:
+            calibrating_creator = make_creator(0)
+            calibrating_creator.calibrate(airdrops, batch_size)
+            calibration = calibrating_creator.gas_model.calibration()
+            logging.info("Gas model: calibrated")
+        if gas_model_file:
+            with open(gas_model_file, 'wb') as f:
+                f.write(json.dumps(calibration, sort_keys=True))
+
+    def create_lane(lane, lane_airdrops, unsigned_path, journal_path):
+        creator = make_creator(lane, calibration)
+        airdropper, omgToken = creator.airdropper, creator.omgtoken
+
+        lane_journal = TxJournal(journal_path,
+                                 dict(processed_sha256=processed_sha256,
+                                      lane=lane,
+                                      lanes=lanes,
+                                      signer=signer_addr[lane],
+                                      airdropper=airdropper.address,
+                                      omgtoken=omgToken.address,
+                                      batch_size=batch_size,
+                                      pack=pack,
+                                      gas_model=calibration,
+                                      packed_calldata=packed_calldata,
+                                      gas_limit=GAS_LIMIT,
+                                      gas_price=GAS_PRICE,
+                                      gas_reserve=GAS_RESERVE))
+
+        if lane_journal.count:
+            logging.info("Resuming from journal {}: {} transactions, {} airdrops, next nonce {}".format(
+                lane_journal.path, lane_journal.count, lane_journal.next_offset, lane_journal.next_nonce))
+
+        first_nonce = lane_journal.next_nonce
+        first_batch = lane_journal.count
+        created = 0
+        for transaction in creator.iter_txs(lane_airdrops, batch_size, pack=pack, nonce=lane_journal.next_nonce,
+                                            offset=lane_journal.next_offset, first_batch=first_batch):
+            if first_nonce is None:
+                first_nonce = int(transaction['tx']['nonce'], 16)
+            lane_journal.append(transaction)
+            created += 1
+
+        with open(unsigned_path, 'wb') as f:
+            lane_journal.write_output(f)
+
+        lane_journal.close()
+        os.remove(lane_journal.path)
+
+        if lanes > 1:
+            logging.info("Lane {}: {} airdrops, {} in total, to be held by Airdropper {}".format(
+                lane, len(lane_airdrops), sum(amount for _, amount in lane_airdrops), airdropper.address))
+
+        report = [dict(row, nonce=web3.toHex(first_nonce + row['batch'] - first_batch)) for row in creator.gas_report]
+        return report, created
+
+    results = run_lanes([partial(create_lane, lane, lane_airdrops, unsigned_paths[lane], journal_paths[lane])
+                         for lane, lane_airdrops in enumerate(split_lanes(airdrops, lanes))])
+
+    if gas_model:
+        report = []
+        for lane, (lane_report, _) in enumerate(results):
+            report += [dict(row, lane=lane) if lanes > 1 else row for row in lane_report]
+        for row in report:
+            logging.info("Gas model: nonce {nonce} predicted {predicted} measured {measured}".format(**row))
+        logging.info("Gas model: estimated {} of {} batches with the node".format(
+            len(report), sum(created for _, created in results)))
+        if gas_report:
+            gas_report.write(json.dumps(report, sort_keys=True))
 
 
 if __name__ == '__main__':
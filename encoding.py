@@ -0,0 +1,123 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import binascii
+
+from ethereum.utils import sha3
+
+WORD = 32
+ADDRESS_WIDTH = 20
+AMOUNT_WIDTH = WORD - ADDRESS_WIDTH
+MULTISEND_SIGNATURE = 'multisend(address,address[],uint256[])'
+MULTISEND_PACKED_SIGNATURE = 'multisendPacked(address,bytes32[])'
+
+
+class MultisendEncoder(object):
+    """
+    Specialized ABI encoder of calldata for `Airdropper.multisend(address,address[],uint256[])`,
+    byte for byte the same as `airdropper.encodeABI('multisend', ...)`, without web3's generic machinery.
+
+    Layout of the calldata, in 32-byte words after the 4-byte selector:
+    token, offset of dests (always 3 words), offset of values, len(dests), dests..., len(values), values...
+    """
+
+    def __init__(self, token_address):
+        self.selector = sha3(MULTISEND_SIGNATURE)[:4]
+        # selector, token and the offset of dests are the same for every batch
+        self.head = self.selector + _address_word(token_address) + _uint_word(3 * WORD)
+
+    def encode(self, addresses, amounts):
+        """
+        :return: 0x-prefixed hex calldata
+        """
+        if len(addresses) != len(amounts):
+            raise ValueError("{} addresses vs {} amounts".format(len(addresses), len(amounts)))
+
+        count = len(addresses)
+        head_size = len(self.head)
+        data = bytearray(head_size + (3 + 2 * count) * WORD)
+
+        data[:head_size] = self.head
+        position = head_size
+        data[position:position + WORD] = _uint_word((4 + count) * WORD)  # offset of values
+        position += WORD
+
+        data[position:position + WORD] = _uint_word(count)
+        position += WORD
+        for address in addresses:
+            data[position:position + WORD] = _address_word(address)
+            position += WORD
+
+        data[position:position + WORD] = _uint_word(count)
+        position += WORD
+        for amount in amounts:
+            data[position:position + WORD] = _uint_word(amount)
+            position += WORD
+
+        return '0x' + binascii.hexlify(data)
+
+
+class PackedMultisendEncoder(object):
+    """
+    Encoder of calldata for `Airdropper.multisendPacked(address,bytes32[])`, with the same interface as MultisendEncoder.
+    Every airdrop takes a single word: the amount in the high 12 bytes, the address in the low 20 bytes
+
+    Layout of the calldata, in 32-byte words after the 4-byte selector:
+    token, offset of the words (always 2 words), len(words), words...
+    """
+
+    def __init__(self, token_address):
+        self.selector = sha3(MULTISEND_PACKED_SIGNATURE)[:4]
+        self.head = self.selector + _address_word(token_address) + _uint_word(2 * WORD)
+
+    def encode(self, addresses, amounts):
+        """
+        :return: 0x-prefixed hex calldata
+        """
+        if len(addresses) != len(amounts):
+            raise ValueError("{} addresses vs {} amounts".format(len(addresses), len(amounts)))
+
+        count = len(addresses)
+        head_size = len(self.head)
+        data = bytearray(head_size + (1 + count) * WORD)
+
+        data[:head_size] = self.head
+        position = head_size
+        data[position:position + WORD] = _uint_word(count)
+        position += WORD
+
+        for address, amount in zip(addresses, amounts):
+            data[position:position + WORD] = _packed_word(address, amount)
+            position += WORD
+
+        return '0x' + binascii.hexlify(data)
+
+
+def _packed_word(address, amount):
+    if not 0 <= amount < 2 ** (8 * AMOUNT_WIDTH):
+        raise ValueError("amount doesn't fit in {} bytes {}".format(AMOUNT_WIDTH, amount))
+    return binascii.unhexlify('{:024x}'.format(amount)) + _address_word(address)[WORD - ADDRESS_WIDTH:]
+
+
+def _address_word(address):
+    raw = binascii.unhexlify(address[2:])
+    if len(raw) != ADDRESS_WIDTH:
+        raise ValueError("invalid address {}".format(address))
+    return '\x00' * (WORD - ADDRESS_WIDTH) + raw
+
+
+def _uint_word(value):
+    if not 0 <= value < 2 ** (8 * WORD):
+        raise ValueError("value out of uint256 range {}".format(value))
+    return binascii.unhexlify('{:064x}'.format(value))
@@ -18,6 +18,11 @@ import json
 import click
 from web3 import Web3, IPCProvider
 
+from airdrops_file import load_airdrops
+from batch_rpc import BatchRPC, provider_endpoint
+from constants import RPC_BATCH_SIZE, RPC_CONCURRENCY
+from lanes import split_lanes, lane_paths
+from signed_index import load_index
 from utils import get_contracts, Sender
 
 logging.basicConfig(level=logging.INFO)
@@ -25,23 +30,38 @@ logging.basicConfig(level=logging.INFO)
 
 @click.command()
 @click.option('--ipc-path', help='The IPC to connect to.')
-@click.option('--airdropper-addr', help='Airdropper contract address')
+@click.option('--airdropper-addr', multiple=True,
+              help='Airdropper contract address. If the airdrops were created in lanes, one per lane, in lane order')
 @click.option('--omgtoken-addr', help='OMGToken contract address')
+@click.option('--log-cache', type=click.Path(dir_okay=False), default=None,
+              help='File to cache scanned Transfer logs in, so that reruns only scan new blocks')
+@click.option('--rpc-batch-size', default=RPC_BATCH_SIZE,
+              help='How many receipt or log requests to send in a single JSON-RPC batch')
+@click.option('--rpc-concurrency', default=RPC_CONCURRENCY, help='How many JSON-RPC batches to have in flight at once')
 @click.argument('processed-file', type=click.File('rb'))
-@click.argument('signed-file', type=click.File('rb'))
+@click.argument('signed-file', type=click.Path(dir_okay=False))
 @click.argument('unsent-airdrops-file', type=click.File('wb'))
-def filter(ipc_path, airdropper_addr, omgtoken_addr,
+def filter(ipc_path, airdropper_addr, omgtoken_addr, log_cache, rpc_batch_size, rpc_concurrency,
            processed_file, signed_file, unsent_airdrops_file):
     web3 = Web3(IPCProvider(ipc_path))
-    airdropper, omg_token = get_contracts(web3,
-                                          airdropper_addr=airdropper_addr,
-                                          omgtoken_addr=omgtoken_addr)
-    sender = Sender(web3)
+    lanes = len(airdropper_addr) or 1
+    batch_rpc = BatchRPC(provider_endpoint(web3.currentProvider), rpc_batch_size, rpc_concurrency)
+    log_caches = lane_paths(log_cache, lanes) if log_cache else [None] * lanes
+    airdrops = load_airdrops(processed_file)
 
-    signed = json.loads(signed_file.read())
-    airdrops = json.loads(processed_file.read())
+    # the unsent airdrops of every lane, in lane order, are in the order of the processed airdrops
+    unsent_airdrops = []
+    for lane, (lane_airdrops, signed_path) in enumerate(zip(split_lanes(airdrops, lanes), lane_paths(signed_file, lanes))):
+        airdropper, omg_token = get_contracts(web3,
+                                              airdropper_addr=airdropper_addr[lane] if airdropper_addr else None,
+                                              omgtoken_addr=omgtoken_addr)
 
-    unsent_airdrops = sender.recover_unsent_airdrops(airdrops, signed, airdropper, omg_token)
+        with open(signed_path, 'rb') as f:
+            signed = json.loads(f.read())
+        sender = Sender(web3, batch_rpc=batch_rpc, signed_index=load_index(signed_path, signed))
+
+        unsent_airdrops += sender.recover_unsent_airdrops(lane_airdrops, signed, airdropper, omg_token,
+                                                          log_cache=log_caches[lane])
 
     unsent_airdrops_file.write(json.dumps(unsent_airdrops))
 
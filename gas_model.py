@@ -0,0 +1,134 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import binascii
+import hashlib
+
+TX_GAS = 21000
+CALLDATA_ZERO_BYTE_GAS = 4
+CALLDATA_NONZERO_BYTE_GAS = 68
+# crediting a recipient with no OMG yet is an SSTORE from zero (20000), otherwise it's 5000
+NEW_HOLDER_EXTRA_GAS = 20000 - 5000
+
+
+class GasModelException(Exception):
+    pass
+
+
+class GasModel(object):
+    """
+    Predicts gas of a multisend batch from its composition, i.e. the number of recipients,
+    how many of them hold no OMG yet and the zero/non-zero bytes in calldata.
+    Calibrated on a sample of actual gas estimates of batches, like `theoretical_gas` but fitted to reality
+    """
+
+    def __init__(self, holders=None, margin=0):
+        """
+        :param holders: addresses already holding OMG, recipients not in here are assumed to be new holders
+        :param margin: extra gas added to every prediction, on top of the largest underprediction in calibration
+        """
+        self.holders = set(address.lower() for address in holders or [])
+        self.margin = margin
+        self.base_gas = None
+        self.recipient_gas = None
+        self.calibration_error = None
+
+    @property
+    def calibrated(self):
+        return self.recipient_gas is not None
+
+    def calibrate(self, samples):
+        """
+        Fits the model with a least squares fit of execution gas vs number of recipients
+        :param samples: list of (batch, calldata, measured gas)
+        """
+        if not samples:
+            raise GasModelException("no samples to calibrate with")
+
+        points = [(len(batch), measured - self._fixed_gas(batch, data)) for batch, data, measured in samples]
+        counts = [count for count, _ in points]
+
+        if len(set(counts)) > 1:
+            mean_count = 1.0 * sum(counts) / len(points)
+            mean_gas = 1.0 * sum(gas for _, gas in points) / len(points)
+            self.recipient_gas = sum((count - mean_count) * (gas - mean_gas) for count, gas in points) / \
+                sum((count - mean_count) ** 2 for count in counts)
+            self.base_gas = mean_gas - self.recipient_gas * mean_count
+        else:
+            # all samples of the same size, can't tell base cost from per-recipient cost, attribute all to recipients
+            self.base_gas = 0
+            self.recipient_gas = 1.0 * sum(gas for _, gas in points) / sum(counts)
+
+        # so that the model never predicts less than any of the samples
+        self.calibration_error = max(0, max(int(measured - self._predict(batch, data))
+                                            for batch, data, measured in samples) + 1)
+
+    def calibration(self):
+        """
+        :return: json-serializable calibration, for `load_calibration` to have another model predict exactly the same,
+                 e.g. to cut the same packed batches in another run
+        """
+        if not self.calibrated:
+            raise GasModelException("gas model not calibrated")
+
+        return dict(base_gas=self.base_gas, recipient_gas=self.recipient_gas, calibration_error=self.calibration_error,
+                    margin=self.margin, holders_sha256=self.holders_sha256())
+
+    def load_calibration(self, calibration):
+        """
+        Calibrates the model as in another run, see `calibration`. The holders and margin must be the same
+        """
+        if calibration['holders_sha256'] != self.holders_sha256():
+            raise GasModelException("calibration is for different OMG holders")
+        if calibration['margin'] != self.margin:
+            raise GasModelException("calibration is for margin {}, not {}".format(calibration['margin'], self.margin))
+
+        self.base_gas = calibration['base_gas']
+        self.recipient_gas = calibration['recipient_gas']
+        self.calibration_error = calibration['calibration_error']
+
+    def holders_sha256(self):
+        return hashlib.sha256('\n'.join(sorted(self.holders))).hexdigest()
+
+    def predict(self, batch, data):
+        """
+        :param batch: list of address-amount pairs
+        :param data: 0x-prefixed hex calldata of the batch
+        :return: predicted gas, never less than any of the calibration samples would have got
+        """
+        if not self.calibrated:
+            raise GasModelException("gas model not calibrated")
+
+        return int(self._predict(batch, data)) + self.calibration_error + self.margin
+
+    def new_holders(self, batch):
+        return sum(1 for address, _ in batch if address.lower() not in self.holders)
+
+    def _predict(self, batch, data):
+        return self._fixed_gas(batch, data) + self.base_gas + self.recipient_gas * len(batch)
+
+    def _fixed_gas(self, batch, data):
+        """
+        The part of gas, which is known exactly from the composition of the batch
+        """
+        return TX_GAS + calldata_gas(data) + NEW_HOLDER_EXTRA_GAS * self.new_holders(batch)
+
+
+def calldata_gas(data):
+    """
+    :param data: 0x-prefixed hex calldata
+    """
+    raw = binascii.unhexlify(data[2:])
+    zero_bytes = raw.count('\x00')
+    return zero_bytes * CALLDATA_ZERO_BYTE_GAS + (len(raw) - zero_bytes) * CALLDATA_NONZERO_BYTE_GAS
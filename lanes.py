@@ -0,0 +1,89 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Lanes split the airdrops between several signers, each with an Airdropper of its own,
+so that every lane has its own nonce sequence and the lanes are sent concurrently.
+
+Every lane gets a contiguous slice of the airdrops and files of its own, e.g. `data/unsigned.lane0.json`.
+With a single lane, files are named as without lanes
+"""
+
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+
+
+class LanesException(Exception):
+    pass
+
+
+def split_lanes(airdrops, lanes):
+    """
+    :return: list of `lanes` contiguous slices of the airdrops, of sizes differing by at most 1.
+             A single lane gets the airdrops themselves, e.g. an AirdropsFile not decoded all at once
+    """
+    if lanes < 1:
+        raise LanesException("at least one lane needed, got {}".format(lanes))
+    if lanes == 1:
+        return [airdrops]
+    bounds = [len(airdrops) * lane // lanes for lane in xrange(lanes + 1)]
+    return [airdrops[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def lane_path(path, lane):
+    """
+    :return: path of the lane's file, the lane inserted before the extension, e.g. data/unsigned.lane0.json
+    """
+    root, extension = os.path.splitext(path)
+    return '{}.lane{}{}'.format(root, lane, extension)
+
+
+def lane_paths(path, lanes):
+    """
+    :return: paths of the files of every lane, just `path` for a single lane
+    """
+    if lanes == 1:
+        return [path]
+    return [lane_path(path, lane) for lane in xrange(lanes)]
+
+
+def run_lanes(jobs, stop=None):
+    """
+    Runs a job for every lane, all concurrently in threads, and waits for all of them to finish
+    :param jobs: callables, one per lane
+    :param stop: threading.Event, set as soon as any of the jobs fails, e.g. to have the other lanes stop sending
+    :return: results of the jobs, in lane order
+    :raises: the failure of the first failed lane, after all lanes are done
+    """
+    def _run(lane, job):
+        try:
+            return job()
+        except Exception:
+            logging.exception("lane {} failed".format(lane))
+            if stop is not None:
+                stop.set()
+            raise
+
+    if len(jobs) == 1:
+        return [jobs[0]()]
+
+    pool = ThreadPool(len(jobs))
+    try:
+        pending = [pool.apply_async(_run, (lane, job)) for lane, job in enumerate(jobs)]
+        for result in pending:
+            result.wait()
+        return [result.get() for result in pending]
+    finally:
+        pool.terminate()
@@ -0,0 +1,150 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import binascii
+import json
+import logging
+import os
+
+from ethereum.utils import sha3
+
+from constants import LOG_SCAN_CHUNK, LOG_SCAN_SAFE_DEPTH
+
+TRANSFER_TOPIC = '0x' + binascii.hexlify(sha3('Transfer(address,address,uint256)'))
+
+
+class LogScanException(Exception):
+    pass
+
+
+class TransferScanner(object):
+    """
+    Scans for Transfer events of a token from a single address, using `eth_getLogs` over chunks of blocks,
+    with the token and the `from` topic filtered by the node.
+
+    Optionally keeps the scanned ranges and their transfers in a json cache file, so that rescanning
+    fetches only the new blocks. The last LOG_SCAN_SAFE_DEPTH blocks are never cached, as they can still be reorged
+    """
+
+    def __init__(self, web3, token_address, from_address, chunk_size=LOG_SCAN_CHUNK, batch_rpc=None, cache_path=None):
+        """
+        :param batch_rpc: BatchRPC to fetch the chunks with, by default one request per chunk
+        """
+        self.web3 = web3
+        self.token_address = token_address.lower()
+        self.from_address = from_address.lower()
+        self.chunk_size = chunk_size
+        self.batch_rpc = batch_rpc
+        self.cache_path = cache_path
+
+        self.ranges = []  # [first, last] block ranges already scanned, inclusive
+        self.transfers = []
+        if cache_path and os.path.exists(cache_path):
+            self._load_cache()
+
+    def scan(self, from_block, to_block):
+        """
+        :return: list of transfers in the blocks, dicts with transactionHash, blockNumber, logIndex, to, value
+        """
+        chunks = [[chunk_start, min(chunk_start + self.chunk_size - 1, end)]
+                  for start, end in self._missing(from_block, to_block)
+                  for chunk_start in xrange(start, end + 1, self.chunk_size)]
+
+        logging.info("Scanning Transfer logs in {} chunks of up to {} blocks".format(len(chunks), self.chunk_size))
+
+        params_list = [[dict(fromBlock=self.web3.toHex(start),
+                             toBlock=self.web3.toHex(end),
+                             address=self.token_address,
+                             topics=[TRANSFER_TOPIC, _address_topic(self.from_address)])]
+                       for start, end in chunks]
+        if self.batch_rpc is None:
+            chunk_logs = [self.web3._requestManager.request_blocking('eth_getLogs', params) for params in params_list]
+        else:
+            chunk_logs = self.batch_rpc.request('eth_getLogs', params_list)
+
+        fetched = [_decode_transfer(log) for logs in chunk_logs for log in logs if not log.get('removed')]
+
+        safe_block = self.web3.eth.blockNumber - LOG_SCAN_SAFE_DEPTH
+        self._add(chunks, fetched, safe_block)
+
+        recent = [transfer for transfer in fetched if transfer['blockNumber'] > safe_block]
+        in_range = [transfer for transfer in self.transfers + recent
+                    if from_block <= transfer['blockNumber'] <= to_block]
+
+        return sorted(in_range, key=lambda transfer: (transfer['blockNumber'], transfer['logIndex']))
+
+    def _missing(self, from_block, to_block):
+        """
+        :return: ranges of blocks not scanned yet
+        """
+        missing = []
+        start = from_block
+        for first, last in self.ranges:
+            if last < start:
+                continue
+            if first > to_block:
+                break
+            if first > start:
+                missing.append([start, first - 1])
+            start = max(start, last + 1)
+        if start <= to_block:
+            missing.append([start, to_block])
+        return missing
+
+    def _add(self, chunks, fetched, safe_block):
+        """
+        Remembers the chunks, as far as they're safe from reorgs, and their transfers
+        """
+        safe_chunks = [[start, min(end, safe_block)] for start, end in chunks if start <= safe_block]
+
+        merged = []
+        for first, last in sorted(self.ranges + safe_chunks):
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self.ranges = merged
+
+        self.transfers += [transfer for transfer in fetched if transfer['blockNumber'] <= safe_block]
+
+        if self.cache_path:
+            self._save_cache()
+
+    def _load_cache(self):
+        with open(self.cache_path, 'rb') as f:
+            cache = json.loads(f.read())
+        if (cache['token'], cache['from']) != (self.token_address, self.from_address):
+            raise LogScanException("log cache {} is for other token or from address".format(self.cache_path))
+        self.ranges = cache['ranges']
+        self.transfers = cache['transfers']
+
+    def _save_cache(self):
+        with open(self.cache_path + '.tmp', 'wb') as f:
+            f.write(json.dumps({'token': self.token_address,
+                                'from': self.from_address,
+                                'ranges': self.ranges,
+                                'transfers': self.transfers}))
+        os.rename(self.cache_path + '.tmp', self.cache_path)
+
+
+def _address_topic(address):
+    return '0x' + '0' * 24 + address[2:]
+
+
+def _decode_transfer(log):
+    return dict(transactionHash=log['transactionHash'].lower(),
+                blockNumber=int(log['blockNumber'], 16),
+                logIndex=int(log['logIndex'], 16),
+                to='0x' + log['topics'][2][-40:],
+                value=int(log['data'], 16))
@@ -0,0 +1,235 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Merkle tree of airdrops, for recipients to claim with `MerkleAirdrop.claim` instead of being sent their airdrops.
+
+A leaf is keccak256(index, address, amount), tightly packed as `uint256, address, uint256`, like Solidity's
+`keccak256(index, account, amount)`. Indexes tell apart the same address-amount pair appearing twice.
+A parent is keccak256 of its two children, the smaller first, so proofs need no left/right flags.
+The last node of a level with an odd number of nodes is carried up unchanged.
+
+The tree is built in a proof file, one level after another, each read back in chunks to hash the next,
+so no level is ever held in memory. Layout (all integers big-endian):
+ - header: magic (8 bytes), version (2 bytes), reserved (2 bytes), number of airdrops (8 bytes), root (32 bytes)
+ - accounts: address (20 bytes), amount (32 bytes), one per airdrop, in the order of the airdrops
+ - levels: 32-byte nodes of every level, from the leaves up to the root
+ - address index: address (20 bytes), airdrop index (8 bytes), sorted by address, to find the airdrops of an address
+"""
+
+import binascii
+import mmap
+import os
+import struct
+
+from ethereum.utils import sha3
+
+MAGIC = 'OMGMRKL\x00'
+VERSION = 1
+HEADER = struct.Struct('>8sHHQ32s')
+ACCOUNT = struct.Struct('>20s32s')
+ADDRESS_INDEX = struct.Struct('>20sQ')
+NODE_WIDTH = 32
+CHUNK = 2 ** 16  # nodes read at once when hashing the next level, even
+
+
+class MerkleException(Exception):
+    pass
+
+
+def leaf_hash(index, address, amount):
+    return sha3(_uint(index) + _address(address) + _uint(amount))
+
+
+def pair_hash(first, second):
+    return sha3(first + second) if first < second else sha3(second + first)
+
+
+def verify_proof(leaf, proof, root):
+    node = leaf
+    for sibling in proof:
+        node = pair_hash(node, sibling)
+    return node == root
+
+
+def level_sizes(count):
+    """
+    :return: number of nodes of every level, from the leaves up to the root
+    """
+    sizes = [count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def build_tree(airdrops, path):
+    """
+    Writes the proof file of the airdrops, see the layout above
+    :param airdrops: list of address-amount pairs, e.g. as loaded from processed.json
+    :return: the root, 32 bytes
+    """
+    count = len(airdrops)
+    if not count:
+        raise MerkleException("no airdrops to build a tree of")
+
+    with open(path + '.tmp', 'w+b') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, count, '\x00' * NODE_WIDTH))
+
+        for address, amount in airdrops:
+            f.write(ACCOUNT.pack(_address(address), _uint(amount)))
+
+        for start in xrange(0, count, CHUNK):
+            f.write(''.join(leaf_hash(index, address, amount)
+                            for index, (address, amount) in enumerate(airdrops[start:start + CHUNK], start)))
+
+        level_start = HEADER.size + count * ACCOUNT.size
+        for size in level_sizes(count)[:-1]:
+            level_start = _hash_level(f, level_start, size)
+
+        f.seek(level_start)
+        root = f.read(NODE_WIDTH)
+
+        f.seek(0, os.SEEK_END)
+        # addresses are hashes, so sorting a bucket per first hex digit at a time holds ~1/16 of the index in memory
+        for digit in '0123456789abcdef':
+            bucket = sorted((_address(address), position) for position, (address, _) in enumerate(airdrops)
+                            if address[2].lower() == digit)
+            f.write(''.join(ADDRESS_INDEX.pack(address, position) for address, position in bucket))
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, count, root))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.rename(path + '.tmp', path)
+
+    return root
+
+
+def _hash_level(f, level_start, size):
+    """
+    Appends the parent level of the `size` nodes at `level_start`, reading them in chunks
+    :return: where the parent level starts
+    """
+    parent_start = level_start + size * NODE_WIDTH
+    write_position = parent_start
+
+    for start in xrange(0, size, CHUNK):
+        f.seek(level_start + start * NODE_WIDTH)
+        nodes = f.read(min(CHUNK, size - start) * NODE_WIDTH)
+
+        parents = []
+        for offset in xrange(0, len(nodes), 2 * NODE_WIDTH):
+            left = nodes[offset:offset + NODE_WIDTH]
+            right = nodes[offset + NODE_WIDTH:offset + 2 * NODE_WIDTH]
+            parents.append(pair_hash(left, right) if right else left)
+
+        f.seek(write_position)
+        f.write(''.join(parents))
+        write_position += len(parents) * NODE_WIDTH
+
+    return parent_start
+
+
+class MerkleProofs(object):
+    """
+    Reads claims out of a proof file written by `build_tree`, memory-mapped
+    """
+
+    def __init__(self, f):
+        # checked before mapping, an empty file can't be mapped at all
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise MerkleException("file too short for the header")
+
+        self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.count, self.root = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or version != VERSION:
+            raise MerkleException("not a proof file of version {}".format(VERSION))
+
+        self.level_sizes = level_sizes(self.count)
+        self.level_starts = [HEADER.size + self.count * ACCOUNT.size]
+        for size in self.level_sizes[:-1]:
+            self.level_starts.append(self.level_starts[-1] + size * NODE_WIDTH)
+        self.index_start = self.level_starts[-1] + NODE_WIDTH
+
+        if len(self.mmap) != self.index_start + self.count * ADDRESS_INDEX.size:
+            raise MerkleException("file length doesn't match {} airdrops".format(self.count))
+
+    def account(self, index):
+        """
+        :return: address-amount pair of the airdrop
+        """
+        address, amount = ACCOUNT.unpack_from(self.mmap, HEADER.size + index * ACCOUNT.size)
+        return ['0x' + binascii.hexlify(address), int(binascii.hexlify(amount), 16)]
+
+    def proof(self, index):
+        """
+        :return: list of 32-byte sibling nodes, from the leaf's sibling up
+        """
+        if not 0 <= index < self.count:
+            raise MerkleException("no airdrop {} of {}".format(index, self.count))
+
+        proof = []
+        for size, start in zip(self.level_sizes[:-1], self.level_starts):
+            sibling = index ^ 1
+            if sibling < size:
+                proof.append(self.mmap[start + sibling * NODE_WIDTH:start + (sibling + 1) * NODE_WIDTH])
+            index //= 2
+        return proof
+
+    def indexes(self, address):
+        """
+        :return: indexes of the airdrops to the address, found by bisecting the address index
+        """
+        raw = _address(address)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._indexed(middle)[0] < raw:
+                low = middle + 1
+            else:
+                high = middle
+
+        indexes = []
+        while low < self.count and self._indexed(low)[0] == raw:
+            indexes.append(self._indexed(low)[1])
+            low += 1
+        return indexes
+
+    def claims(self, address):
+        """
+        :return: arguments of `MerkleAirdrop.claim` for every airdrop to the address,
+                 dicts with index, account, amount and proof, nodes 0x-prefixed hex
+        """
+        claims = []
+        for index in self.indexes(address):
+            account, amount = self.account(index)
+            claims.append(dict(index=index, account=account, amount=amount,
+                               proof=['0x' + binascii.hexlify(node) for node in self.proof(index)]))
+        return claims
+
+    def _indexed(self, position):
+        return ADDRESS_INDEX.unpack_from(self.mmap, self.index_start + position * ADDRESS_INDEX.size)
+
+
+def _address(address):
+    raw = binascii.unhexlify(address[2:])
+    if len(raw) != 20:
+        raise MerkleException("invalid address {}".format(address))
+    return raw
+
+
+def _uint(value):
+    return binascii.unhexlify('{:064x}'.format(value))
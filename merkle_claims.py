@@ -0,0 +1,30 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+
+import click
+
+from merkle import MerkleProofs
+
+
+@click.command()
+@click.argument('proof-file', type=click.File('rb'))
+@click.argument('address')
+def merkle_claims(proof_file, address):
+    click.echo(json.dumps(MerkleProofs(proof_file).claims(address), sort_keys=True))
+
+
+if __name__ == '__main__':
+    merkle_claims()
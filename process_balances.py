@@ -14,21 +14,40 @@
 
 import json
 import logging
+import time
 
 import click
 
-from processor import process
+from airdrops_file import write_airdrops
+from processor import load_balance_table, process_table
 logging.basicConfig(level=logging.INFO)
 
 
 @click.command()
-@click.argument('balances-file', type=click.File('rb'))
+@click.option('--binary', is_flag=True, help='Write the processed airdrops in the binary format, '
+                                             'see airdrops_file.py')
+@click.argument('balances-file', type=click.Path(exists=True, dir_okay=False))
 @click.argument('processed-file', type=click.File('wb'))
-def process_balances(balances_file, processed_file):
+def process_balances(binary, balances_file, processed_file):
 
-    result = process(balances_file.read())
-    out_json = json.dumps(result)
-    processed_file.write(out_json)
+    started = time.time()
+
+    table = load_balance_table(balances_file)
+    _log_throughput("Loaded and decoded", len(table), started)
+
+    result = process_table(table)
+    _log_throughput("Processed", len(table), started)
+
+    if binary:
+        write_airdrops(processed_file, result)
+    else:
+        out_json = json.dumps(result)
+        processed_file.write(out_json)
+
+
+def _log_throughput(stage, accounts, started):
+    elapsed = max(time.time() - started, 1e-6)
+    logging.info("{} {} accounts in {:.1f}s: {:.0f} accounts/sec".format(stage, accounts, elapsed, accounts / elapsed))
 
 
 if __name__ == '__main__':
@@ -12,24 +12,250 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import binascii
 import gc
+import importlib
 import json
 import logging
+import os
+from array import array
+from fractions import Fraction
+from itertools import izip, islice
 
-from web3 import Web3
+import ijson.backends.python
 
 from constants import RESERVE_AIRDROP, TOTAL_ETH, CUTOFF, TOLERANCE, TOTALSUPPLY, DEAD, TOTAL_ETH_ABOVE_CUTOFF
 
+# ijson backends to stream the dump with, fastest first, the C ones need yajl (bundled by the ijson wheels)
+IJSON_BACKENDS = ('yajl2_c', 'yajl2_cffi', 'yajl2')
 
-def process(input):
+# positions of the brackets to canonicalize in the Parity dump, the right one is counted from the end
+LBRACKET_INDEX = 11
+RBRACKET_OFFSET = 2
+
+# widths of the columns in the BalanceTable, in bytes
+ADDRESS_WIDTH = 20
+BALANCE_WIDTH = 32
+# how many accounts to decode at once when filling a BalanceTable
+DECODE_CHUNK = 2 ** 16
+# buckets of accounts this small are sorted by their balances directly, instead of by yet another byte
+SORT_BUCKET = 256
+
+
+class CanonicalizingReader(object):
+    """
+    File-like wrapper over a Parity state dump, which canonicalizes the json on the fly
+    by changing 2 brackets from '[]' to '{}' (see `process`), as the dump is being read
+    """
+
+    def __init__(self, f, size):
+        self.f = f
+        self.position = 0
+        self.brackets = {LBRACKET_INDEX: ('[', '{'),
+                         size - RBRACKET_OFFSET: (']', '}')}
+
+    def read(self, size=-1):
+        chunk = self.f.read(size)
+        start = self.position
+        self.position += len(chunk)
+
+        for index, (old, new) in self.brackets.items():
+            if start <= index < self.position:
+                offset = index - start
+                assert chunk[offset] == old
+                chunk = chunk[:offset] + new + chunk[offset + 1:]
+
+        return chunk
+
+
+class BalanceTable(object):
+    """
+    Compact, columnar table of accounts' balances.
+    Addresses are kept as 20-byte binary and balances as 256-bit big-endian integers,
+    each column in a single contiguous buffer, so there are no per-account python objects held.
+    Big-endian fixed-width balances compare as byte strings exactly like the integers they encode.
+    """
+
+    def __init__(self):
+        self.addresses = bytearray()
+        self.balances = bytearray()
+
+    def __len__(self):
+        return len(self.addresses) // ADDRESS_WIDTH
+
+    def append(self, address, balance):
+        """
+        :param address: hex address, 0x-prefixed
+        :param balance: integer balance
+        """
+        raw_address = binascii.unhexlify(address[2:])
+        assert len(raw_address) == ADDRESS_WIDTH
+        self.addresses += raw_address
+        self.balances += _encode_balance(balance)
+
+    def extend(self, addresses, hex_balances):
+        """
+        Appends accounts in bulk, decoding hex balances straight into the balances column, chunk by chunk
+        :param addresses: hex addresses, 0x-prefixed
+        :param hex_balances: hex balances as found in the state dump, 0x-prefixed, where "0x" means 0
+        """
+        addresses = iter(addresses)
+        hex_balances = iter(hex_balances)
+
+        while True:
+            raw_addresses = decode_hex(islice(addresses, DECODE_CHUNK), ADDRESS_WIDTH, pad=False)
+            raw_balances = decode_hex(islice(hex_balances, DECODE_CHUNK), BALANCE_WIDTH)
+            assert len(raw_addresses) // ADDRESS_WIDTH == len(raw_balances) // BALANCE_WIDTH
+
+            if not raw_addresses:
+                break
+
+            self.addresses += raw_addresses
+            self.balances += raw_balances
+
+    def address(self, index):
+        return '0x' + binascii.hexlify(self.addresses[index * ADDRESS_WIDTH:(index + 1) * ADDRESS_WIDTH])
+
+    def balance(self, index):
+        return int(binascii.hexlify(self.balance_key(index)), 16)
+
+    def balance_key(self, index):
+        """
+        Raw encoded balance, to be used as a sorting key
+        """
+        return bytes(self.balances[index * BALANCE_WIDTH:(index + 1) * BALANCE_WIDTH])
+
+    def balances_at(self, indices):
+        return (self.balance(index) for index in indices)
+
+    def total(self, indices=None):
+        if indices is None:
+            indices = xrange(len(self))
+        return sum(self.balances_at(indices))
+
+    def sortorder(self, indices=None):
+        """
+        Sorts with a most-significant-byte-first radix sort, distributing indices into arrays by the balances' bytes,
+        so that only buckets of up to SORT_BUCKET accounts ever have sorting keys made for them
+        :param indices: indices of accounts to sort, all accounts by default
+        :return: array of indices of accounts, ordered by balance descending, ties keep their original order
+        """
+        if indices is None:
+            indices = xrange(len(self))
+
+        # balances are mostly leading zero bytes, so first bucket by the number of significant bytes
+        by_length = [array('I') for _ in xrange(BALANCE_WIDTH + 1)]
+        for index in indices:
+            balance = self.balances[index * BALANCE_WIDTH:(index + 1) * BALANCE_WIDTH]
+            by_length[len(balance.lstrip('\x00'))].append(index)
+
+        order = array('I')
+        for length in xrange(BALANCE_WIDTH, -1, -1):
+            self._radix_sort(by_length[length], BALANCE_WIDTH - length, order)
+            by_length[length] = None
+        return order
+
+    def _radix_sort(self, indices, byte, order):
+        """
+        Appends the indices to `order`, sorted by balance descending, all of them having equal balance bytes before `byte`
+        """
+        if len(indices) <= SORT_BUCKET or byte == BALANCE_WIDTH:
+            order.extend(sorted(indices, key=self.balance_key, reverse=True))
+            return
+
+        buckets = [array('I') for _ in xrange(256)]
+        for index in indices:
+            buckets[self.balances[index * BALANCE_WIDTH + byte]].append(index)
+
+        for value in xrange(255, -1, -1):
+            if buckets[value]:
+                self._radix_sort(buckets[value], byte + 1, order)
+                buckets[value] = None
+
+    def partition(self, cutoff):
+        """
+        Splits the accounts into the ones with balance above cutoff and the rest, in a single pass
+        :return: array of indices of accounts above cutoff (in original order), the largest balance of the rest
+        """
+        cutoff_key = _encode_balance(cutoff)
+        above = array('I')
+        largest_rest_key = _encode_balance(0)
+
+        for index in xrange(len(self)):
+            key = self.balance_key(index)
+            if key > cutoff_key:
+                above.append(index)
+            elif key > largest_rest_key:
+                largest_rest_key = key
+
+        return above, int(binascii.hexlify(largest_rest_key), 16)
+
+
+def decode_hex(hex_values, width, pad=True):
+    """
+    Decodes a column of 0x-prefixed hex values into fixed-width big-endian binary, in one pass
+    :param pad: if True, values shorter than `width` bytes (including the empty "0x") are zero-padded,
+                otherwise every value must be exactly `width` bytes, like addresses
+    :return: binary string of `width` bytes per value
+    """
+    digits = 2 * width
+    hex_values = [value[2:] for value in hex_values]
+    if pad:
+        assert all(len(value) <= digits for value in hex_values), "hex value wider than {} bytes".format(width)
+        hex_values = [value.zfill(digits) for value in hex_values]
+    else:
+        assert all(len(value) == digits for value in hex_values), "hex value not exactly {} bytes".format(width)
+    return binascii.unhexlify(''.join(hex_values))
+
+
+def _encode_balance(balance):
+    return binascii.unhexlify('{:064x}'.format(balance))
+
+
+def read_balances(path):
+    """
+    Streams the Parity state dump from a file, keeping only the balances of accounts
+    :param path: path to the state dump
+    :return: dict address -> hex balance, keyed in the same order as `process` would see the state
+    """
+    balances = {}
+    backend = ijson_backend()
+    logging.info("Streaming the state dump with {}".format(backend.__name__))
+
+    with open(path, 'rb') as f:
+        reader = CanonicalizingReader(f, os.path.getsize(path))
+        for prefix, event, value in backend.parse(reader):
+            if event != 'string':
+                continue
+            split_prefix = prefix.split('.')
+            if len(split_prefix) == 3 and split_prefix[0] == 'state' and split_prefix[2] == 'balance':
+                balances[split_prefix[1]] = value
+
+    return balances
+
+
+def ijson_backend():
+    """
+    :return: the fastest ijson backend installed, the pure Python one, many times slower, if none of IJSON_BACKENDS is
+    """
+    for name in IJSON_BACKENDS:
+        try:
+            return importlib.import_module('ijson.backends.' + name)
+        except ImportError:
+            continue
+    return ijson.backends.python
+
+
+def process(input, total_eth=TOTAL_ETH, total_eth_above_cutoff=TOTAL_ETH_ABOVE_CUTOFF):
+    """
+    Processes the Parity state dump given as a string, requires the entire dump to fit in RAM multiple times
+    """
     logging.info("Started processing...")
-    # sanity check - reserve must be 5% of OMG supply
-    assert 1.0 * RESERVE_AIRDROP / TOTALSUPPLY == 0.05
 
     # need to canonicalize the json by changing 2 brackets from '[]' to '{}':
     # this seems to only be necessary with Parity dumps
-    lbracket_index = 11
-    rbracket_index = len(input) - 2
+    lbracket_index = LBRACKET_INDEX
+    rbracket_index = len(input) - RBRACKET_OFFSET
     input = input[:lbracket_index] + '{' + input[lbracket_index + 1:]
     input = input[:rbracket_index] + '}' + input[rbracket_index + 1:]
 
@@ -40,52 +266,82 @@ def process(input):
 
     gc.collect()
 
-    addresses = input['state'].keys()
-    balances = [accounts['balance'] for accounts in input['state'].values()]
+    table = BalanceTable()
+    table.extend(input['state'].iterkeys(), (account['balance'] for account in input['state'].itervalues()))
     input = None
     gc.collect()
-    int_balances = [Web3.toDecimal(bal) if bal != "0x" else 0 for bal in balances]
     logging.info("Extracted balances")
 
-    assert sum(int_balances) == TOTAL_ETH
+    return process_table(table, total_eth, total_eth_above_cutoff)
 
-    sortorder = sorted(range(len(int_balances)), key=lambda k: int_balances[k], reverse=True)
 
-    sorted_all_balances = [int_balances[i] for i in sortorder]
+def load_balance_table(path):
+    """
+    Streams the Parity state dump from a file into a BalanceTable
+    """
+    state = read_balances(path)
+    logging.info("Streamed json")
 
-    # extract only top N, discard the rest
-    # N is the lowest index, where balance is less equal than cutoff
-    # we have N balances that are eligible
-    N = next(index for index in xrange(len(sorted_all_balances)) if sorted_all_balances[index] <= CUTOFF)
+    # kept in a dict until now, so that the order of accounts (ties in sorting) is the same as in `process`
+    table = BalanceTable()
+    table.extend(state.iterkeys(), state.itervalues())
+    logging.info("Extracted balances")
 
-    # sanity
-    assert sorted_all_balances[N + 1 - 1] == CUTOFF  # the largest non-eligible is exactly cutoff (it's exclusive)
-    assert sorted_all_balances[N - 1] > CUTOFF  # the smallest eligible has more than cutoff
+    return table
+
+
+def process_file(path, total_eth=TOTAL_ETH, total_eth_above_cutoff=TOTAL_ETH_ABOVE_CUTOFF):
+    """
+    Processes the Parity state dump streamed from a file, memory used scales with the number of accounts only
+    """
+    logging.info("Started processing...")
+
+    return process_table(load_balance_table(path), total_eth, total_eth_above_cutoff)
+
+
+def process_table(table, total_eth=TOTAL_ETH, total_eth_above_cutoff=TOTAL_ETH_ABOVE_CUTOFF):
+    """
+    Turns the balances of all accounts into airdrops
+    :param table: BalanceTable with all the accounts in the state
+    :param total_eth: golden number the balances of all accounts must add up to, the default is at 3988888.
+                      Other than for synthetic dumps (see benchmarks/parity_dump.py), leave the defaults
+    :param total_eth_above_cutoff: same, for the balances of the eligible accounts
+    :return: list of address-amount pairs, sorted by the amount descending
+    """
+    # sanity check - reserve must be 5% of OMG supply
+    assert 1.0 * RESERVE_AIRDROP / TOTALSUPPLY == 0.05
+
+    assert table.total() == total_eth
+
+    # extract only N eligible accounts, discard the rest, and sort only the eligible ones
+    # eligible are the accounts with balance above cutoff
+    eligible, largest_non_eligible = table.partition(CUTOFF)
+    N = len(eligible)
 
-    sortorder = sortorder[0:N]
+    sortorder = table.sortorder(eligible)
 
-    sorted_balances = [int_balances[i] for i in sortorder]
-    sorted_addresses = [addresses[i] for i in sortorder]
+    # sanity
+    assert largest_non_eligible == CUTOFF  # the largest non-eligible is exactly cutoff (it's exclusive)
+    assert table.balance(sortorder[N - 1]) > CUTOFF  # the smallest eligible has more than cutoff
 
     logging.info("Sorted and cut off eligible accounts: {} eligible".format(N))
 
-    sum_balances = sum(sorted_balances)
+    sum_balances = table.total(sortorder)
 
     # sanity golden number check
-    assert sum_balances == TOTAL_ETH_ABOVE_CUTOFF
+    assert sum_balances == total_eth_above_cutoff
 
-    airdrops = [bal * RESERVE_AIRDROP / sum_balances for bal in sorted_balances]
+    airdrops, remainder = allocate(table.balances_at(sortorder), sum_balances, RESERVE_AIRDROP)
 
     # check whether shares of airdrops do not deviate too much from shares of ETH balances
-    assert all([abs(1.0 * item[0] / sum_balances - 1.0 * item[1] / RESERVE_AIRDROP) < TOLERANCE
-                for item in zip(sorted_balances, airdrops)])
-
-    remainder = RESERVE_AIRDROP - sum(airdrops)
+    deviating = find_deviation(table.balances_at(sortorder), airdrops, sum_balances, RESERVE_AIRDROP)
+    assert deviating is None, "airdrop {} deviates from the ETH balance share".format(deviating)
 
     # check whether the remainder is small
     assert remainder <= 10**9
 
     # direct the remainder towards burn address
+    sorted_addresses = [table.address(i) for i in sortorder]
     sorted_addresses.append(DEAD)
     airdrops.append(remainder)
 
@@ -98,3 +354,29 @@ def process(input):
                                ret[-1][0], ret[-1][1]))
 
     return ret
+
+
+def allocate(balances, sum_balances, reserve):
+    """
+    Splits the reserve pro-rata to the balances, rounding every share down,
+    exactly as `audits/phildaian/check_transactions.py` expects
+    :return: list of shares, remainder of the reserve left over due to rounding
+    """
+    shares = [balance * reserve // sum_balances for balance in balances]
+    return shares, reserve - sum(shares)
+
+
+def find_deviation(balances, shares, sum_balances, reserve, tolerance=TOLERANCE):
+    """
+    Checks whether |balance / sum_balances - share / reserve| < tolerance for every balance-share pair.
+    Done exactly in integer arithmetic, by multiplying through by sum_balances * reserve * tolerance's denominator
+    :return: index of the first pair that deviates, None if none does
+    """
+    tolerance = Fraction(tolerance)
+    bound = tolerance.numerator * sum_balances * reserve
+
+    for index, (balance, share) in enumerate(izip(balances, shares)):
+        if abs(balance * reserve - share * sum_balances) * tolerance.denominator >= bound:
+            return index
+
+    return None
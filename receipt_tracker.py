@@ -0,0 +1,146 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import time
+
+
+class ReceiptTrackerException(Exception):
+    pass
+
+
+class ReceiptTracker(object):
+    """
+    Tracks receipts of sent transactions by following new blocks with a block filter,
+    instead of polling for the receipt of every transaction (like populus' `Wait.for_receipt`).
+    Every new block is read once and resolves all the tracked transactions in it,
+    so the load on the node doesn't grow with the number of transactions awaiting receipts.
+
+    Only transactions mined after the tracker was created are found, so create it before sending
+    """
+
+    def __init__(self, web3, confirmations=1, poll_interval=1, timeout=86400):
+        """
+        :param confirmations: how deep a transaction's block needs to be for its receipt to be returned,
+                              1 means the receipt is returned as soon as the transaction is mined.
+                              Receipts are re-checked at that depth, so reorgs shallower than that are followed
+        """
+        self.web3 = web3
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+        self.pending = set()
+        self.mined = {}  # hash -> receipt, not yet confirmed
+        self.confirmed = {}  # hash -> receipt
+        self.head = web3.eth.blockNumber
+        self.block_hashes = {}  # number -> hash of the blocks read, down to `confirmations` below the head
+        self.filter_id = self._new_filter()
+
+    def track(self, tx_hash):
+        self.pending.add(tx_hash.lower())
+
+    def receipt(self, tx_hash):
+        """
+        :return: receipt of a tracked transaction, once it has enough confirmations, otherwise None
+        """
+        tx_hash = tx_hash.lower()
+        if tx_hash not in self.confirmed:
+            self.poll()
+        return self.confirmed.get(tx_hash)
+
+    def wait_for_receipt(self, tx_hash):
+        started = time.time()
+        while True:
+            receipt = self.receipt(tx_hash)
+            if receipt is not None:
+                return receipt
+            if time.time() - started > self.timeout:
+                raise ReceiptTrackerException("no receipt for {} in {} seconds".format(tx_hash, self.timeout))
+            time.sleep(self.poll_interval)
+
+    def poll(self):
+        """
+        Reads blocks which appeared since the last poll, then re-checks transactions deep enough to be confirmed
+        """
+        try:
+            block_hashes = self.web3._requestManager.request_blocking('eth_getFilterChanges', [self.filter_id])
+        except ValueError:
+            # the node has dropped the filter, e.g. not polled for too long, read the blocks by number instead
+            self.filter_id = self._new_filter()
+            rescan_from = self._rescan_from()
+            logging.warning("block filter lost, rescanning blocks since {}".format(rescan_from))
+            block_hashes = range(rescan_from, self.web3.eth.blockNumber + 1)
+
+        for block_hash in block_hashes:
+            self._read_block(self.web3.eth.getBlock(block_hash))
+
+        self._recheck()
+
+    def close(self):
+        self.web3.eth.uninstallFilter(self.filter_id)
+
+    def _new_filter(self):
+        return self.web3.eth.filter('latest').filter_id
+
+    def _rescan_from(self):
+        """
+        :return: number of the first block to read when the filter was lost: the first one reorged since it was read,
+                 as pending transactions might have been mined there, otherwise the one after the head,
+                 or any block with a mined, unconfirmed transaction
+        """
+        rescan_from = self.head + 1
+        for number in sorted(self.block_hashes):
+            block = self.web3.eth.getBlock(number)
+            if block is None or block['hash'] != self.block_hashes[number]:
+                rescan_from = number
+                break
+        return min([rescan_from] + [receipt['blockNumber'] for receipt in self.mined.values()])
+
+    def _read_block(self, block):
+        if block is None:
+            # reorged away before we got to it
+            return
+
+        # blocks come in the order they became the head, after a reorg the chain might even get shorter
+        self.head = block['number']
+        self.block_hashes[self.head] = block['hash']
+        for number in self.block_hashes.keys():
+            if number > self.head or number < self.head - self.confirmations:
+                del self.block_hashes[number]
+
+        for tx_hash in block['transactions']:
+            tx_hash = tx_hash.lower()
+            if tx_hash in self.pending:
+                receipt = self.web3.eth.getTransactionReceipt(tx_hash)
+                if receipt is not None:
+                    self.pending.remove(tx_hash)
+                    self.mined[tx_hash] = receipt
+
+    def _recheck(self):
+        for tx_hash, receipt in self.mined.items():
+            if self.head - receipt['blockNumber'] + 1 < self.confirmations:
+                continue
+
+            current = self.web3.eth.getTransactionReceipt(tx_hash)
+            if current is None:
+                logging.warning("transaction {} reorged out of block {}".format(tx_hash, receipt['blockNumber']))
+                del self.mined[tx_hash]
+                self.pending.add(tx_hash)
+            elif self.head - current['blockNumber'] + 1 < self.confirmations:
+                # mined again in another block by a reorg, needs to get deep enough there
+                self.mined[tx_hash] = current
+            else:
+                del self.mined[tx_hash]
+                self.confirmed[tx_hash] = current
@@ -14,12 +14,19 @@
 
 import logging
 import json
+import threading
+from functools import partial
 
 import click
 from web3 import Web3, IPCProvider
 from web3.providers.rpc import RPCProvider
 
-from utils import Sender
+from batch_rpc import BatchRPC, provider_endpoint
+from constants import RPC_BATCH_SIZE, RPC_CONCURRENCY
+from lanes import lane_paths, run_lanes
+from receipt_tracker import ReceiptTracker
+from signed_index import load_index
+from utils import Sender, check_transactions
 
 logging.basicConfig(level=logging.INFO)
 
@@ -32,10 +39,24 @@ logging.basicConfig(level=logging.INFO)
               is_flag=True,
               help='Should the already sent transactions be filtered out'
                    'in case of recovering from sender crash')
-@click.argument('final-check-unsigned-file', type=click.File('rb'))
-@click.argument('signed-file', type=click.File('rb'))
-def send_txs(ipc_path, rpc_host, rpc_port, recovery_mode,
-             final_check_unsigned_file, signed_file):
+@click.option('--window', default=1,
+              help='How many transactions to have sent and waiting for receipts at once. '
+                   'With 1, every transaction waits for the receipt of the previous one')
+@click.option('--confirmations', type=int, default=None,
+              help='Follow new blocks for receipts of all sent transactions at once, '
+                   'instead of polling for every transaction. Receipts count once this many blocks deep')
+@click.option('--rpc-batch-size', default=RPC_BATCH_SIZE,
+              help='With --recovery-mode, how many receipt requests to send in a single JSON-RPC batch')
+@click.option('--rpc-concurrency', default=RPC_CONCURRENCY,
+              help='With --recovery-mode, how many JSON-RPC batches to have in flight at once')
+@click.option('--workers', default=1, help='How many processes to verify the transactions in before sending')
+@click.option('--lanes', default=1,
+              help='How many lanes the transactions were created in, all are sent concurrently. '
+                   'If any lane fails, the others stop sending too')
+@click.argument('final-check-unsigned-file', type=click.Path(dir_okay=False))
+@click.argument('signed-file', type=click.Path(dir_okay=False))
+def send_txs(ipc_path, rpc_host, rpc_port, recovery_mode, window, confirmations, rpc_batch_size, rpc_concurrency, workers,
+             lanes, final_check_unsigned_file, signed_file):
 
     if ipc_path and (rpc_host or rpc_port):
         raise Exception("both ipc and rpc cannot be specified")
@@ -45,15 +66,41 @@ def send_txs(ipc_path, rpc_host, rpc_port, recovery_mode,
         web3 = Web3(RPCProvider(host=rpc_host,
                                 port=rpc_port))
 
-    sender = Sender(web3)
+    batch_rpc = BatchRPC(provider_endpoint(web3.currentProvider), rpc_batch_size, rpc_concurrency)
+    stop = threading.Event()
 
-    signed = json.loads(signed_file.read())
-    final_check_local_transactions = json.loads(final_check_unsigned_file.read())
+    signed_paths = lane_paths(signed_file, lanes)
+    signed_lanes, unsigned_lanes = [], []
+    for unsigned_path, signed_path in zip(lane_paths(final_check_unsigned_file, lanes), signed_paths):
+        with open(signed_path, 'rb') as f:
+            signed_lanes.append(json.loads(f.read()))
+        with open(unsigned_path, 'rb') as f:
+            unsigned_lanes.append(json.loads(f.read()))
 
-    if recovery_mode:
-        signed, final_check_local_transactions = sender.recover_unsent(signed, final_check_local_transactions)
+    # every lane verified here, in the main thread, forking the verifying processes from the lanes' threads
+    # could deadlock them
+    for signed, final_check_local_transactions in zip(signed_lanes, unsigned_lanes):
+        check_transactions(signed, final_check_local_transactions, workers=workers)
 
-    sender.send_transactions(signed, final_check_local_transactions)
+    def send_lane(signed_path, signed, final_check_local_transactions):
+        tracker = ReceiptTracker(web3, confirmations=confirmations) if confirmations else None
+
+        sender = Sender(web3, window=window, tracker=tracker, batch_rpc=batch_rpc,
+                        signed_index=load_index(signed_path, signed), stop=stop)
+
+        if recovery_mode:
+            signed, final_check_local_transactions = sender.recover_unsent(signed, final_check_local_transactions)
+
+        try:
+            sender.send_transactions(signed, final_check_local_transactions, verified=True)
+        finally:
+            if tracker:
+                tracker.close()
+
+    run_lanes([partial(send_lane, signed_path, signed, final_check_local_transactions)
+               for signed_path, signed, final_check_local_transactions in zip(signed_paths, signed_lanes,
+                                                                              unsigned_lanes)],
+              stop=stop)
 
 
 if __name__ == '__main__':
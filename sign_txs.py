@@ -15,27 +15,61 @@
 import logging
 import json
 
+from functools import partial
+
 import click
 from web3 import Web3, IPCProvider
 
-from utils import Signer
+from batch_rpc import BatchRPC, provider_endpoint
+from constants import RPC_BATCH_SIZE, RPC_CONCURRENCY
+from lanes import lane_paths, run_lanes
+from utils import Signer, LocalSigner
 
 logging.basicConfig(level=logging.INFO)
 
 
 @click.command()
 @click.option('--ipc-path', help='The IPC to connect to.')
-@click.argument('unsigned-file', type=click.File('rb'))
-@click.argument('signed-file', type=click.File('wb'))
-def sign_txs(ipc_path, unsigned_file, signed_file):
-    web3 = Web3(IPCProvider(ipc_path))
-    signer = Signer(web3)
+@click.option('--bulk', is_flag=True, help='Have the node sign in JSON-RPC batches, several batches in flight')
+@click.option('--rpc-batch-size', default=RPC_BATCH_SIZE, help='With --bulk, how many transactions per JSON-RPC batch')
+@click.option('--rpc-concurrency', default=RPC_CONCURRENCY, help='With --bulk, how many JSON-RPC batches in flight')
+@click.option('--keystore', type=click.File('rb'), multiple=True,
+              help='Sign locally with the key from this keystore file, instead of with the node. '
+                   'With --lanes, one keystore per lane, in lane order')
+@click.option('--workers', default=1, help='With --keystore, how many processes to sign in')
+@click.option('--chain-id', type=int, default=None,
+              help='With --keystore, sign replay-protected (EIP-155) transactions for this chain id')
+@click.option('--lanes', default=1, help='How many lanes the transactions were created in, all are signed concurrently')
+@click.argument('unsigned-file', type=click.Path(dir_okay=False))
+@click.argument('signed-file', type=click.Path(dir_okay=False))
+def sign_txs(ipc_path, bulk, rpc_batch_size, rpc_concurrency, keystore, workers, chain_id, lanes,
+             unsigned_file, signed_file):
+    if keystore:
+        if len(keystore) != lanes:
+            raise Exception("one keystore per lane needed, {} keystores for {} lanes".format(len(keystore), lanes))
+        signers = []
+        for lane_keystore in keystore:
+            password = click.prompt('Keystore password for {}'.format(lane_keystore.name), hide_input=True)
+            signers.append(LocalSigner.from_keystore(json.loads(lane_keystore.read()), password,
+                                                     workers=workers, chain_id=chain_id))
+    else:
+        web3 = Web3(IPCProvider(ipc_path))
+        batch_rpc = BatchRPC(provider_endpoint(web3.currentProvider), rpc_batch_size, rpc_concurrency) if bulk else None
+        signers = [Signer(web3, batch_rpc=batch_rpc)] * lanes
+
+    run_lanes([partial(_sign_lane, signer, unsigned_path, signed_path)
+               for signer, unsigned_path, signed_path in zip(signers, lane_paths(unsigned_file, lanes),
+                                                             lane_paths(signed_file, lanes))])
+
 
-    unsigned = json.loads(unsigned_file.read())
+def _sign_lane(signer, unsigned_path, signed_path):
+    with open(unsigned_path, 'rb') as f:
+        unsigned = json.loads(f.read())
 
     signed = signer.sign_transactions(unsigned)
 
-    signed_file.write(json.dumps(signed))
+    with open(signed_path, 'wb') as f:
+        f.write(json.dumps(signed))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Sidecar index of decoded signed transactions, so that `signed.json` is RLP-decoded once, not on every recovery.
+Checks before sending don't use it, they decode the signedRaw which gets broadcast
+
+Layout (all integers big-endian):
+ - header: magic (8 bytes), version (2 bytes), reserved (2 bytes), number of records (8 bytes),
+   SHA256 of the signed transactions file the index is for (32 bytes)
+ - records: nonce, gas price, gas (8 bytes each), to (20 bytes), value (32 bytes), keccak of data (32 bytes),
+   transaction hash (32 bytes), sender (20 bytes), one per signed transaction, in the order of the signed file
+"""
+
+import binascii
+import hashlib
+import os
+import struct
+from collections import namedtuple
+
+import rlp
+from ethereum.transactions import Transaction, UnsignedTransaction
+from ethereum.utils import sha3
+from secp256k1 import ALL_FLAGS, PublicKey
+
+MAGIC = 'OMGSIGN\x00'
+VERSION = 1
+HEADER = struct.Struct('>8sHHQ32s')
+RECORD = struct.Struct('>QQQ20s32s32s32s20s')
+
+
+class SignedIndexException(Exception):
+    pass
+
+
+class DecodedTransaction(namedtuple('DecodedTransaction', 'nonce gasprice startgas to value data_hash hash sender')):
+    """
+    The fields of a signed transaction needed to check and track it, binary ones as raw bytes
+    """
+
+
+def decode_signed(signed_raw):
+    """
+    :param signed_raw: 0x-prefixed hex of a signed transaction, as in signed.json
+    :return: DecodedTransaction
+    """
+    decoded = rlp.decode(binascii.unhexlify(signed_raw[2:]), Transaction)
+    return DecodedTransaction(decoded.nonce, decoded.gasprice, decoded.startgas, decoded.to, decoded.value,
+                              sha3(decoded.data), decoded.hash, signer_address(decoded))
+
+
+def signer_address(decoded):
+    """
+    Recovers the signer of a transaction, also of a replay-protected (EIP-155) one,
+    which pyethereum 1.6.1's `Transaction.sender` can't do
+    :param decoded: signed Transaction
+    :return: 20 bytes
+    """
+    if decoded.v in (27, 28):
+        rawhash = sha3(rlp.encode(decoded, UnsignedTransaction))
+        recovery_id = decoded.v - 27
+    else:
+        chain_id = (decoded.v - 35) // 2
+        rawhash = sha3(rlp.encode(Transaction(decoded.nonce, decoded.gasprice, decoded.startgas, decoded.to,
+                                              decoded.value, decoded.data, v=chain_id)))
+        recovery_id = decoded.v - 35 - 2 * chain_id
+
+    key = _recovery_key()
+    signature = binascii.unhexlify('{:064x}{:064x}'.format(decoded.r, decoded.s))
+    key.public_key = key.ecdsa_recover(rawhash, key.ecdsa_recoverable_deserialize(signature, recovery_id), raw=True)
+
+    return sha3(key.serialize(compressed=False)[1:])[-20:]
+
+
+_recovery_keys = []
+
+
+def _recovery_key():
+    """
+    PublicKey to recover with, cached per process, since creating its secp256k1 context costs more than recovering
+    """
+    if not _recovery_keys:
+        _recovery_keys.append(PublicKey(flags=ALL_FLAGS))
+    return _recovery_keys[0]
+
+
+def write_index(f, signed_sha256, decoded_transactions):
+    f.write(HEADER.pack(MAGIC, VERSION, 0, len(decoded_transactions), signed_sha256))
+    for decoded in decoded_transactions:
+        f.write(RECORD.pack(decoded.nonce, decoded.gasprice, decoded.startgas, decoded.to.rjust(20, '\x00'),
+                            binascii.unhexlify('{:064x}'.format(decoded.value)),
+                            decoded.data_hash, decoded.hash, decoded.sender))
+
+
+def read_index(f, signed_sha256):
+    """
+    :return: list of DecodedTransaction
+    """
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise SignedIndexException("file too short for the header")
+
+    magic, version, _, count, indexed_sha256 = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise SignedIndexException("not a signed transactions index of version {}".format(VERSION))
+    if indexed_sha256 != signed_sha256:
+        raise SignedIndexException("index is for another signed transactions file")
+
+    records = f.read()
+    if len(records) != count * RECORD.size:
+        raise SignedIndexException("file length doesn't match {} records".format(count))
+
+    decoded_transactions = []
+    for offset in xrange(0, len(records), RECORD.size):
+        nonce, gasprice, startgas, to, value, data_hash, tx_hash, sender = RECORD.unpack_from(records, offset)
+        decoded_transactions.append(DecodedTransaction(nonce, gasprice, startgas, to, int(binascii.hexlify(value), 16),
+                                                       data_hash, tx_hash, sender))
+    return decoded_transactions
+
+
+def load_index(signed_path, transactions, index_path=None):
+    """
+    Reads the sidecar index of the signed transactions file, (re)building it first if it's missing or stale
+    :param transactions: signed transactions, as loaded from `signed_path`
+    :param index_path: by default `signed_path` with .index appended
+    :return: dict of signedRaw to DecodedTransaction
+    """
+    index_path = index_path or signed_path + '.index'
+
+    with open(signed_path, 'rb') as f:
+        signed_sha256 = hashlib.sha256(f.read()).digest()
+
+    decoded_transactions = None
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'rb') as f:
+                decoded_transactions = read_index(f, signed_sha256)
+        except SignedIndexException:
+            pass
+
+    if decoded_transactions is None or len(decoded_transactions) != len(transactions):
+        decoded_transactions = [decode_signed(transaction['signedRaw']) for transaction in transactions]
+        with open(index_path + '.tmp', 'wb') as f:
+            write_index(f, signed_sha256, decoded_transactions)
+        os.rename(index_path + '.tmp', index_path)
+
+    return {transaction['signedRaw']: decoded for transaction, decoded in zip(transactions, decoded_transactions)}
@@ -12,15 +12,82 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import json
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
 import py.test
+import pytest
+
+from chain_backend import BACKENDS
 
 
 def pytest_addoption(parser):
     parser.addoption('--slow', action='store_true', default=False,
                      help='Also run slow tests')
+    parser.addoption('--chain', choices=BACKENDS, default='geth',
+                     help='Chain to run the tests needing one against: the geth dev node, '
+                          'or an in-process tester chain, see chain_backend.py')
 
 
 def pytest_runtest_setup(item):
     """Skip tests if they are marked as slow and --slow is not given"""
     if getattr(item.obj, 'slow', None) and not item.config.getvalue('slow'):
         py.test.skip('slow tests not requested')
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubRPCHandler(BaseHTTPRequestHandler):
+    """
+    Answers JSON-RPC requests (single and batched) with `self.server.methods`
+    """
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.payloads.append(payload)
+
+        if isinstance(payload, list):
+            response = [self._respond(request) for request in payload]
+        else:
+            response = self._respond(payload)
+
+        body = json.dumps(response)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond(self, request):
+        try:
+            result = self.server.methods[request['method']](*request['params'])
+        except Exception as e:
+            return dict(jsonrpc="2.0", id=request['id'], error=dict(code=-32000, message=str(e)))
+        return dict(jsonrpc="2.0", id=request['id'], result=result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def stub_rpc():
+    """
+    Local stub JSON-RPC server, set `methods` to handle requests, `payloads` records what was received
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubRPCHandler)
+    server.methods = {}
+    server.payloads = []
+    server.uri = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
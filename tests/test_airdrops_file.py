@@ -0,0 +1,81 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+
+import pytest
+
+from airdrops_file import write_airdrops, load_airdrops, AirdropsFile, AirdropsFileException, HEADER
+from constants import DEAD
+
+
+@pytest.fixture()
+def airdrops():
+    return [['0x' + '{:040x}'.format(i * 7919), i * 10 ** 20 + 7] for i in xrange(1, 300)] + [[DEAD, 240306]]
+
+
+@pytest.fixture()
+def binary_path(tmpdir, airdrops):
+    path = str(tmpdir.join("processed.bin"))
+    with open(path, 'wb') as f:
+        write_airdrops(f, airdrops)
+    return path
+
+
+def test_roundtrip(binary_path, airdrops):
+    with open(binary_path, 'rb') as f:
+        loaded = load_airdrops(f)
+
+    assert isinstance(loaded, AirdropsFile)
+    assert len(loaded) == len(airdrops)
+    assert list(loaded) == airdrops
+    assert loaded[0] == airdrops[0]
+    assert loaded[-1] == airdrops[-1]
+    assert loaded[89:178] == airdrops[89:178]
+
+    # converting back to json yields exactly what process_balances.py would have written
+    assert json.dumps(list(loaded)) == json.dumps([tuple(airdrop) for airdrop in airdrops])
+
+
+def test_load_json(tmpdir, airdrops):
+    path = tmpdir.join("processed.json")
+    path.write(json.dumps(airdrops))
+
+    with open(str(path), 'rb') as f:
+        assert load_airdrops(f) == airdrops
+
+
+def test_corrupted(binary_path):
+    with open(binary_path, 'r+b') as f:
+        f.seek(HEADER.size + 30)
+        f.write('\xff')
+
+    with open(binary_path, 'rb') as f:
+        with pytest.raises(AirdropsFileException):
+            load_airdrops(f)
+
+
+def test_empty_file(tmpdir):
+    path = tmpdir.join("processed.bin")
+    path.write('')
+
+    with open(str(path), 'rb') as f:
+        with pytest.raises(AirdropsFileException):
+            AirdropsFile(f)
+
+
+def test_uppercase_address_rejected(tmpdir):
+    with open(str(tmpdir.join("processed.bin")), 'wb') as f:
+        with pytest.raises(AirdropsFileException):
+            write_airdrops(f, [['0x' + 'A' * 40, 1]])
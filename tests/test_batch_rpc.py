@@ -0,0 +1,138 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+import rlp
+from ethereum.transactions import Transaction
+from web3 import Web3, HTTPProvider
+
+from batch_rpc import BatchRPC, BatchRPCException
+from constants import BALANCES_BLOCKHEIGHT, RESERVE_AIRDROP, TOTAL_ETH_ABOVE_CUTOFF, GAS_LIMIT, GAS_PRICE, \
+    GAS_RESERVE, BATCH_SIZE
+from utils import Creator, Sender, LocalSigner, AirdropException
+
+
+class StubContract(object):
+    """
+    Just enough of a contract for Creator to verify eth balances without estimating gas
+    """
+    address = '0x' + 'a' * 40
+
+    def __init__(self, web3):
+        self.web3 = web3
+
+
+@pytest.fixture()
+def eth_balances():
+    """
+    eth balances at BALANCES_BLOCKHEIGHT of some accounts, which get airdrops exactly in proportion
+    """
+    return {'0x{:040x}'.format(i): 10 ** 18 + i * 10 ** 20 for i in xrange(1000)}
+
+
+@pytest.fixture()
+def airdrops(eth_balances):
+    return [[address, balance * RESERVE_AIRDROP / TOTAL_ETH_ABOVE_CUTOFF]
+            for address, balance in sorted(eth_balances.items())]
+
+
+@pytest.fixture()
+def get_balance(stub_rpc, eth_balances):
+    def _get_balance(address, block):
+        assert block == Web3.toHex(BALANCES_BLOCKHEIGHT)
+        return Web3.toHex(eth_balances[address])
+
+    stub_rpc.methods['eth_getBalance'] = _get_balance
+
+
+def test_batching(stub_rpc):
+    stub_rpc.methods['echo'] = lambda value: value
+
+    results = BatchRPC(stub_rpc.uri, batch_size=100, concurrency=4).request('echo', [[i] for i in xrange(1234)])
+
+    assert results == range(1234)
+    assert sorted(len(payload) for payload in stub_rpc.payloads) == [34] + [100] * 12
+
+
+def test_error(stub_rpc):
+    def _fail_on_13(value):
+        if value == 13:
+            raise Exception("unlucky")
+        return value
+
+    stub_rpc.methods['fail_on_13'] = _fail_on_13
+
+    with pytest.raises(BatchRPCException):
+        BatchRPC(stub_rpc.uri, batch_size=10, concurrency=2).request('fail_on_13', [[i] for i in xrange(20)])
+
+
+@pytest.fixture()
+def bulk_verifying_creator(stub_rpc, mocker):
+    creator = Creator('0x' + 'b' * 40, StubContract(Web3(None)), StubContract(None), GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                      verify_eth=True, batch_rpc=BatchRPC(stub_rpc.uri, batch_size=200, concurrency=4))
+
+    # transaction creation is not the point here
+    mocker.patch('web3.eth.Eth.getTransactionCount', return_value=0)
+    mocker.patch.object(creator, 'estimate_batch', return_value=GAS_LIMIT - 1)
+
+    return creator
+
+
+def test_verify_eth_in_bulk(stub_rpc, get_balance, airdrops, bulk_verifying_creator):
+    transactions = bulk_verifying_creator.create_txs(airdrops, BATCH_SIZE)
+
+    assert len(transactions) == len(airdrops) / BATCH_SIZE + 1
+    assert len(stub_rpc.payloads) == 5
+
+
+def test_unverifiable_eth_in_bulk(get_balance, airdrops, bulk_verifying_creator):
+    airdrops[500][1] += RESERVE_AIRDROP / 10 ** 10
+
+    with pytest.raises(AirdropException) as e:
+        bulk_verifying_creator.create_txs(airdrops, BATCH_SIZE)
+
+    assert str(airdrops[500]) in str(e.value)
+
+
+def test_recover_unsent_in_bulk(stub_rpc):
+    signer = LocalSigner('\x46' * 32)
+    transactions = signer.sign_transactions(
+        [dict(rawBatch=[['0x' + '35' * 20, 1]],
+              tx={'nonce': Web3.toHex(nonce), 'gasPrice': Web3.toHex(GAS_PRICE), 'gas': Web3.toHex(GAS_LIMIT),
+                  'to': '0x' + '35' * 20, 'value': '0x0', 'data': '0x', 'from': signer.address})
+         for nonce in xrange(5, 25)])
+    hashes = [Web3.toHex(rlp.decode(Web3.toAscii(transaction['signedRaw']), Transaction).hash)
+              for transaction in transactions]
+
+    # first 10 mined, of which one OOG and one replaced by another transaction with the same nonce
+    def _get_transaction_count(address, block):
+        assert address == signer.address
+        return Web3.toHex(15)
+
+    def _get_receipt(tx_hash):
+        index = hashes.index(tx_hash)
+        assert index < 10
+        if index == 7:
+            return None
+        return dict(transactionHash=tx_hash, blockNumber='0x10', gasUsed=Web3.toHex(GAS_LIMIT if index == 3 else 50000),
+                    logs=[])
+
+    stub_rpc.methods['eth_getTransactionCount'] = _get_transaction_count
+    stub_rpc.methods['eth_getTransactionReceipt'] = _get_receipt
+
+    sender = Sender(Web3(HTTPProvider(stub_rpc.uri)), batch_rpc=BatchRPC(stub_rpc.uri, batch_size=4, concurrency=2))
+    unsent, unsent_unsigned = sender.recover_unsent(transactions, transactions)
+
+    assert unsent == unsent_unsigned == [transactions[3], transactions[7]] + transactions[10:]
+    assert len(stub_rpc.payloads) == 1 + 3
@@ -12,6 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import binascii
 import json
 
 import pytest
@@ -19,7 +20,8 @@ from os import urandom
 
 from ethereum.tester import TransactionFailed
 
-from constants import BATCH_SIZE, DEAD, OMGTOKEN_CONTRACT_ABI, OMGTOKEN_CONTRACT_BYTECODE
+from constants import BATCH_SIZE, PACKED_BATCH_SIZE, DEAD, GAS_LIMIT, OMGTOKEN_CONTRACT_ABI, OMGTOKEN_CONTRACT_BYTECODE
+from merkle import build_tree, MerkleProofs
 from utils import deploy_or_at
 
 LARGEST_AMOUNT = 322019907388210865601235  # largest amount for our setup
@@ -74,6 +76,24 @@ def test_logs_on_multisend_sanity_check(token, airdropper, chain, accounts, mint
     assert len(logs) == 2
 
 
+def _packed(account, amount):
+    return binascii.unhexlify('{:024x}'.format(amount)) + (account if len(account) == 20 else binascii.unhexlify(account[2:]))
+
+
+def test_packed_multisend(token, airdropper, chain, accounts, minted_and_credited):
+
+    filter = token.on('Transfer')
+    filter.get()  # flush events from setup
+
+    txn_hash = airdropper.transact().multisendPacked(token.address,
+                                                     [_packed(accounts[1], 10), _packed(accounts[2], LARGEST_AMOUNT)])
+    chain.wait.for_receipt(txn_hash)
+
+    assert len(filter.get()) == 2
+    assert token.call().balanceOf(accounts[1]) == 10
+    assert token.call().balanceOf(accounts[2]) == LARGEST_AMOUNT
+
+
 def test_ownership(token, airdropper, accounts, minted_and_credited):
     with pytest.raises(TransactionFailed):
         airdropper.transact({'from': accounts[1]}).multisend(token.address, accounts[1:2], [10])
@@ -107,3 +127,75 @@ def test_list_processing_and_cost(token, airdropper, chain, minted_and_credited)
         assert token.call().balanceOf(account) == LARGEST_AMOUNT
 
     assert peracc <= 33000  # golden number
+
+
+def test_packed_list_processing_and_cost(token, airdropper, chain, minted_and_credited):
+    count = PACKED_BATCH_SIZE
+    chain.wait.for_receipt(token.transact().mint(airdropper.address, (count - BATCH_SIZE) * LARGEST_AMOUNT))
+
+    # worst case: every beneficiary a new holder, every amount the largest
+    beneficiaries = [urandom(20) for _ in xrange(count)]
+    txn_hash = airdropper.transact().multisendPacked(token.address,
+                                                     [_packed(account, LARGEST_AMOUNT) for account in beneficiaries])
+
+    gas_used = chain.web3.eth.getTransactionReceipt(txn_hash)['gasUsed']
+    peracc = gas_used / count
+    for account in beneficiaries:
+        assert token.call().balanceOf(account) == LARGEST_AMOUNT
+
+    assert peracc <= 32000  # golden number, a word of calldata per account instead of two
+    assert gas_used < GAS_LIMIT
+
+
+def test_packed_cost(token, airdropper, chain, minted_and_credited):
+    count = BATCH_SIZE / 2
+    beneficiaries = [urandom(20) for _ in xrange(2 * count)]
+
+    txn_hash = airdropper.transact().multisend(token.address, beneficiaries[:count], [LARGEST_AMOUNT] * count)
+    gas = chain.web3.eth.getTransactionReceipt(txn_hash)['gasUsed']
+
+    txn_hash = airdropper.transact().multisendPacked(token.address,
+                                                     [_packed(account, LARGEST_AMOUNT) for account in beneficiaries[count:]])
+    packed_gas = chain.web3.eth.getTransactionReceipt(txn_hash)['gasUsed']
+
+    for account in beneficiaries:
+        assert token.call().balanceOf(account) == LARGEST_AMOUNT
+    assert packed_gas < gas
+
+
+def test_merkle_claims(token, chain, accounts, minted_and_credited, tmpdir):
+    airdrops = [[account, 10 * (i + 1)] for i, account in enumerate(accounts[1:6])]
+    proof_path = str(tmpdir.join("proofs.bin"))
+    root = build_tree(airdrops, proof_path)
+
+    deadline = chain.web3.eth.getBlock('latest')['timestamp'] + 3600
+    merkle_airdrop, _ = chain.provider.get_or_deploy_contract('MerkleAirdrop',
+                                                              deploy_args=[token.address, root, deadline])
+    chain.wait.for_receipt(token.transact().transfer(merkle_airdrop.address, sum(amount for _, amount in airdrops)))
+
+    with open(proof_path, 'rb') as f:
+        proofs = MerkleProofs(f)
+        claim, late_claim = proofs.claims(accounts[2])[0], proofs.claims(accounts[3])[0]
+        proof = [binascii.unhexlify(node[2:]) for node in claim['proof']]
+        late_proof = [binascii.unhexlify(node[2:]) for node in late_claim['proof']]
+
+    # anyone can claim for the account, but only the right amount and only once
+    with pytest.raises(TransactionFailed):
+        merkle_airdrop.transact().claim(claim['index'], claim['account'], claim['amount'] + 1, proof)
+
+    merkle_airdrop.transact({'from': accounts[7]}).claim(claim['index'], claim['account'], claim['amount'], proof)
+    assert token.call().balanceOf(accounts[2]) == 20
+
+    with pytest.raises(TransactionFailed):
+        merkle_airdrop.transact().claim(claim['index'], claim['account'], claim['amount'], proof)
+
+    # the owner takes back what's left unclaimed, only after the deadline, when nothing can be claimed anymore
+    with pytest.raises(TransactionFailed):
+        merkle_airdrop.transact().withdraw(token.call().balanceOf(merkle_airdrop.address))
+
+    chain.web3.testing.timeTravel(deadline + 1)
+    with pytest.raises(TransactionFailed):
+        merkle_airdrop.transact().claim(late_claim['index'], late_claim['account'], late_claim['amount'], late_proof)
+
+    merkle_airdrop.transact().withdraw(token.call().balanceOf(merkle_airdrop.address))
+    assert token.call().balanceOf(merkle_airdrop.address) == 0
@@ -0,0 +1,67 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import binascii
+import random
+
+import pytest
+from eth_abi import encode_abi
+from ethereum.utils import sha3
+
+from constants import BATCH_SIZE, PACKED_BATCH_SIZE
+from encoding import MultisendEncoder, PackedMultisendEncoder, MULTISEND_SIGNATURE, MULTISEND_PACKED_SIGNATURE
+
+TOKEN = '0x' + 'ab' * 20
+
+
+def random_airdrops(count, amount_bits=96):
+    random.seed(count)
+    return [('0x{:040x}'.format(random.getrandbits(160)), random.getrandbits(amount_bits)) for _ in xrange(count)]
+
+
+def abi_encoded(signature, types, args):
+    return '0x' + binascii.hexlify(sha3(signature)[:4] + encode_abi(types, args))
+
+
+@pytest.mark.parametrize('count', [0, 1, 2, BATCH_SIZE])
+def test_multisend_encoding(count):
+    addresses, amounts = zip(*random_airdrops(count, amount_bits=256)) if count else ((), ())
+
+    expected = abi_encoded(MULTISEND_SIGNATURE, ['address', 'address[]', 'uint256[]'],
+                           [TOKEN, list(addresses), list(amounts)])
+
+    assert MultisendEncoder(TOKEN).encode(addresses, amounts) == expected
+
+
+@pytest.mark.parametrize('count', [0, 1, 2, PACKED_BATCH_SIZE])
+def test_packed_multisend_encoding(count):
+    airdrops = random_airdrops(count)
+    addresses, amounts = zip(*airdrops) if count else ((), ())
+    # amount in the high 12 bytes, address in the low 20 bytes
+    words = [binascii.unhexlify('{:024x}{}'.format(amount, address[2:])) for address, amount in airdrops]
+
+    expected = abi_encoded(MULTISEND_PACKED_SIGNATURE, ['address', 'bytes32[]'], [TOKEN, words])
+
+    assert PackedMultisendEncoder(TOKEN).encode(addresses, amounts) == expected
+
+
+def test_encoding_rejects_invalid_input():
+    with pytest.raises(ValueError):
+        MultisendEncoder(TOKEN).encode(['0x' + '01' * 20], [])
+    with pytest.raises(ValueError):
+        MultisendEncoder(TOKEN).encode(['0x' + '01' * 19], [1])
+    with pytest.raises(ValueError):
+        MultisendEncoder(TOKEN).encode(['0x' + '01' * 20], [2 ** 256])
+    with pytest.raises(ValueError):
+        PackedMultisendEncoder(TOKEN).encode(['0x' + '01' * 20], [2 ** 96])
@@ -0,0 +1,100 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+
+import pytest
+
+from encoding import MultisendEncoder
+from gas_model import GasModel, GasModelException, calldata_gas, NEW_HOLDER_EXTRA_GAS
+
+TOKEN = '0x' + 'a' * 40
+
+
+def _batch(size, offset=0):
+    return [['0x{:040x}'.format(offset + i + 1), 10 ** 18 + i] for i in xrange(size)]
+
+
+def _data(batch):
+    addresses, amounts = zip(*batch)
+    return MultisendEncoder(TOKEN).encode(addresses, amounts)
+
+
+def _measure(batch, holders=()):
+    """
+    Made-up "node", whose gas is exactly linear in the composition
+    """
+    new = sum(1 for address, _ in batch if address not in holders)
+    return 21000 + calldata_gas(_data(batch)) + 1234 + 13000 * len(batch) + NEW_HOLDER_EXTRA_GAS * new
+
+
+def test_calldata_gas():
+    assert calldata_gas('0x') == 0
+    assert calldata_gas('0x0001ff00') == 2 * 4 + 2 * 68
+
+
+def test_uncalibrated():
+    with pytest.raises(GasModelException):
+        GasModel().predict(_batch(1), _data(_batch(1)))
+
+
+def test_calibrated_prediction():
+    model = GasModel()
+    model.calibrate([(batch, _data(batch), _measure(batch)) for batch in [_batch(89), _batch(40), _batch(7)]])
+
+    for size in [1, 10, 89]:
+        batch = _batch(size, offset=1000)
+        assert 0 <= model.predict(batch, _data(batch)) - _measure(batch) <= 1
+
+
+def test_existing_holders_are_cheaper():
+    holders = set(address for address, _ in _batch(89, offset=1000)[:50])
+    model = GasModel(holders=holders)
+    model.calibrate([(batch, _data(batch), _measure(batch)) for batch in [_batch(89), _batch(40)]])
+
+    batch = _batch(89, offset=1000)
+    assert 0 <= model.predict(batch, _data(batch)) - _measure(batch, holders) <= 1
+    assert model.new_holders(batch) == 89 - 50
+
+
+def test_never_underpredicts_samples():
+    batches = [_batch(89, offset=100 * i) for i in xrange(5)]
+    # same sizes, noisy measurements
+    samples = [(batch, _data(batch), _measure(batch) + noise) for batch, noise in zip(batches, [0, 300, 17, 999, 5])]
+
+    model = GasModel(margin=100)
+    model.calibrate(samples)
+
+    for batch, data, measured in samples:
+        assert model.predict(batch, data) >= measured + 100
+
+
+def test_calibration_roundtrip():
+    holders = [address for address, _ in _batch(10)]
+    model = GasModel(holders=holders)
+    model.calibrate([(batch, _data(batch), _measure(batch, holders)) for batch in [_batch(89), _batch(40)]])
+
+    loaded = GasModel(holders=reversed(holders))
+    loaded.load_calibration(json.loads(json.dumps(model.calibration())))
+
+    for size in [1, 10, 89]:
+        batch = _batch(size, offset=5)
+        assert loaded.predict(batch, _data(batch)) == model.predict(batch, _data(batch))
+
+    with pytest.raises(GasModelException):
+        GasModel().load_calibration(model.calibration())
+    with pytest.raises(GasModelException):
+        GasModel(holders=holders, margin=1).load_calibration(model.calibration())
+    with pytest.raises(GasModelException):
+        GasModel().calibration()
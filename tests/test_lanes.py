@@ -0,0 +1,77 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+import time
+
+import pytest
+from web3 import Web3
+
+from lanes import split_lanes, lane_path, lane_paths, run_lanes, LanesException
+from utils import Sender, AirdropException
+
+
+@pytest.mark.parametrize('count,lanes', [(10, 1), (10, 3), (2, 3), (0, 2), (466509, 7)])
+def test_split_lanes(count, lanes):
+    airdrops = [['0x{:040x}'.format(i), i] for i in xrange(count)]
+
+    split = split_lanes(airdrops, lanes)
+
+    assert len(split) == lanes
+    assert sum(split, []) == airdrops
+    assert max(map(len, split)) - min(map(len, split)) <= 1
+
+
+def test_no_lanes():
+    with pytest.raises(LanesException):
+        split_lanes([], 0)
+
+
+def test_lane_paths():
+    assert lane_path('data/unsigned.json', 2) == 'data/unsigned.lane2.json'
+    assert lane_paths('data/signed.json', 1) == ['data/signed.json']
+    assert lane_paths('data/signed.json', 2) == ['data/signed.lane0.json', 'data/signed.lane1.json']
+
+
+def test_run_lanes_concurrently():
+    started = time.time()
+
+    assert run_lanes([lambda lane=lane: time.sleep(0.2) or lane for lane in xrange(5)]) == range(5)
+    assert time.time() - started < 0.5
+
+
+def test_failed_lane_stops_others():
+    stop = threading.Event()
+    finished = []
+
+    def _fail():
+        raise AirdropException("lane failed")
+
+    def _wait_for_stop():
+        stop.wait(5)
+        finished.append(stop.is_set())
+
+    with pytest.raises(AirdropException):
+        run_lanes([_wait_for_stop, _fail], stop=stop)
+
+    # the failure is raised only after the other lane is done
+    assert finished == [True]
+
+
+def test_stopped_sender():
+    stop = threading.Event()
+    stop.set()
+
+    with pytest.raises(AirdropException):
+        Sender(Web3(None), stop=stop)._send_raw(dict(tx=dict(nonce='0x0'), signedRaw='0x'))
@@ -0,0 +1,104 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+from web3 import Web3, HTTPProvider
+
+from batch_rpc import BatchRPC
+from constants import LOG_SCAN_SAFE_DEPTH
+from log_scan import TransferScanner, LogScanException, TRANSFER_TOPIC
+
+TOKEN = '0x' + 'a' * 40
+AIRDROPPER = '0x' + 'b' * 40
+HEAD = 10000
+
+
+def _log(block, index):
+    return dict(transactionHash='0x{:064x}'.format(block), blockNumber=Web3.toHex(block), logIndex=Web3.toHex(index),
+                topics=[TRANSFER_TOPIC, '0x' + '0' * 24 + AIRDROPPER[2:], '0x' + '0' * 24 + '{:040x}'.format(index)],
+                data='0x{:064x}'.format(10 ** 18 + index))
+
+
+@pytest.fixture()
+def chain(stub_rpc):
+    """
+    Two transfers every 100th block
+    """
+    logs = [_log(block, index) for block in xrange(0, HEAD + 1, 100) for index in (0, 1)]
+
+    def _get_logs(params):
+        assert params['address'] == TOKEN
+        assert params['topics'] == [TRANSFER_TOPIC, '0x' + '0' * 24 + AIRDROPPER[2:]]
+        first, last = int(params['fromBlock'], 16), int(params['toBlock'], 16)
+        return [log for log in logs if first <= int(log['blockNumber'], 16) <= last]
+
+    stub_rpc.methods['eth_getLogs'] = _get_logs
+    stub_rpc.methods['eth_blockNumber'] = lambda: Web3.toHex(HEAD)
+    return stub_rpc
+
+
+@pytest.fixture()
+def web3(chain):
+    return Web3(HTTPProvider(chain.uri))
+
+
+def _get_logs_requests(chain):
+    return [payload for payload in chain.payloads
+            if (payload[0] if isinstance(payload, list) else payload)['method'] == 'eth_getLogs']
+
+
+def test_scan(chain, web3):
+    transfers = TransferScanner(web3, TOKEN, AIRDROPPER, chunk_size=1000).scan(150, 5049)
+
+    assert [transfer['blockNumber'] for transfer in transfers] == sorted(range(200, 5001, 100) * 2)
+    assert transfers[0] == dict(transactionHash='0x{:064x}'.format(200), blockNumber=200, logIndex=0,
+                                to='0x' + '0' * 40, value=10 ** 18)
+    assert len(_get_logs_requests(chain)) == 5
+
+
+def test_scan_batched(chain, web3):
+    scanner = TransferScanner(web3, TOKEN, AIRDROPPER, chunk_size=100,
+                              batch_rpc=BatchRPC(chain.uri, batch_size=20, concurrency=2))
+
+    assert len(scanner.scan(0, HEAD)) == 2 * (HEAD / 100 + 1)
+    assert len(_get_logs_requests(chain)) == 6
+
+
+def test_cache(chain, web3, tmpdir):
+    cache_path = str(tmpdir.join("logs.json"))
+    first = TransferScanner(web3, TOKEN, AIRDROPPER, chunk_size=1000, cache_path=cache_path).scan(0, 4999)
+    assert len(_get_logs_requests(chain)) == 5
+
+    # the scanned range comes from cache, only the rest of the range is fetched
+    second = TransferScanner(web3, TOKEN, AIRDROPPER, chunk_size=1000, cache_path=cache_path).scan(3000, 6999)
+    assert len(_get_logs_requests(chain)) == 5 + 2
+    assert second == [transfer for transfer in first if transfer['blockNumber'] >= 3000] + \
+        [transfer for transfer in TransferScanner(web3, TOKEN, AIRDROPPER).scan(5000, 6999)]
+
+
+def test_recent_blocks_not_cached(chain, web3, tmpdir):
+    cache_path = str(tmpdir.join("logs.json"))
+    TransferScanner(web3, TOKEN, AIRDROPPER, cache_path=cache_path).scan(HEAD - 1000, HEAD)
+
+    scanner = TransferScanner(web3, TOKEN, AIRDROPPER, cache_path=cache_path)
+    assert scanner.ranges == [[HEAD - 1000, HEAD - LOG_SCAN_SAFE_DEPTH]]
+    assert len(scanner.scan(HEAD - 1000, HEAD)) == 2 * 11
+
+
+def test_cache_for_other_address(web3, tmpdir):
+    cache_path = str(tmpdir.join("logs.json"))
+    TransferScanner(web3, TOKEN, AIRDROPPER, cache_path=cache_path).scan(0, 100)
+
+    with pytest.raises(LogScanException):
+        TransferScanner(web3, TOKEN, '0x' + 'c' * 40, cache_path=cache_path)
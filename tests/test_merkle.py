@@ -0,0 +1,86 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+
+from constants import DEAD
+from merkle import build_tree, leaf_hash, pair_hash, verify_proof, MerkleProofs, MerkleException
+
+
+def _airdrops(count):
+    return [['0x{:040x}'.format((i * 7919) % 1000 + 1), 10 ** 18 + i] for i in xrange(count)]
+
+
+def _naive_root(airdrops):
+    level = [leaf_hash(index, address, amount) for index, (address, amount) in enumerate(airdrops)]
+    while len(level) > 1:
+        level = [pair_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in xrange(0, len(level), 2)]
+    return level[0]
+
+
+@pytest.fixture()
+def proof_path(tmpdir):
+    return str(tmpdir.join("proofs.bin"))
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 7, 8, 9, 33])
+def test_root_and_proofs(proof_path, mocker, count):
+    mocker.patch('merkle.CHUNK', 4)
+    airdrops = _airdrops(count)
+
+    root = build_tree(airdrops, proof_path)
+    assert root == _naive_root(airdrops)
+
+    with open(proof_path, 'rb') as f:
+        proofs = MerkleProofs(f)
+        assert proofs.root == root
+        for index, (address, amount) in enumerate(airdrops):
+            assert proofs.account(index) == [address, amount]
+            assert verify_proof(leaf_hash(index, address, amount), proofs.proof(index), root)
+            assert not verify_proof(leaf_hash(index, address, amount + 1), proofs.proof(index), root)
+
+
+def test_claims_by_address(proof_path):
+    # DEAD is airdropped twice, like in the real airdrop
+    airdrops = _airdrops(20) + [[DEAD, 5], [DEAD, 6]]
+    root = build_tree(airdrops, proof_path)
+
+    with open(proof_path, 'rb') as f:
+        proofs = MerkleProofs(f)
+        claims = proofs.claims(DEAD.upper().replace('0X', '0x'))
+        assert proofs.claims('0x' + 'f' * 40) == []
+
+    assert [(claim['index'], claim['account'], claim['amount']) for claim in claims] == [(20, DEAD, 5), (21, DEAD, 6)]
+    for claim in claims:
+        proof = [node[2:].decode('hex') for node in claim['proof']]
+        assert verify_proof(leaf_hash(claim['index'], claim['account'], claim['amount']), proof, root)
+
+
+def test_truncated_file(proof_path):
+    build_tree(_airdrops(10), proof_path)
+    with open(proof_path, 'r+b') as f:
+        f.truncate(100)
+
+    with pytest.raises(MerkleException):
+        with open(proof_path, 'rb') as f:
+            MerkleProofs(f)
+
+
+def test_empty_file(proof_path):
+    open(proof_path, 'wb').close()
+
+    with pytest.raises(MerkleException):
+        with open(proof_path, 'rb') as f:
+            MerkleProofs(f)
@@ -0,0 +1,199 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+
+import pytest
+
+from benchmarks.parity_dump import write_dump, DISTRIBUTIONS
+from constants import CUTOFF, DEAD, RESERVE_AIRDROP, TOLERANCE, TOTAL_ETH_ABOVE_CUTOFF
+from processor import read_balances, decode_hex, allocate, find_deviation, CanonicalizingReader, BalanceTable, \
+    LBRACKET_INDEX, RBRACKET_OFFSET, BALANCE_WIDTH, process, process_file
+
+# mimics the layout of a Parity state dump, including the brackets that need canonicalizing
+PARITY_DUMP = """{ "state": [
+"0x0000000000000000000000000000000000000001": {"balance": "0x10", "nonce": "0x0"},
+"0x0000000000000000000000000000000000000002": {"balance": "0x", "nonce": "0x1", "code": "0x6060",
+  "storage": {"0x01": "0x02"}},
+"0x0000000000000000000000000000000000000003": {"balance": "0x16345785d8a0000", "nonce": "0x0"}
+]}"""
+
+
+# what `process` turns the dump into before loading
+CANONICAL_DUMP = PARITY_DUMP[:LBRACKET_INDEX] + '{' + PARITY_DUMP[LBRACKET_INDEX + 1:-RBRACKET_OFFSET] + '}' + \
+    PARITY_DUMP[-RBRACKET_OFFSET + 1:]
+
+
+@pytest.fixture()
+def dump_path(tmpdir):
+    path = tmpdir.join("balances_airdrop.json")
+    path.write(PARITY_DUMP)
+    return str(path)
+
+
+def test_parity_dump_fixture_sanity():
+    assert PARITY_DUMP[LBRACKET_INDEX] == '['
+    assert PARITY_DUMP[len(PARITY_DUMP) - RBRACKET_OFFSET] == ']'
+
+
+def test_streaming_canonicalization(dump_path):
+    """
+    Reading the dump in chunks of any size should canonicalize exactly as `process` does on the whole string
+    """
+    for chunk_size in [1, 2, 7, 11, 12, len(PARITY_DUMP)]:
+        with open(dump_path, 'rb') as f:
+            reader = CanonicalizingReader(f, len(PARITY_DUMP))
+            chunks = iter(lambda: reader.read(chunk_size), '')
+            assert ''.join(chunks) == CANONICAL_DUMP
+
+
+@pytest.mark.parametrize('fastest', [True, False])
+def test_read_balances(dump_path, mocker, fastest):
+    if not fastest:
+        mocker.patch('processor.IJSON_BACKENDS', ())
+    expected = json.loads(CANONICAL_DUMP)['state']
+
+    balances = read_balances(dump_path)
+
+    assert balances.keys() == expected.keys()
+    assert balances.values() == [account['balance'] for account in expected.values()]
+
+
+@pytest.mark.parametrize('distribution', DISTRIBUTIONS)
+def test_synthetic_dump(tmpdir, distribution):
+    """
+    Synthetic dumps must have the brackets to canonicalize, and process with their own golden numbers
+    """
+    path = tmpdir.join("synthetic.json")
+    with path.open('wb') as f:
+        totals = write_dump(f, 500, distribution=distribution)
+    dump = path.read()
+
+    assert dump[LBRACKET_INDEX] == '['
+    assert dump[len(dump) - RBRACKET_OFFSET] == ']'
+
+    airdrops = process_file(str(path), totals['total_eth'], totals['total_eth_above_cutoff'])
+    assert process(dump, totals['total_eth'], totals['total_eth_above_cutoff']) == airdrops
+
+    # eligible accounts, then the remainder to DEAD, which is eligible itself
+    assert len(airdrops) == totals['eligible'] + 1
+    assert [address for address, _ in airdrops].count(DEAD) == 2
+    assert sum(amount for _, amount in airdrops) == RESERVE_AIRDROP
+
+    with pytest.raises(AssertionError):
+        process_file(str(path))
+
+
+def test_balance_table():
+    addresses = ['0x' + '{:040x}'.format(i * 7919) for i in xrange(200)]
+    # plenty of ties and balances of very different magnitudes
+    balances = [(i % 13) * 10 ** (i % 25) for i in xrange(200)]
+
+    table = BalanceTable()
+    for address, balance in zip(addresses, balances):
+        table.append(address, balance)
+
+    assert len(table) == len(addresses)
+    assert [table.address(i) for i in xrange(len(table))] == addresses
+    assert list(table.balances_at(xrange(len(table)))) == balances
+    assert table.total() == sum(balances)
+
+    sortorder = table.sortorder()
+    assert list(sortorder) == sorted(range(len(balances)), key=lambda k: balances[k], reverse=True)
+
+    for cutoff in [0, 1, 10 ** 17, 12 * 10 ** 24, 13 * 10 ** 24]:
+        above, largest_rest = table.partition(cutoff)
+        assert list(above) == [i for i in xrange(len(balances)) if balances[i] > cutoff]
+        assert largest_rest == max([0] + [balance for balance in balances if balance <= cutoff])
+
+        # sorting only the accounts above cutoff yields the same order as cutting the full sort
+        assert list(table.sortorder(above)) == list(sortorder)[:len(above)]
+
+
+def test_radix_sortorder(mocker):
+    """
+    Sorting by the balances' bytes, bucket by bucket, must order exactly like sorting by the balances
+    """
+    mocker.patch('processor.SORT_BUCKET', 2)
+    # ties, balances of every length in bytes, and balances differing only in their last bytes
+    balances = [(i % 7) * 256 ** (i % 33) + (i % 3) for i in xrange(2000) if (i % 33) < 32]
+
+    table = BalanceTable()
+    for i, balance in enumerate(balances):
+        table.append('0x' + '{:040x}'.format(i), balance)
+
+    expected = sorted(range(len(balances)), key=lambda k: balances[k], reverse=True)
+    assert list(table.sortorder()) == expected
+
+    above, _ = table.partition(10 ** 17)
+    assert list(table.sortorder(above)) == [index for index in expected if balances[index] > 10 ** 17]
+
+
+def test_decode_hex():
+    hex_balances = ["0x", "0x0", "0x1", "0x10", "0x16345785d8a0000", "0x" + "f" * 64]
+
+    raw = decode_hex(hex_balances, BALANCE_WIDTH)
+
+    assert len(raw) == BALANCE_WIDTH * len(hex_balances)
+
+    table = BalanceTable()
+    table.extend(['0x' + '{:040x}'.format(i) for i in xrange(len(hex_balances))], hex_balances)
+    assert list(table.balances_at(xrange(len(table)))) == [0, 0, 1, 16, 10 ** 17, 2 ** 256 - 1]
+
+    with pytest.raises(AssertionError):
+        decode_hex(["0x01" + "0" * 64], BALANCE_WIDTH)
+    # odd number of digits, too wide
+    with pytest.raises(AssertionError):
+        decode_hex(["0x1" + "0" * 64], BALANCE_WIDTH)
+
+
+def test_extend_rejects_short_addresses():
+    table = BalanceTable()
+
+    with pytest.raises(AssertionError):
+        table.extend(['0x' + 'ab' * 19], ['0x1'])
+    with pytest.raises(AssertionError):
+        table.extend(['0x' + 'a' * 41], ['0x1'])
+
+    with pytest.raises(AssertionError):
+        table.append('0x' + 'ab' * 19, 1)
+
+
+def test_allocation_matches_audit_check():
+    """
+    Shares must be bit-exact with what `audits/phildaian/check_transactions.py` expects
+    """
+    sum_balances = TOTAL_ETH_ABOVE_CUTOFF
+    balances = [CUTOFF + 1, 10 ** 18, 4274999801259164787792424, sum_balances // 3]
+
+    shares, remainder = allocate(balances, sum_balances, RESERVE_AIRDROP)
+
+    assert shares == [int((balance * 7012269912256639039461982L) / 93091923180803405175440246) for balance in balances]
+    assert remainder == RESERVE_AIRDROP - sum(shares)
+
+
+def test_find_deviation():
+    balances = [CUTOFF + i * 10 ** 16 for i in xrange(1, 100)]
+    sum_balances = sum(balances)
+    shares, _ = allocate(balances, sum_balances, RESERVE_AIRDROP)
+
+    assert find_deviation(balances, shares, sum_balances, RESERVE_AIRDROP) is None
+
+    # shift one share by an amount over tolerance, as a share of the reserve
+    shares[42] += int(RESERVE_AIRDROP * TOLERANCE) + 1
+    assert find_deviation(balances, shares, sum_balances, RESERVE_AIRDROP) == 42
+
+    # stops at the first offending one
+    shares[7] -= int(RESERVE_AIRDROP * TOLERANCE) + 1
+    assert find_deviation(balances, shares, sum_balances, RESERVE_AIRDROP) == 7
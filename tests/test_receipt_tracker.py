@@ -0,0 +1,176 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+
+from receipt_tracker import ReceiptTracker, ReceiptTrackerException
+
+
+class StubChain(object):
+    """
+    Just enough of web3 for the tracker: a chain of blocks, which can be reorged, and a block filter.
+    Counts the requests made
+    """
+
+    def __init__(self):
+        self.blocks = [dict(number=0, hash='0xb0', transactions=[])]
+        self.filter_changes = []
+        self.requests = 0
+        self.mined_blocks = 0
+        self.eth = self
+        self._requestManager = self
+
+    @property
+    def blockNumber(self):
+        self.requests += 1
+        return len(self.blocks) - 1
+
+    def mine(self, tx_hashes=(), at=None):
+        """
+        Mines a block with the transactions, at height `at` replaces the blocks from there on (reorg)
+        """
+        if at is not None:
+            del self.blocks[at:]
+        number = len(self.blocks)
+        self.mined_blocks += 1
+        block = dict(number=number, hash='0xb{}'.format(self.mined_blocks), transactions=list(tx_hashes))
+        self.blocks.append(block)
+        self.filter_changes.append(block['hash'])
+
+    def filter(self, params):
+        assert params == 'latest'
+        self.filter_changes = []
+        return type('Filter', (object,), dict(filter_id='0x1'))
+
+    def request_blocking(self, method, params):
+        assert method == 'eth_getFilterChanges' and params == ['0x1']
+        self.requests += 1
+        changes, self.filter_changes = self.filter_changes, []
+        return changes
+
+    def getBlock(self, block_identifier):
+        self.requests += 1
+        for block in self.blocks:
+            if block_identifier in (block['hash'], block['number']):
+                return block
+
+    def getTransactionReceipt(self, tx_hash):
+        self.requests += 1
+        for block in self.blocks:
+            if tx_hash in block['transactions']:
+                return dict(transactionHash=tx_hash, blockNumber=block['number'], blockHash=block['hash'])
+
+    def uninstallFilter(self, filter_id):
+        pass
+
+
+@pytest.fixture()
+def chain():
+    return StubChain()
+
+
+def test_many_pending_in_one_pass(chain):
+    tracker = ReceiptTracker(chain)
+    tx_hashes = ['0x{:064x}'.format(i) for i in xrange(100)]
+    map(tracker.track, tx_hashes)
+
+    chain.mine(tx_hashes[:50])
+    chain.mine()
+    chain.requests = 0
+
+    assert tracker.receipt(tx_hashes[0])['blockNumber'] == 1
+    assert tracker.receipt(tx_hashes[60]) is None
+
+    # reading the two blocks, then receipts of the mined only, once when found and once when confirmed
+    assert chain.requests == 1 + 2 + 2 * 50 + 1
+
+
+def test_confirmations(chain):
+    tracker = ReceiptTracker(chain, confirmations=3)
+    tracker.track('0xaa')
+
+    chain.mine(['0xaa'])
+    chain.mine()
+    assert tracker.receipt('0xaa') is None
+
+    chain.mine()
+    assert tracker.receipt('0xaa')['blockNumber'] == 1
+
+
+def test_reorg_to_other_block(chain):
+    tracker = ReceiptTracker(chain, confirmations=2)
+    tracker.track('0xaa')
+
+    chain.mine(['0xaa'])
+    assert tracker.receipt('0xaa') is None
+
+    chain.mine(at=1)
+    chain.mine(['0xaa'])
+    chain.mine()
+
+    assert tracker.receipt('0xaa')['blockNumber'] == 2
+
+
+def test_reorg_out_and_back(chain):
+    tracker = ReceiptTracker(chain, confirmations=2)
+    tracker.track('0xaa')
+
+    chain.mine(['0xaa'])
+    chain.mine(at=1)
+    chain.mine()
+    assert tracker.receipt('0xaa') is None
+    assert '0xaa' in tracker.pending
+
+    chain.mine(['0xaa'])
+    chain.mine()
+    assert tracker.receipt('0xaa')['blockNumber'] == 3
+
+
+def test_lost_filter(chain, mocker):
+    tracker = ReceiptTracker(chain)
+    tracker.track('0xaa')
+
+    chain.mine()
+    chain.mine(['0xaa'])
+    mocker.patch.object(chain, 'request_blocking', side_effect=ValueError("filter not found"))
+
+    assert tracker.receipt('0xaa')['blockNumber'] == 2
+
+
+def test_lost_filter_reorg_to_lower_block(chain, mocker):
+    """
+    A transaction reorged out, then mined again below the head while the filter was lost, is still found
+    """
+    tracker = ReceiptTracker(chain, confirmations=2)
+    tracker.track('0xaa')
+
+    chain.mine(['0xaa'])
+    chain.mine(at=1)
+    chain.mine()
+    assert tracker.receipt('0xaa') is None
+    assert '0xaa' in tracker.pending and tracker.head == 2
+
+    chain.mine(['0xaa'], at=1)
+    chain.mine()
+    mocker.patch.object(chain, 'request_blocking', side_effect=ValueError("filter not found"))
+
+    assert tracker.receipt('0xaa')['blockNumber'] == 1
+
+
+def test_timeout(chain):
+    tracker = ReceiptTracker(chain, poll_interval=0.01, timeout=0.05)
+    tracker.track('0xaa')
+
+    with pytest.raises(ReceiptTrackerException):
+        tracker.wait_for_receipt('0xaa')
@@ -0,0 +1,90 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import hashlib
+import json
+import os
+
+import pytest
+import rlp
+from ethereum.transactions import Transaction
+from ethereum.utils import sha3
+from web3 import Web3
+
+from signed_index import decode_signed, load_index, read_index, SignedIndexException
+from utils import LocalSigner
+
+PRIVATE_KEY = '\x46' * 32
+SENDER = '0x9d8a62f656a8d1615c1294fd71e9cfb3e4855a4f'
+
+
+@pytest.fixture()
+def signed():
+    return LocalSigner(PRIVATE_KEY, chain_id=1).sign_transactions([
+        dict(rawBatch=[], tx={'nonce': Web3.toHex(nonce), 'gasPrice': Web3.toHex(20 * 10 ** 9),
+                              'gas': Web3.toHex(200000), 'to': '0x' + '35' * 20, 'value': Web3.toHex(nonce),
+                              'data': Web3.toHex('\x01' * nonce), 'from': SENDER})
+        for nonce in xrange(50)])
+
+
+@pytest.fixture()
+def signed_path(signed, tmpdir):
+    path = str(tmpdir.join("signed.json"))
+    with open(path, 'wb') as f:
+        f.write(json.dumps(signed))
+    return path
+
+
+def test_decode_signed(signed):
+    for transaction in signed:
+        decoded = decode_signed(transaction['signedRaw'])
+        expected = rlp.decode(Web3.toAscii(transaction['signedRaw']), Transaction)
+
+        assert (decoded.nonce, decoded.gasprice, decoded.startgas, decoded.to, decoded.value, decoded.hash) == \
+            (expected.nonce, expected.gasprice, expected.startgas, expected.to, expected.value, expected.hash)
+        assert decoded.data_hash == sha3(expected.data)
+        assert Web3.toHex(decoded.sender) == SENDER
+
+
+def test_index_roundtrip(signed, signed_path):
+    built = load_index(signed_path, signed)
+    assert os.path.exists(signed_path + '.index')
+
+    read = load_index(signed_path, signed)
+
+    assert read == built
+    assert [read[transaction['signedRaw']] for transaction in signed] == \
+        [decode_signed(transaction['signedRaw']) for transaction in signed]
+
+
+def test_stale_index_rebuilt(signed, signed_path):
+    load_index(signed_path, signed)
+
+    with open(signed_path, 'wb') as f:
+        f.write(json.dumps(signed[:10]))
+    with pytest.raises(SignedIndexException):
+        with open(signed_path + '.index', 'rb') as f:
+            read_index(f, hashlib.sha256(json.dumps(signed[:10])).digest())
+
+    index = load_index(signed_path, signed[:10])
+    assert len(index) == 10
+    assert index[signed[9]['signedRaw']].nonce == 9
+
+
+def test_truncated_index_rebuilt(signed, signed_path):
+    load_index(signed_path, signed)
+    with open(signed_path + '.index', 'r+b') as f:
+        f.truncate(os.path.getsize(signed_path + '.index') - 1)
+
+    assert len(load_index(signed_path, signed)) == len(signed)
@@ -0,0 +1,93 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+
+import pytest
+import rlp
+from ethereum.keys import make_keystore_json
+from ethereum.transactions import Transaction
+from web3 import Web3
+
+from batch_rpc import BatchRPC
+from signed_index import signer_address
+from utils import Signer, LocalSigner, AirdropException
+
+# from the EIP-155 example
+PRIVATE_KEY = '\x46' * 32
+SENDER = '0x9d8a62f656a8d1615c1294fd71e9cfb3e4855a4f'
+
+
+def _transaction(nonce, sender=SENDER):
+    return dict(rawBatch=[['0x' + '35' * 20, 10 ** 18]],
+                tx={'nonce': Web3.toHex(nonce), 'gasPrice': Web3.toHex(20 * 10 ** 9), 'gas': Web3.toHex(21000),
+                    'to': '0x' + '35' * 20, 'value': Web3.toHex(10 ** 18), 'data': '0x', 'from': sender})
+
+
+@pytest.fixture()
+def transactions():
+    return [_transaction(nonce) for nonce in xrange(9, 109)]
+
+
+def test_eip155_example():
+    signed = LocalSigner(PRIVATE_KEY, chain_id=1).sign_transactions([_transaction(9)])
+
+    assert signed[0]['signedRaw'] == '0xf86c098504a817c800825208943535353535353535353535353535353535353535880de0b6b3a7' \
+                                     '6400008025a028ef61340bd939bc2195fe537567866003e1a15d3c71ff63e1590620aa636276a0' \
+                                     '67cbe9d8997f761aecb703304b3800ccf555c9f3dc64214b297fb1966a3b6d83'
+
+
+def test_local_signatures(transactions):
+    signed = LocalSigner(PRIVATE_KEY).sign_transactions(transactions)
+
+    for tx in signed:
+        decoded = rlp.decode(Web3.toAscii(tx['signedRaw']), Transaction)
+        assert Web3.toHex(decoded.nonce) == tx['tx']['nonce']
+        assert '0x' + decoded.sender.encode('hex') == SENDER
+
+
+@pytest.mark.parametrize('chain_id', [None, 1, 42])
+def test_signer_address(chain_id):
+    signed = LocalSigner(PRIVATE_KEY, chain_id=chain_id).sign_transactions([_transaction(9)])
+
+    assert Web3.toHex(signer_address(rlp.decode(Web3.toAscii(signed[0]['signedRaw']), Transaction))) == SENDER
+
+
+def test_pool_same_as_serial(transactions):
+    serial = LocalSigner(PRIVATE_KEY).sign_transactions(copy.deepcopy(transactions))
+    pooled = LocalSigner(PRIVATE_KEY, workers=4).sign_transactions(copy.deepcopy(transactions))
+
+    assert pooled == serial
+
+
+def test_local_signer_checks_sender():
+    with pytest.raises(AirdropException):
+        LocalSigner(PRIVATE_KEY).sign_transactions([_transaction(9, sender='0x' + 'b' * 40)])
+
+
+@pytest.mark.slow
+def test_from_keystore():
+    keystore = make_keystore_json(PRIVATE_KEY, 'secret')
+
+    assert LocalSigner.from_keystore(keystore, 'secret').address == SENDER
+
+
+def test_bulk_node_signing(stub_rpc, transactions):
+    stub_rpc.methods['eth_signTransaction'] = lambda tx: dict(raw='0xsigned' + tx['nonce'], tx=tx)
+
+    signed = Signer(Web3(None), batch_rpc=BatchRPC(stub_rpc.uri, batch_size=30, concurrency=2)) \
+        .sign_transactions(transactions)
+
+    assert [tx['signedRaw'] for tx in signed] == ['0xsigned' + tx['tx']['nonce'] for tx in transactions]
+    assert len(stub_rpc.payloads) == 4
@@ -0,0 +1,106 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+from StringIO import StringIO
+
+import pytest
+
+from tx_journal import TxJournal, TxJournalException, file_sha256, read_header
+
+HEADER = dict(processed_sha256='ab' * 32, batch_size=3, pack=False)
+
+
+def _transaction(nonce, size=3):
+    return dict(rawBatch=[['0x{:040x}'.format(nonce * 10 + i), 10 ** 20 + i] for i in xrange(size)],
+                tx=dict(nonce=hex(nonce), data='0x' + 'ff' * 40, to='0x' + 'a' * 40),
+                gasEstimate=2500000 + nonce)
+
+
+@pytest.fixture()
+def journal_path(tmpdir):
+    return str(tmpdir.join("unsigned.json.journal"))
+
+
+def test_output_same_as_json(journal_path):
+    transactions = [_transaction(nonce) for nonce in xrange(5, 12)] + [_transaction(12, size=1)]
+
+    journal = TxJournal(journal_path, HEADER)
+    map(journal.append, transactions)
+
+    output = StringIO()
+    journal.write_output(output)
+
+    assert output.getvalue() == json.dumps(transactions, sort_keys=True)
+
+
+def test_empty_output(journal_path):
+    output = StringIO()
+    TxJournal(journal_path, HEADER).write_output(output)
+
+    assert output.getvalue() == json.dumps([])
+
+
+def test_resume(journal_path):
+    journal = TxJournal(journal_path, HEADER)
+    journal.append(_transaction(5))
+    journal.append(_transaction(6, size=2))
+    journal.close()
+
+    resumed = TxJournal(journal_path, HEADER)
+
+    assert resumed.count == 2
+    assert resumed.next_offset == 5
+    assert resumed.next_nonce == 7
+
+
+def test_resume_after_torn_write(journal_path):
+    journal = TxJournal(journal_path, HEADER)
+    journal.append(_transaction(5))
+    journal.file.write(json.dumps(_transaction(6))[:50])
+    journal.close()
+
+    resumed = TxJournal(journal_path, HEADER)
+    assert resumed.count == 1
+    assert resumed.next_nonce == 6
+
+    resumed.append(_transaction(6))
+    output = StringIO()
+    resumed.write_output(output)
+    assert output.getvalue() == json.dumps([_transaction(5), _transaction(6)], sort_keys=True)
+
+
+def test_different_inputs(journal_path):
+    TxJournal(journal_path, HEADER).close()
+
+    with pytest.raises(TxJournalException):
+        TxJournal(journal_path, dict(HEADER, processed_sha256='cd' * 32))
+
+
+def test_read_header(journal_path):
+    assert read_header(journal_path) is None
+
+    header = dict(HEADER, gas_model=dict(base_gas=1234.5, recipient_gas=13000.25))
+    journal = TxJournal(journal_path, header)
+    journal.append(_transaction(5))
+    journal.close()
+
+    assert read_header(journal_path) == header
+
+
+def test_file_sha256(tmpdir):
+    path = tmpdir.join("processed.json")
+    path.write("[]")
+
+    assert file_sha256(str(path)) == '4f53cda18c2baa0c0354bb5f9a3ecbe5ed12ab4d8e11ba873c2f11161202b945'
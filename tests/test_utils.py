@@ -12,26 +12,48 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import binascii
 import logging
+import os
 import pytest
 
-import json
-
 import populus.wait
 from populus.wait import Wait
 import web3 as web3module
-from web3 import Web3, IPCProvider
 
-from processor import process
+from airdrops_file import load_airdrops
+from benchmarks.encode_multisend import synthetic_airdrops
+from chain_backend import connect
+from encoding import PackedMultisendEncoder
+from gas_model import GasModel
+from processor import process_file
+from receipt_tracker import ReceiptTracker
 from utils import get_contracts, Creator, Signer, theoretical_gas, Sender, AirdropException, AirdropOOGException, \
-    remove_estimate
-from constants import RESERVE_AIRDROP, GAS_LIMIT, BATCH_SIZE, GAS_PRICE, GAS_RESERVE, DEAD
+    remove_estimate, remove_sent_airdrops
+from constants import RESERVE_AIRDROP, GAS_LIMIT, BATCH_SIZE, GAS_PRICE, GAS_RESERVE, DEAD, \
+    PACKING_MARGIN, PACKED_BATCH_SIZE
+
+
+PROCESSED_FILE = "data/processed.json"
+BALANCES_FILE = "data/balances_airdrop.json"
+SYNTHETIC_FLOW_SIZE = 10 * BATCH_SIZE + 10  # airdrops of the entire flow, without the real balances
+
+needs_processed_file = pytest.mark.skipif(not os.path.exists(PROCESSED_FILE),
+                                          reason="needs the real airdrops in {}".format(PROCESSED_FILE))
+
+
+@pytest.fixture()
+def web3_factory(request):
+    """
+    connects to the chain chosen with --chain, each call a new connection to the same chain
+    """
+    return connect(request.config.getoption('chain'))
 
 
 @pytest.fixture()
-def web3():
-    web3 = Web3(IPCProvider("/tmp/ethereum_dev_mode/geth.ipc"))
-    web3.personal.unlockAccount(web3.eth.accounts[0], "")
+def web3(web3_factory):
+    web3 = web3_factory()
+    assert web3.personal.unlockAccount(web3.eth.accounts[0], "")
     return web3
 
 
@@ -48,13 +70,16 @@ def prepared_contracts(web3):
 @pytest.fixture()
 def airdrops():
     """
-    uses a pre-prepared json file with processed airdrops (see README.md)
+    uses a pre-prepared json file with processed airdrops (see README.md), synthetic airdrops if there's none
 
     it is also a truncated list of airdrops, just enough for 2 uneven transactions
     """
 
-    with open("data/processed.json") as f:
-        airdrops = json.loads(f.read())
+    if not os.path.exists(PROCESSED_FILE):
+        return synthetic_airdrops(BATCH_SIZE + 10, RESERVE_AIRDROP)
+
+    with open(PROCESSED_FILE, "rb") as f:
+        airdrops = load_airdrops(f)
 
     return airdrops[0:BATCH_SIZE + 10]
 
@@ -68,6 +93,13 @@ def creator(web3, prepared_contracts):
     return creator
 
 
+@pytest.fixture()
+def packed_creator(web3, prepared_contracts):
+    airdropper, omg_token = prepared_contracts
+
+    return Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE, packed=True)
+
+
 @pytest.fixture()
 def transactions(creator, airdrops):
     transactions = creator.create_txs(airdrops[0:100], BATCH_SIZE)
@@ -83,21 +115,18 @@ def signed(web3, transactions):
     return signed
 
 
-@pytest.fixture()
-def input_file():
-    with open("data/balances_airdrop.json") as f:
-        yield f
-
-
 @pytest.mark.slow
-def test_entire_flow(web3, prepared_contracts, creator, input_file):
+def test_entire_flow(web3, prepared_contracts, creator):
 
     airdropper, omg_token = prepared_contracts
-    airdrops = process(input_file.read())
+    if os.path.exists(BALANCES_FILE):
+        airdrops = process_file(BALANCES_FILE)
+    else:
+        airdrops = synthetic_airdrops(SYNTHETIC_FLOW_SIZE, RESERVE_AIRDROP)
     transactions = creator.create_txs(airdrops, BATCH_SIZE)
 
     # this being a long-running test, the unlocking from web3 fixture might have expired
-    web3.personal.unlockAccount(web3.eth.accounts[0], "")
+    assert web3.personal.unlockAccount(web3.eth.accounts[0], "")
 
     signed = Signer(web3).sign_transactions(transactions)
     Sender(web3).send_transactions(signed, transactions)
@@ -131,6 +160,29 @@ def test_small_flow(web3, prepared_contracts, creator, airdrops):
     check_entirely_airdropped(airdrops, omg_token)
 
 
+def test_packed_flow(web3, prepared_contracts, packed_creator, airdrops):
+    _, omg_token = prepared_contracts
+
+    transactions = packed_creator.create_txs(airdrops, PACKED_BATCH_SIZE)
+    signed = Signer(web3).sign_transactions(transactions)
+    Sender(web3).send_transactions(signed, transactions)
+
+    check_entirely_airdropped(airdrops, omg_token)
+
+
+def test_packed_oog_handling(web3, prepared_contracts, packed_creator, airdrops):
+    _, omg_token = prepared_contracts
+
+    transactions = packed_creator.create_txs(airdrops, PACKED_BATCH_SIZE)
+    transactions[0]['tx']['gas'] = web3.toHex(transactions[0]['gasEstimate'] - 1)
+    signed = Signer(web3).sign_transactions(transactions)
+
+    with pytest.raises(AirdropOOGException):
+        Sender(web3).send_transactions(signed, transactions)
+
+    check_none_airdropped(airdrops, omg_token)
+
+
 def test_batch_endings(creator, airdrops):
     """
     Makes sure that the last batch isn't missed
@@ -142,6 +194,178 @@ def test_batch_endings(creator, airdrops):
     assert len(transactions) == 2
 
 
+def test_concurrent_estimation(web3, web3_factory, prepared_contracts, creator, airdrops):
+    """
+    Estimating gas concurrently must yield the same transactions, in the same order
+    """
+    airdropper, omg_token = prepared_contracts
+
+    concurrent_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                                 workers=4, web3_factory=web3_factory)
+
+    assert concurrent_creator.create_txs(airdrops, BATCH_SIZE) == creator.create_txs(airdrops, BATCH_SIZE)
+
+    with pytest.raises(AirdropException):
+        concurrent_creator.create_txs(airdrops, BATCH_SIZE / 2)
+
+
+@pytest.mark.parametrize('modelled', [False, True])
+def test_lazy_batches(web3, web3_factory, prepared_contracts, airdrops, modelled):
+    """
+    Batches are cut from the airdrops only a few ahead of the transactions taken, like from an AirdropsFile,
+    where every slice decodes its records. Also when they're predicted with a gas model
+    """
+    airdropper, omg_token = prepared_contracts
+    workers = 2
+
+    class SlicedAirdrops(object):
+        def __init__(self, airdrops):
+            self.airdrops = airdrops
+            self.slices = 0
+
+        def __len__(self):
+            return len(self.airdrops)
+
+        def __getitem__(self, index):
+            self.slices += 1
+            return self.airdrops[index]
+
+    sliced_airdrops = SlicedAirdrops(list(airdrops) * 20)
+    concurrent_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                                 workers=workers, web3_factory=web3_factory, gas_model=GasModel() if modelled else None)
+    if modelled:
+        concurrent_creator.calibrate(airdrops, BATCH_SIZE)
+
+    transactions = concurrent_creator.iter_txs(sliced_airdrops, BATCH_SIZE)
+    next(transactions)
+    transactions.close()
+
+    assert sliced_airdrops.slices <= 2 * workers
+
+
+def test_offline_encoding(prepared_contracts, transactions):
+    """
+    Calldata encoded by Creator must be exactly what web3 would encode
+    """
+    airdropper, omg_token = prepared_contracts
+
+    for transaction in transactions:
+        addresses, amounts = zip(*transaction['rawBatch'])
+        expected_data = airdropper.encodeABI('multisend', args=(omg_token.address, addresses, amounts))
+        assert transaction['tx']['data'] == expected_data
+
+
+def test_offline_packed_encoding(prepared_contracts, packed_creator, airdrops):
+    airdropper, omg_token = prepared_contracts
+
+    for transaction in packed_creator.create_txs(airdrops, PACKED_BATCH_SIZE):
+        words = [binascii.unhexlify('{:024x}'.format(amount) + address[2:]) for address, amount in transaction['rawBatch']]
+        expected_data = airdropper.encodeABI('multisendPacked', args=(omg_token.address, words))
+        assert transaction['tx']['data'] == expected_data
+
+
+def test_packed_amount_width():
+    encoder = PackedMultisendEncoder(DEAD)
+
+    assert encoder.encode([DEAD], [2 ** 96 - 1]).endswith('f' * 24 + DEAD[2:])
+    with pytest.raises(ValueError):
+        encoder.encode([DEAD], [2 ** 96])
+
+
+def test_gas_model_report(web3, prepared_contracts, airdrops):
+    """
+    The gas model mustn't predict less than the node estimated
+    """
+    airdropper, omg_token = prepared_contracts
+
+    modelling_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                                gas_model=GasModel())
+    transactions = modelling_creator.create_txs(airdrops, BATCH_SIZE)
+
+    # few batches here, so all of them calibrate the model
+    assert len(modelling_creator.gas_report) == len(transactions)
+    for row in modelling_creator.gas_report:
+        assert row['predicted'] >= row['measured'] == transactions[row['batch']]['gasEstimate']
+
+
+def test_gas_model_underprediction(web3, prepared_contracts, airdrops, mocker):
+    """
+    A batch sampled after calibration, which the model underpredicted, stops the creation
+    """
+    airdropper, omg_token = prepared_contracts
+    mocker.patch('utils.GAS_MODEL_CALIBRATION_BATCHES', 1)
+    mocker.patch('utils.GAS_MODEL_SAMPLE_EVERY', 1)
+
+    modelling_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                                gas_model=GasModel())
+    modelling_creator.create_txs(airdrops, BATCH_SIZE)
+
+    # calibrated on the first batch and the short ones cut from it, fitting the base gas, the second batch sampled
+    assert modelling_creator.gas_model.base_gas != 0
+    assert [row['batch'] for row in modelling_creator.gas_report] == [0, 1]
+
+    underpredicting_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE,
+                                      GAS_RESERVE, gas_model=GasModel(margin=-10000))
+    with pytest.raises(AirdropException):
+        underpredicting_creator.create_txs(airdrops, BATCH_SIZE)
+
+
+def test_packed_batches(web3, prepared_contracts, airdrops):
+    airdropper, omg_token = prepared_contracts
+
+    modelling_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                                gas_model=GasModel())
+    modelling_creator.create_txs(airdrops, BATCH_SIZE)  # calibrates the model
+
+    batches = modelling_creator.pack_batches(airdrops, 10)
+
+    assert sum(batches, []) == airdrops
+    for batch in batches[:-1]:
+        assert modelling_creator.estimate_batch(batch) <= GAS_LIMIT - PACKING_MARGIN
+
+
+def test_packing_requires_gas_model(creator, airdrops):
+    with pytest.raises(AirdropException):
+        creator.create_txs(airdrops, BATCH_SIZE, pack=True)
+
+
+def test_packed_creation(web3, prepared_contracts, airdrops):
+    """
+    Packed batches depend only on the calibration, batches larger than batch_size are estimated with the node
+    """
+    airdropper, omg_token = prepared_contracts
+    airdrops = list(airdrops) * 2  # for more than a single packed batch
+
+    # recipients already holding OMG are cheaper, so that batches of them are packed larger
+    holders = [address for address, _ in airdrops[:50]]
+    Wait(web3).for_receipt(airdropper.transact().multisend(omg_token.address, holders, [1] * len(holders)))
+
+    calibrating_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                                  gas_model=GasModel(holders=holders))
+    with pytest.raises(AirdropException):
+        calibrating_creator.create_txs(airdrops, BATCH_SIZE, pack=True)
+    calibrating_creator.calibrate(airdrops, BATCH_SIZE)
+
+    gas_model = GasModel(holders=holders)
+    gas_model.load_calibration(calibrating_creator.gas_model.calibration())
+    packing_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                              gas_model=gas_model)
+    transactions = packing_creator.create_txs(airdrops, BATCH_SIZE, pack=True)
+
+    assert remove_estimate(transactions) == remove_estimate(calibrating_creator.create_txs(airdrops, BATCH_SIZE,
+                                                                                           pack=True))
+    assert sum((transaction['rawBatch'] for transaction in transactions), []) == list(airdrops)
+    assert len(transactions[0]['rawBatch']) > BATCH_SIZE
+    assert 0 in [row['batch'] for row in packing_creator.gas_report]
+
+    # resuming after the first transaction, from the same calibration
+    resuming_creator = Creator(web3.eth.accounts[0], airdropper, omg_token, GAS_LIMIT, GAS_PRICE, GAS_RESERVE,
+                               gas_model=gas_model)
+    resumed = resuming_creator.iter_txs(airdrops, BATCH_SIZE, pack=True, nonce=int(transactions[1]['tx']['nonce'], 16),
+                                        offset=len(transactions[0]['rawBatch']), first_batch=1)
+    assert remove_estimate(list(resumed)) == transactions[1:]
+
+
 def test_gas_expenses(creator, airdrops):
     """
     Tests whether too expensive/too cheap batches are picked up during creation
@@ -156,8 +380,11 @@ def test_gas_expenses(creator, airdrops):
 def test_gas_limit_makes_sense():
     assert theoretical_gas(BATCH_SIZE) < GAS_LIMIT
     assert theoretical_gas(BATCH_SIZE) >= GAS_LIMIT * 0.9
+    assert theoretical_gas(PACKED_BATCH_SIZE, packed=True) < GAS_LIMIT
+    assert theoretical_gas(PACKED_BATCH_SIZE + 1, packed=True) >= GAS_LIMIT
 
 
+@needs_processed_file
 def test_unverifiable_eth_account(web3, prepared_contracts, airdrops, mocker):
     """
     Should check that when the eth balance at 3988888 doesn't mandate an airdrop, creation is interrupted
@@ -174,6 +401,7 @@ def test_unverifiable_eth_account(web3, prepared_contracts, airdrops, mocker):
         creator.create_txs(airdrops[:1], BATCH_SIZE)
 
 
+@needs_processed_file
 def test_verifiable_eth_account(web3, prepared_contracts, airdrops, mocker):
     """
     Should check that when the eth balance at 3988888 mandates an airdrop, the creation succeeds
@@ -224,6 +452,40 @@ def test_logging_failed_wait(web3, prepared_contracts, transactions, signed, moc
     assert len(logging.info.call_args_list) == 2
 
 
+def test_windowed_sending(web3, prepared_contracts, transactions, signed, airdrops, mocker):
+    _, omg_token = prepared_contracts
+
+    mocker.patch('logging.info')
+    Sender(web3, window=2).send_transactions(signed, transactions)
+
+    assert len(logging.info.call_args_list) == 4 * len(signed)
+    check_entirely_airdropped(airdrops, omg_token)
+
+
+def test_windowed_oog_handling(web3, prepared_contracts, transactions, airdrops):
+    _, omg_token = prepared_contracts
+
+    transactions[0]['tx']['gas'] = web3.toHex(transactions[0]['gasEstimate'] - 1)
+
+    signed = Signer(web3).sign_transactions(transactions)
+
+    with pytest.raises(AirdropOOGException):
+        Sender(web3, window=2).send_transactions(signed, transactions)
+
+    # the second transaction might have been in flight already, but the first must have failed
+    check_none_airdropped(airdrops[:BATCH_SIZE], omg_token)
+
+
+def test_tracked_sending(web3, prepared_contracts, transactions, signed, airdrops, mocker):
+    _, omg_token = prepared_contracts
+
+    mocker.patch('logging.info')
+    Sender(web3, window=2, tracker=ReceiptTracker(web3, poll_interval=0.1)).send_transactions(signed, transactions)
+
+    assert len(logging.info.call_args_list) == 4 * len(signed)
+    check_entirely_airdropped(airdrops, omg_token)
+
+
 def test_disaster_recovery(web3, prepared_contracts, transactions, signed, airdrops):
     """
     Assuming transactions got sent partially, are we able to resume with confidence?
@@ -383,6 +645,13 @@ def test_creator_lowercases(web3, creator, prepared_contracts, airdrops):
     assert creator.create_txs(airdrops, BATCH_SIZE) == upper_creator.create_txs(airdrops, BATCH_SIZE)
 
 
+def test_remove_sent_airdrops():
+    airdrops = [['0x' + 'ab' * 20, 5], [DEAD, 7], ['0x' + 'cd' * 20, 5], [DEAD, 7], ['0x' + 'ab' * 20, 6]]
+    sent_airdrops = [['0x' + 'AB' * 20, 5L], [DEAD, 7], ['0x' + 'ab' * 20, 7]]
+
+    assert remove_sent_airdrops(airdrops, sent_airdrops) == [['0x' + 'cd' * 20, 5], [DEAD, 7], ['0x' + 'ab' * 20, 6]]
+
+
 def test_removing_estimates(transactions):
 
     assert all(map(lambda item: 'gasEstimate' in item, transactions))
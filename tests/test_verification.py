@@ -0,0 +1,100 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import copy
+
+import pytest
+from web3 import Web3
+
+from signed_index import decode_signed
+from utils import LocalSigner, Sender, AirdropException, check_transactions
+from verification import verify_transactions, report_ok
+
+PRIVATE_KEY = '\x46' * 32
+SENDER = '0x9d8a62f656a8d1615c1294fd71e9cfb3e4855a4f'
+
+
+@pytest.fixture()
+def unsigned():
+    return [dict(rawBatch=[], tx={'nonce': Web3.toHex(nonce), 'gasPrice': Web3.toHex(20 * 10 ** 9),
+                                  'gas': Web3.toHex(200000), 'to': '0x' + '35' * 20, 'value': Web3.toHex(0),
+                                  'data': Web3.toHex('\x01' * nonce), 'from': SENDER})
+            for nonce in xrange(40)]
+
+
+@pytest.fixture()
+def signed(unsigned):
+    return LocalSigner(PRIVATE_KEY).sign_transactions(copy.deepcopy(unsigned))
+
+
+def test_matching(signed, unsigned):
+    inputs = copy.deepcopy((signed, unsigned))
+
+    report = verify_transactions(signed, unsigned)
+
+    assert report_ok(report)
+    assert report == dict(signed_count=40, unsigned_count=40, mismatches=[])
+    assert (signed, unsigned) == inputs
+
+
+def test_mismatches(signed, unsigned):
+    unsigned[3]['tx']['data'] = Web3.toHex('\x02' * 3)
+    unsigned[7]['tx']['value'] = Web3.toHex(1)
+    unsigned[7]['tx']['from'] = '0x' + '0' * 40
+
+    report = verify_transactions(signed, unsigned)
+
+    assert not report_ok(report)
+    assert [(mismatch['index'], mismatch['nonce'], sorted(mismatch['fields'])) for mismatch in report['mismatches']] == \
+        [(3, '0x3', ['data']), (7, '0x7', ['from', 'value'])]
+    assert report['mismatches'][1]['fields']['value'] == dict(signed='0x0', local='0x1')
+
+
+def test_address_capitalization(signed, unsigned):
+    for tx in unsigned:
+        tx['tx']['to'] = tx['tx']['to'].upper().replace('0X', '0x')
+
+    assert report_ok(verify_transactions(signed, unsigned))
+
+
+def test_count_mismatch(signed, unsigned):
+    report = verify_transactions(signed[:-1], unsigned)
+
+    assert report['mismatches'] == []
+    assert not report_ok(report)
+
+
+def test_pool_same_as_serial(signed, unsigned):
+    unsigned[5]['tx']['gas'] = Web3.toHex(1)
+
+    assert verify_transactions(signed, unsigned, workers=4) == verify_transactions(signed, unsigned)
+
+
+def test_sender_checks_signed_raw(signed, unsigned):
+    """
+    The check before sending decodes what gets broadcast, an index claiming otherwise doesn't make a mismatch pass
+    """
+    unsigned[3]['tx']['value'] = Web3.toHex(1)
+    forged_index = {signed[3]['signedRaw']: decode_signed(signed[3]['signedRaw'])._replace(value=1)}
+
+    with pytest.raises(AirdropException):
+        Sender(Web3(None), signed_index=forged_index).send_transactions(signed, unsigned)
+
+
+def test_check_transactions(signed, unsigned):
+    check_transactions(signed, unsigned, workers=2)
+
+    unsigned[7]['tx']['to'] = '0x' + '36' * 20
+    with pytest.raises(AirdropException):
+        check_transactions(signed, unsigned, workers=2)
@@ -0,0 +1,133 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Append-only journal of unsigned transactions, to be able to resume creating transactions after a crash
+
+Layout: a json header line, describing the inputs of the transaction creation,
+then one json line per finished transaction, in nonce order
+"""
+
+import hashlib
+import json
+import os
+
+
+class TxJournalException(Exception):
+    pass
+
+
+class TxJournal(object):
+    """
+    Opens a journal, creating it if needed. If it exists, its header must match `header`,
+    the transactions found in it tell where to resume from (`next_offset`, `next_nonce`)
+    """
+
+    def __init__(self, path, header):
+        """
+        :param header: json-serializable dict, identifying the inputs, e.g. hash of the processed airdrops
+        """
+        self.path = path
+        self.header = header
+        self.count = 0
+        self.next_offset = 0  # how many airdrops are already in the journaled transactions
+        self.next_nonce = None
+
+        if os.path.exists(path):
+            self._recover()
+        else:
+            with open(path, 'wb') as f:
+                f.write(json.dumps(header, sort_keys=True) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.file = open(path, 'ab')
+
+    def append(self, transaction):
+        """
+        Durably appends a finished transaction
+        """
+        self.file.write(json.dumps(transaction, sort_keys=True) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        self.count += 1
+        self.next_offset += len(transaction['rawBatch'])
+        self.next_nonce = int(transaction['tx']['nonce'], 16) + 1
+
+    def write_output(self, f):
+        """
+        Writes all the journaled transactions as a json list, byte for byte what
+        `json.dumps(transactions, sort_keys=True)` would write, without loading them all
+        """
+        self.file.flush()
+        f.write('[')
+        for index, line in enumerate(self._lines()):
+            if index:
+                f.write(', ')
+            f.write(line[:-1])
+        f.write(']')
+
+    def close(self):
+        self.file.close()
+
+    def _lines(self):
+        with open(self.path, 'rb') as f:
+            f.readline()
+            for line in iter(f.readline, ''):
+                yield line
+
+    def _recover(self):
+        with open(self.path, 'rb+') as f:
+            header_line = f.readline()
+            if not header_line.endswith('\n') or json.loads(header_line) != self.header:
+                raise TxJournalException("journal {} is for different inputs: {}, remove it to start over".format(
+                    self.path, header_line))
+
+            valid_end = f.tell()
+            for line in iter(f.readline, ''):
+                if not line.endswith('\n'):
+                    # torn write of the last transaction during the crash, will be redone
+                    break
+                transaction = json.loads(line)
+                self.count += 1
+                self.next_offset += len(transaction['rawBatch'])
+                self.next_nonce = int(transaction['tx']['nonce'], 16) + 1
+                valid_end = f.tell()
+
+            f.truncate(valid_end)
+
+
+def read_header(path):
+    """
+    :return: header of the journal at `path`, None if there's no journal
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+    if not header_line.endswith('\n'):
+        raise TxJournalException("journal {} has no complete header, remove it to start over".format(path))
+    return json.loads(header_line)
+
+
+def file_sha256(path):
+    """
+    :return: hex SHA256 of a file's contents, read in chunks
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), ''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -12,15 +12,32 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import binascii
 import json
 import logging
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from functools import partial
+from itertools import islice, izip, izip_longest
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 
 import rlp
 from populus.wait import Wait
-from ethereum.transactions import Transaction
+from ethereum.keys import decode_keystore_json
+from ethereum.transactions import Transaction, UnsignedTransaction
+from ethereum.utils import big_endian_to_int, privtoaddr, sha3
+from secp256k1 import PrivateKey
+from web3.formatters import output_transaction_receipt_formatter
 
 from constants import BALANCES_BLOCKHEIGHT, RESERVE_AIRDROP, TOLERANCE, TOTAL_ETH_ABOVE_CUTOFF, OMGTOKEN_CONTRACT_ABI, \
-    OMGTOKEN_CONTRACT_BYTECODE
+    OMGTOKEN_CONTRACT_BYTECODE, GAS_MODEL_CALIBRATION_BATCHES, GAS_MODEL_SHORT_BATCHES, GAS_MODEL_SAMPLE_EVERY, \
+    GAS_MODEL_RISK, PACKING_MARGIN, VERIFY_CHUNK_BATCHES
+from encoding import MultisendEncoder, PackedMultisendEncoder
+from log_scan import TransferScanner
+from signed_index import decode_signed
+from verification import verify_transactions, report_ok
 
 
 class AirdropException(Exception):
@@ -68,7 +85,16 @@ class Creator:
     """
 
     def __init__(self, sender, airdropper, omgtoken, gaslimit, gasprice, gasreserve,
-                 verify_eth=False):
+                 verify_eth=False, workers=1, web3_factory=None, batch_rpc=None, gas_model=None, packed=False):
+        """
+        :param gas_model: GasModel to predict gas with, instead of estimating every batch with the node.
+                          See `_estimates` for which batches still get estimated
+        :param batch_rpc: BatchRPC to fetch eth balances with, when verifying eth; by default one request per airdrop
+        :param workers: how many batches to estimate gas for concurrently
+        :param web3_factory: returns a new Web3 connection; if given, every worker gets a connection of its own.
+                             Otherwise workers share the one of `airdropper`, which for IPC serializes their requests
+        :param packed: if True, transactions call `multisendPacked`, with every airdrop packed in a single word
+        """
         self.sender = _lowercase_address(sender)
         self.web3 = airdropper.web3
         self.airdropper = airdropper
@@ -77,6 +103,15 @@ class Creator:
         self.gasprice = gasprice
         self.gasreserve = gasreserve
         self.verify_eth = verify_eth
+        self.workers = workers
+        self.web3_factory = web3_factory
+        self.batch_rpc = batch_rpc
+        self.packed = packed
+        self.encoder = PackedMultisendEncoder(omgtoken.address) if packed else MultisendEncoder(omgtoken.address)
+        self.gas_model = gas_model
+        # predicted vs measured gas of batches which were estimated with the node, when using gas_model
+        self.gas_report = []
+        self._worker_local = threading.local()
 
     def process_batch(self, batch, nonce):
         """
@@ -85,20 +120,229 @@ class Creator:
         :param nonce:
         :return: dict
         """
-        if self.verify_eth:
-            self._verify_batch(batch)
+        return self._make_tx(batch, nonce, self.estimate_batch(batch))
+
+    def estimate_batch(self, batch):
+        """
+        Verifies (optionally) and estimates gas for a batch of airdrops, doesn't depend on the nonce
+        :param batch: flat data structure with addresses and amounts
+        :return: gas estimate
+        """
+        web3, airdropper = self._worker_connection()
+
+        if self.verify_eth and self.batch_rpc is None:
+            self._verify_batch(batch, web3)
+
+        if self.packed:
+            estimate = web3.eth.estimateGas({'from': self.sender, 'to': airdropper.address, 'data': self._encode(batch)})
+        else:
+            addresses, amounts = zip(*batch)  # that's unzipping actually
+
+            estimate = airdropper.estimateGas({'from': self.sender}).multisend(self.omgtoken.address,
+                                                                               addresses,
+                                                                               amounts)
+
+        self._check_over_limit(estimate)
+
+        return estimate
+
+    def create_txs(self, airdrops, batch_size, pack=False):
+        """
+        cut the whole airdrops data into batches and turn into unsigned transactions
+        :param airdrops: list of address-amount pairs
+        :param batch_size: how many airdrops to fit into a single transaction
+        :param pack: if True, batches are packed as full as the gas model allows, see `pack_batches`.
+                     Requires a calibrated gas model, so that the batches depend only on its calibration
+        :return:
+        """
+        return list(self.iter_txs(airdrops, batch_size, pack=pack))
+
+    def iter_txs(self, airdrops, batch_size, pack=False, nonce=None, offset=0, first_batch=0):
+        """
+        Same as `create_txs`, but yields the transactions one by one, as soon as they're ready.
+        Gas estimations of up to `workers` batches run concurrently, transactions are yielded in nonce order.
+        Batches are cut from `airdrops`, predicted and verified as the estimations go,
+        only a few ahead of the transaction yielded
+        :param nonce: nonce of the first transaction, by default the sender's transaction count
+        :param offset: airdrop to start from, e.g. resuming after the transactions already created
+        :param first_batch: index of the first batch, i.e. how many transactions were already created.
+                            Resuming with both, the batches are the same as if not interrupted
+        """
+        if theoretical_gas(batch_size, packed=self.packed) >= self.gaslimit:
+            raise AirdropException("batch theoretically too expensive for gaslimit")
+
+        if pack and (self.gas_model is None or not self.gas_model.calibrated):
+            raise AirdropException("packing batches requires a calibrated gas model, see `calibrate`")
+
+        pool = ThreadPool(self.workers) if self.workers > 1 else None
+
+        try:
+            if pack:
+                batches = self._iter_packed(airdrops, batch_size, offset)
+            else:
+                batches = _cut(airdrops, batch_size, offset)
+
+            if self.verify_eth and self.batch_rpc is not None:
+                batches = self._verified_in_bulk(batches)
+
+            if nonce is None:
+                nonce = self.web3.eth.getTransactionCount(self.sender)
+            progress_airdrop = offset
+
+            for batch, estimate in self._estimates(batches, pool, batch_size, first_batch):
+                new_tx = self._make_tx(batch, nonce, estimate)
+
+                if len(batch) >= batch_size:
+                    if new_tx['gasEstimate'] < self.gaslimit / 2:
+                        raise AirdropException("gas estimate suspisiously low for full-sized batch "
+                                               "{} / {}".format(new_tx['gasEstimate'], self.gaslimit))
+
+                    logging.info("Creating transactions: airdrop {}/{}".format(progress_airdrop,
+                                                                               len(airdrops)))
+                    progress_airdrop += len(batch)
+
+                yield new_tx
+                nonce += 1
+        finally:
+            if pool:
+                pool.terminate()
+
+    def calibrate(self, airdrops, batch_size):
+        """
+        Calibrates the gas model on the first GAS_MODEL_CALIBRATION_BATCHES batches of the airdrops,
+        estimated with the node, e.g. before packing batches. See `GasModel.calibration` to reuse it in another run
+        """
+        pool = ThreadPool(self.workers) if self.workers > 1 else None
+
+        try:
+            self._calibrate(list(_cut(airdrops[:GAS_MODEL_CALIBRATION_BATCHES * batch_size], batch_size)), pool)
+        finally:
+            if pool:
+                pool.terminate()
+
+    def pack_batches(self, airdrops, batch_size):
+        """
+        Greedily cuts airdrops into batches, each as large as the calibrated gas model
+        predicts to fit under the gas limit less PACKING_MARGIN
+        :param batch_size: size to start from, every batch starts from the size of the previous one
+        :return: list of batches
+        """
+        return list(self._iter_packed(airdrops, batch_size))
+
+    def _iter_packed(self, airdrops, batch_size, start=0):
+        """
+        Same as `pack_batches`, but yields the batches one by one, starting from airdrop `start`.
+        Every batch is the largest predicted to fit, so starting from the start of any batch gives the same batches
+        """
+        target = self.gaslimit - PACKING_MARGIN
+        size = batch_size
+
+        while start < len(airdrops):
+            size = min(size, len(airdrops) - start)
+            while size > 1 and self._predict(airdrops[start:start + size]) > target:
+                size -= 1
+            while start + size < len(airdrops) and self._predict(airdrops[start:start + size + 1]) <= target:
+                size += 1
+
+            yield airdrops[start:start + size]
+            start += size
+
+    def _estimates(self, batches, pool, batch_size, first_batch=0):
+        """
+        Yields batches in order, each with its gas estimate.
+        Without a gas model all batches are estimated with the node. With a gas model only these are:
+         - the first GAS_MODEL_CALIBRATION_BATCHES, which calibrate the model, unless it's calibrated already
+         - every GAS_MODEL_SAMPLE_EVERY-th batch, to keep checking the model
+         - risky batches, whose prediction is close to the gas limit
+         - batches larger than `batch_size`, i.e. packed beyond the worst case of `theoretical_gas`
+        the rest get the model's prediction as the estimate.
+        A batch estimated with the node after calibration, which the model underpredicted, raises AirdropException,
+        as the predictions of the batches not estimated can't be trusted then
+        :param first_batch: index of the first of `batches`, counting which batches are sampled
+        """
+        if self.gas_model is None:
+            for batch_estimate in self._estimate_all(self._estimate_pair, batches, pool):
+                yield batch_estimate
+            return
+
+        batches = iter(batches)
+
+        if not self.gas_model.calibrated:
+            calibration_batches = list(islice(batches, GAS_MODEL_CALIBRATION_BATCHES))
+            if not calibration_batches:
+                return
+            calibration_estimates = self._calibrate(calibration_batches, pool)
+
+            for index, (batch, estimate) in enumerate(izip(calibration_batches, calibration_estimates), first_batch):
+                self.gas_report.append(dict(batch=index, predicted=self._predict(batch), measured=estimate))
+                yield batch, estimate
+            first_batch += len(calibration_batches)
+
+        predicted = partial(self._predicted, batch_size)
+        for index, batch, prediction, estimate in self._estimate_all(predicted, enumerate(batches, first_batch), pool):
+            if estimate is None:
+                if self.verify_eth and self.batch_rpc is None:
+                    self._verify_batch(batch, self.web3)
+                self._check_over_limit(prediction)
+                yield batch, prediction
+                continue
+
+            self.gas_report.append(dict(batch=index, predicted=prediction, measured=estimate))
+            if estimate > prediction:
+                raise AirdropException("gas model underpredicted batch {}: {} predicted, {} estimated".format(
+                    index, prediction, estimate))
+            yield batch, estimate
+
+    def _predicted(self, batch_size, indexed_batch):
+        """
+        :return: the batch with its index, prediction and, if it's to be estimated with the node, estimate (or None)
+        """
+        index, batch = indexed_batch
+        prediction = self._predict(batch)
+
+        if index % GAS_MODEL_SAMPLE_EVERY == 0 or len(batch) > batch_size or \
+                prediction >= GAS_MODEL_RISK * self.gaslimit:
+            return index, batch, prediction, self.estimate_batch(batch)
+        return index, batch, prediction, None
+
+    def _calibrate(self, calibration_batches, pool):
+        """
+        Estimates the batches with the node and calibrates the gas model on them, and on short batches
+        cut from the first one (GAS_MODEL_SHORT_BATCHES), for the samples to differ in size
+        :return: the estimates of `calibration_batches`
+        """
+        short_batches = [calibration_batches[0][:size] for size in GAS_MODEL_SHORT_BATCHES
+                         if calibration_batches and size < len(calibration_batches[0])]
+        samples = calibration_batches + short_batches
+
+        estimates = list(self._estimate_all(self.estimate_batch, samples, pool))
+        self.gas_model.calibrate([(batch, self._encode(batch), estimate)
+                                  for batch, estimate in izip(samples, estimates)])
+        return estimates[:len(calibration_batches)]
+
+    def _estimate_all(self, estimate, batches, pool):
+        """
+        Yields `estimate` of every batch in order, with up to twice as many batches as workers in flight
+        """
+        return _ordered_imap(pool, estimate, batches, 2 * self.workers)
 
-        addresses, amounts = zip(*batch)  # that's unzipping actually
+    def _estimate_pair(self, batch):
+        return batch, self.estimate_batch(batch)
 
-        estimate = self.airdropper.estimateGas({'from': self.sender}).multisend(self.omgtoken.address,
-                                                                                addresses,
-                                                                                amounts)
+    def _predict(self, batch):
+        return self.gas_model.predict(batch, self._encode(batch))
 
+    def _check_over_limit(self, estimate):
         if estimate >= self.gaslimit:
             raise AirdropException("gas estimate over limit for batch: "
                                    "{} over {}".format(estimate, self.gaslimit))
 
-        data = self.airdropper.encodeABI('multisend', args=(self.omgtoken.address, addresses, amounts))
+    def _encode(self, batch):
+        addresses, amounts = zip(*batch)
+        return self.encoder.encode(addresses, amounts)
+
+    def _make_tx(self, batch, nonce, estimate):
+        data = self._encode(batch)
 
         tx = dict(
             nonce=self.web3.toHex(nonce),
@@ -114,62 +358,100 @@ class Creator:
                     tx=tx,
                     gasEstimate=estimate)
 
-    def create_txs(self, airdrops, batch_size):
+    def _worker_connection(self):
         """
-        cut the whole airdrops data into batches and turn into unsigned transactions
-        :param airdrops: list of address-amount pairs
-        :param batch_size: how many airdrops to fit into a single transaction
-        :return:
+        :return: web3 and airdropper to be used by the current worker thread
         """
-        if theoretical_gas(batch_size) >= self.gaslimit:
-            raise AirdropException("batch theoretically too expensive for gaslimit")
+        if self.web3_factory is None or self.workers == 1:
+            return self.web3, self.airdropper
 
-        transactions = []
-        batch = []
+        if not hasattr(self._worker_local, 'airdropper'):
+            web3 = self.web3_factory()
+            Airdropper = web3.eth.contract(abi=self.airdropper.abi)
+            self._worker_local.airdropper = Airdropper(address=self.airdropper.address)
 
-        nonce = self.web3.eth.getTransactionCount(self.sender)
-        progress_airdrop = 0
+        return self._worker_local.airdropper.web3, self._worker_local.airdropper
 
-        for airdrop in airdrops:
-            batch.append(airdrop)
-            if len(batch) == batch_size:
-                new_tx = self.process_batch(batch, nonce)
+    def _verify_batch(self, batch, web3):
+        for airdrop in batch:
+            eth_balance = web3.eth.getBalance(airdrop[0], BALANCES_BLOCKHEIGHT)
+            _verify_airdrop(airdrop, eth_balance, batch)
 
-                if new_tx['gasEstimate'] < self.gaslimit / 2:
-                    raise AirdropException("gas estimate suspisiously low for full-sized batch "
-                                           "{} / {}".format(new_tx['gasEstimate'], self.gaslimit))
+    def _verified_in_bulk(self, batches):
+        """
+        Yields the batches, verifying them VERIFY_CHUNK_BATCHES at a time, see `_verify_batches_in_bulk`
+        """
+        batches = iter(batches)
+        for chunk in iter(lambda: list(islice(batches, VERIFY_CHUNK_BATCHES)), []):
+            self._verify_batches_in_bulk(chunk)
+            for batch in chunk:
+                yield batch
 
-                transactions.append(new_tx)
+    def _verify_batches_in_bulk(self, batches):
+        """
+        Verifies the batches, fetching the eth balances in JSON-RPC batches
+        """
+        block = self.web3.toHex(BALANCES_BLOCKHEIGHT)
+        eth_balances = iter(self.batch_rpc.request('eth_getBalance',
+                                                   ([airdrop[0], block] for batch in batches for airdrop in batch)))
 
-                logging.info("Creating transactions: airdrop {}/{}".format(progress_airdrop,
-                                                                           len(airdrops)))
-                progress_airdrop += len(batch)
+        for batch in batches:
+            for airdrop in batch:
+                _verify_airdrop(airdrop, self.web3.toDecimal(next(eth_balances)), batch)
 
-                batch = []
-                nonce += 1
+        logging.info("Verified eth balances of {} airdrops".format(sum(len(batch) for batch in batches)))
 
-        # do not forget the last batch
-        if len(batch) > 0:
-            transactions.append(self.process_batch(batch, nonce))
 
-        return transactions
+def _cut(airdrops, batch_size, offset=0):
+    """
+    Yields consecutive batches of `batch_size` airdrops from `offset` on, slicing `airdrops` only when asked for
+    """
+    for start in xrange(offset, len(airdrops), batch_size):
+        yield airdrops[start:start + batch_size]
 
-    def _verify_batch(self, batch):
-        for airdrop in batch:
-            eth_balance = self.web3.eth.getBalance(airdrop[0], BALANCES_BLOCKHEIGHT)
-            expected_ratio = 1.0 * eth_balance / TOTAL_ETH_ABOVE_CUTOFF
-            airdrop_ratio = 1.0 * airdrop[1] / RESERVE_AIRDROP
-            if abs(expected_ratio - airdrop_ratio) > TOLERANCE:
-                raise AirdropException("Could not verify airdrop {} in batch {} \n"
-                                       "{} vs {}".format(airdrop, batch, expected_ratio, airdrop_ratio))
+
+def _ordered_imap(pool, func, iterable, ahead):
+    """
+    Like `pool.imap`, but takes at most `ahead` items from `iterable` before their results are consumed,
+    where `pool.imap` would take all of them at once
+    :param pool: ThreadPool, or None to map in the current thread
+    """
+    if pool is None:
+        for item in iterable:
+            yield func(item)
+        return
+
+    in_flight = deque()
+    for item in iterable:
+        in_flight.append(pool.apply_async(func, (item,)))
+        if len(in_flight) >= ahead:
+            yield in_flight.popleft().get()
+    while in_flight:
+        yield in_flight.popleft().get()
+
+
+def _verify_airdrop(airdrop, eth_balance, batch):
+    expected_ratio = 1.0 * eth_balance / TOTAL_ETH_ABOVE_CUTOFF
+    airdrop_ratio = 1.0 * airdrop[1] / RESERVE_AIRDROP
+    if abs(expected_ratio - airdrop_ratio) > TOLERANCE:
+        raise AirdropException("Could not verify airdrop {} in batch {} \n"
+                               "{} vs {}".format(airdrop, batch, expected_ratio, airdrop_ratio))
 
 
 class Signer:
 
-    def __init__(self, web3):
+    def __init__(self, web3, batch_rpc=None):
+        """
+        :param batch_rpc: BatchRPC to sign with in JSON-RPC batches, with several batches in flight.
+                          By default one blocking request per transaction
+        """
         self.web3 = web3
+        self.batch_rpc = batch_rpc
 
     def sign_transactions(self, transactions):
+        if self.batch_rpc is not None:
+            return self._sign_in_bulk(transactions)
+
         progress_tx = 0
         for tx in transactions:
             logging.info("Signing transactions: {}/{}".format(progress_tx,
@@ -182,19 +464,159 @@ class Signer:
 
         return transactions
 
+    def _sign_in_bulk(self, transactions):
+        signed = self.batch_rpc.request('eth_signTransaction', ([tx['tx']] for tx in transactions))
+
+        for tx, signed_tx in izip(transactions, signed):
+            tx['signedRaw'] = signed_tx['raw']
+
+        logging.info("Signed transactions: {}".format(len(transactions)))
+
+        return transactions
+
+
+class LocalSigner:
+    """
+    Signs transactions in-process with a private key, e.g. decrypted from a keystore file,
+    instead of having the node sign them. Signing is spread over a pool of processes
+    """
+
+    def __init__(self, private_key, workers=1, chain_id=None):
+        """
+        :param private_key: 32 bytes, binary
+        :param chain_id: if given, signs replay-protected (EIP-155) transactions for the chain
+        """
+        self.private_key = private_key
+        self.address = '0x' + binascii.hexlify(privtoaddr(private_key))
+        self.workers = workers
+        self.chain_id = chain_id
+
+    @classmethod
+    def from_keystore(cls, keystore_json, password, **kwargs):
+        return cls(decode_keystore_json(keystore_json, password), **kwargs)
+
+    def sign_transactions(self, transactions):
+        for tx in transactions:
+            if _lowercase_address(tx['tx']['from']) != self.address:
+                raise AirdropException("transaction {} not from the signer {}".format(tx['tx']['nonce'], self.address))
+
+        sign = partial(_sign_locally, self.private_key, self.chain_id)
+        unsigned = [tx['tx'] for tx in transactions]
+
+        if self.workers > 1:
+            pool = Pool(self.workers)
+            try:
+                signed = pool.map(sign, unsigned, chunksize=max(1, len(unsigned) // (4 * self.workers)))
+            finally:
+                pool.terminate()
+        else:
+            signed = map(sign, unsigned)
+
+        for tx, signed_raw in izip(transactions, signed):
+            tx['signedRaw'] = signed_raw
+
+        logging.info("Signed transactions: {}".format(len(transactions)))
+
+        return transactions
+
+
+_signing_keys = {}
+
+
+def _signing_key(private_key):
+    """
+    PrivateKey, cached per process, since creating its secp256k1 context costs more than signing
+    """
+    if private_key not in _signing_keys:
+        _signing_keys[private_key] = PrivateKey(private_key, raw=True)
+    return _signing_keys[private_key]
+
+
+def _sign_locally(private_key, chain_id, tx):
+    """
+    :param tx: transaction as sent to eth_signTransaction
+    :return: 0x-prefixed hex of the signed, RLP-encoded transaction, same as eth_signTransaction's raw
+    """
+    transaction = Transaction(int(tx['nonce'], 16), int(tx['gasPrice'], 16), int(tx['gas'], 16), tx['to'],
+                              int(tx['value'], 16), binascii.unhexlify(tx['data'][2:]))
+
+    if chain_id is None:
+        rawhash = sha3(rlp.encode(transaction, UnsignedTransaction))
+        v_offset = 27
+    else:
+        # EIP-155 signs the chain id along, in place of v, with r and s empty
+        transaction.v = chain_id
+        rawhash = sha3(rlp.encode(transaction))
+        v_offset = 35 + 2 * chain_id
+
+    key = _signing_key(private_key)
+    signature, recovery_id = key.ecdsa_recoverable_serialize(key.ecdsa_sign_recoverable(rawhash, raw=True))
+
+    transaction.v = recovery_id + v_offset
+    transaction.r = big_endian_to_int(signature[:32])
+    transaction.s = big_endian_to_int(signature[32:])
+
+    return '0x' + binascii.hexlify(rlp.encode(transaction))
+
 
 class Sender:
 
-    def __init__(self, web3):
+    def __init__(self, web3, window=1, tracker=None, batch_rpc=None, signed_index=None, workers=1, stop=None):
+        """
+        :param window: how many transactions (consecutive nonces) to have sent and waiting for receipts at once.
+                       1 waits for the receipt of every transaction before sending the next one
+        :param tracker: ReceiptTracker to get receipts from, by default every transaction is waited for with `Wait`
+        :param batch_rpc: BatchRPC to fetch receipts with when recovering, by default one request per transaction
+        :param signed_index: dict of signedRaw to DecodedTransaction, see `signed_index.load_index`, to find
+                             the sent transactions with when recovering. Signed transactions not in there are decoded
+                             on every use. Never used for the checks before sending, which decode signedRaw itself
+        :param workers: how many processes to verify transactions against their unsigned counterparts in
+        :param stop: threading.Event, once it's set no more transactions are sent, e.g. when another lane failed
+        """
         self.web3 = web3
-
-    def send_transactions(self, transactions, unsigned):
+        self.window = window
+        self.tracker = tracker
+        self.batch_rpc = batch_rpc
+        self.signed_index = signed_index or {}
+        self.workers = workers
+        self.stop = stop
+
+    def send_transactions(self, transactions, unsigned, verified=False):
         """
         Sends signed transactions verifying with unsigned counterparts
+        :param verified: the transactions were already verified with `check_transactions`, e.g. by send_txs.py
+                         before starting the lanes, as forking the verifying processes from a lane's thread could
+                         deadlock them
         """
-        map(self._check_transaction, transactions, unsigned)
+        if not verified:
+            check_transactions(transactions, unsigned, workers=self.workers)
 
-        map(self._send_transaction, transactions)
+        if self.window == 1:
+            map(self._send_transaction, transactions)
+        else:
+            self._send_windowed(transactions)
+
+    def _send_windowed(self, transactions):
+        """
+        Keeps up to `window` transactions in flight. Receipts are checked in nonce order, which is the order of mining,
+        and every receipt that's available is checked before the next transaction is sent.
+        So sending stops as soon as a failure is seen, with at most `window - 1` later transactions in flight
+        """
+        in_flight = deque()
+
+        try:
+            for transaction in transactions:
+                while in_flight and (len(in_flight) == self.window or self._receipt_ready(in_flight[0][1])):
+                    self._wait_and_check(*in_flight.popleft())
+
+                in_flight.append((transaction, self._send_raw(transaction)))
+
+            while in_flight:
+                self._wait_and_check(*in_flight.popleft())
+        except Exception:
+            logging.error("stopped sending, transactions left in flight, nonces: {}".format(
+                [transaction['tx']['nonce'] for transaction, _ in in_flight]))
+            raise
 
     def recover_unsent(self, transactions, unsigned):
         """
@@ -207,74 +629,84 @@ class Sender:
         unsent = []
         unsent_unsigned = []
 
-        for item in zip(transactions, unsigned):
-            if not self._transaction_sent(item[0]):
+        for item, receipt in zip(zip(transactions, unsigned), self._sent_receipts(transactions)):
+            if receipt is None:
                 unsent.append(item[0])
                 unsent_unsigned.append(item[1])
 
         return unsent, unsent_unsigned
 
-    def recover_unsent_airdrops(self, airdrops, transactions, airdropper, omg_token):
+    def recover_unsent_airdrops(self, airdrops, transactions, airdropper, omg_token, log_cache=None):
         """
         Reads the blockchain for _airdrops_ already sent and mined
         Returns the original airdrops with the already sent ones filtered out
+        Airdrops sent are read from the airdropper's Transfer logs, in the blocks of the sent transactions,
+        only the ones logged by the sent transactions count
         :param airdrops: original airdrops
         :param transactions: sent and signed transactions
         :param airdropper:
         :param omg_token:
+        :param log_cache: path to a file to cache the scanned Transfer logs in, see TransferScanner
         :return: list of unsent airdrops according to the filtering
         """
+        sent_receipts = [receipt for receipt in self._sent_receipts(transactions) if receipt is not None]
+        sent_hashes = set(receipt['transactionHash'].lower() for receipt in sent_receipts)
         sent_airdrops = []
 
-        for transaction in transactions:
-            if self._transaction_sent(transaction):
+        if sent_receipts:
+            blocks = [receipt['blockNumber'] for receipt in sent_receipts]
+            scanner = TransferScanner(self.web3, omg_token.address, airdropper.address,
+                                      batch_rpc=self.batch_rpc, cache_path=log_cache)
+            sent_airdrops = [[transfer['to'], transfer['value']] for transfer in scanner.scan(min(blocks), max(blocks))
+                             if transfer['transactionHash'] in sent_hashes]
 
-                logging.info("filtering transaction with nonce: {}".format(transaction['tx']['nonce']))
+        logging.info("filtering {} airdrops sent in {} transactions".format(len(sent_airdrops), len(sent_hashes)))
 
-                block = self._get_receipt(transaction)['blockNumber']
-                transfer_filter = omg_token.pastEvents('Transfer', filter_params=dict(fromBlock=block,
-                                                                                      toBlock=block))
-                logs = transfer_filter.get(only_changes=False)
+        return remove_sent_airdrops(airdrops, sent_airdrops)
 
-                for log in logs:
-                    if log['args']['from'] == airdropper.address:
-                        sent_airdrops.append([log['args']['to'], log['args']['value'], ])
+    def _sent_receipts(self, transactions):
+        """
+        Transactions with nonces below the signer's transaction count are mined, but need their receipts checked
+        (could have been OOG, or another transaction with the same nonce), the rest is unsent for sure
+        :return: for every transaction its receipt if it's mined and didn't OOG, otherwise None
+        """
+        if not transactions:
+            return []
 
-        unsent_airdrops = filter(lambda airdrop: airdrop not in sent_airdrops,
-                                 airdrops)
-        return unsent_airdrops
+        decoded = map(self._decoded, transactions)
+        nonces = [transaction.nonce for transaction in decoded]
+        if nonces != sorted(nonces):
+            raise AirdropException("transactions not in nonce order")
 
-    def _transaction_sent(self, transaction):
-        receipt = self._get_receipt(transaction)
-        return receipt is not None and not self._did_oog(receipt, transaction)
+        next_nonce = self.web3.eth.getTransactionCount(self.web3.toHex(decoded[0].sender))
+        mined_count = bisect_left(nonces, next_nonce)
+        receipts = self._receipts([self.web3.toHex(transaction.hash) for transaction in decoded[:mined_count]])
 
-    def _get_receipt(self, transaction):
-        decoded = rlp.decode(self.web3.toAscii(transaction['signedRaw']), Transaction)
-        receipt = self.web3.eth.getTransactionReceipt(self.web3.toHex(decoded.hash))
-        return receipt
+        return [receipt if receipt is not None and not self._did_oog(receipt, transaction) else None
+                for transaction, receipt in izip_longest(transactions, receipts)]
 
-    def _check_transaction(self, transaction, unsigned):
+    def _receipts(self, tx_hashes):
         """
-        Checks a single (external) transaction against its expected unsigned (local) counterpart
+        :return: receipts of transactions, in JSON-RPC batches if there's `batch_rpc`
         """
-        decoded = rlp.decode(self.web3.toAscii(transaction['signedRaw']), Transaction)
-
-        decoded_tx = dict(
-            nonce=self.web3.toHex(decoded.nonce),
-            gasPrice=self.web3.toHex(decoded.gasprice),
-            gas=self.web3.toHex(decoded.startgas),
-            to=self.web3.toHex(decoded.to),
-            value=self.web3.toHex(decoded.value),
-            data=self.web3.toHex(decoded.data)
-        )
+        if self.batch_rpc is None:
+            return map(self.web3.eth.getTransactionReceipt, tx_hashes)
 
-        unsigned['tx'].pop('from')
+        return map(output_transaction_receipt_formatter,
+                   self.batch_rpc.request('eth_getTransactionReceipt', ([tx_hash] for tx_hash in tx_hashes)))
 
-        if unsigned['tx'] != decoded_tx:
-            logging.error("mismatch! signed tx: {}, local tx: {}".format(decoded_tx, unsigned['tx']))
-            raise AirdropException("transaction mismatch for {}".format(unsigned['tx']['nonce']))
+    def _decoded(self, transaction):
+        decoded = self.signed_index.get(transaction['signedRaw'])
+        if decoded is None:
+            decoded = decode_signed(transaction['signedRaw'])
+        return decoded
 
     def _send_transaction(self, transaction):
+        self._wait_and_check(transaction, self._send_raw(transaction))
+
+    def _send_raw(self, transaction):
+        if self.stop is not None and self.stop.is_set():
+            raise AirdropException("sending stopped before {}".format(transaction['tx']['nonce']))
 
         logging.info("About to send {}".format(transaction))
 
@@ -282,11 +714,27 @@ class Sender:
 
         logging.info("sent {} {}".format(tx_hash, transaction['tx']['nonce']))
 
-        Wait(self.web3).for_receipt(tx_hash, timeout=86400)
+        if self.tracker is not None:
+            self.tracker.track(tx_hash)
+
+        return tx_hash
+
+    def _receipt_ready(self, tx_hash):
+        if self.tracker is not None:
+            return self.tracker.receipt(tx_hash) is not None
+        return self.web3.eth.getTransactionReceipt(tx_hash) is not None
+
+    def _wait_and_check(self, transaction, tx_hash):
+
+        if self.tracker is not None:
+            receipt = self.tracker.wait_for_receipt(tx_hash)
+        else:
+            Wait(self.web3).for_receipt(tx_hash, timeout=86400)
 
         logging.info("waited for receipt {}".format(transaction['tx']['nonce']))
 
-        receipt = self.web3.eth.getTransactionReceipt(tx_hash)
+        if self.tracker is None:
+            receipt = self.web3.eth.getTransactionReceipt(tx_hash)
 
         logging.info("got receipt {} {}".format(receipt, transaction['tx']['nonce']))
 
@@ -309,10 +757,23 @@ class Sender:
         return receipt['gasUsed'] == self.web3.toDecimal(transaction['tx']['gas'])
 
 
-def theoretical_gas(batch_size):
+def check_transactions(transactions, unsigned, workers=1):
+    """
+    Verifies signed transactions with unsigned counterparts, see `verification.verify_transactions`
+    :param workers: how many processes to verify in, forked, so to be called from the main thread only
+    :raises: AirdropException if they don't match
+    """
+    report = verify_transactions(transactions, unsigned, workers=workers)
+    if not report_ok(report):
+        raise AirdropException("transaction mismatch, {} signed and {} local transactions, mismatches at: {}".format(
+            report['signed_count'], report['unsigned_count'], [mismatch['nonce'] for mismatch in report['mismatches']]))
+
+
+def theoretical_gas(batch_size, packed=False):
     """
     Helper function that returns the theoretical gas usage, used in gas usage double-checks when creating txs
     :param batch_size:
+    :param packed: if True, for `multisendPacked`, where every airdrop takes a single word of calldata
     :return: gas that can potentially be used by such airdrop transaction
     """
     ret = 0
@@ -325,13 +786,42 @@ def theoretical_gas(batch_size):
     ret += 200  # check owner sload
     ret += 21000  # per transaction cost
     ret += 20 * 68 + 12 * 4  # token addr input
-    ret += batch_size * (20 * 68 + 12 * 4)  # accounts input
-    ret += batch_size * (32 * 68)  # amounts input
+    if packed:
+        ret += batch_size * (32 * 68)  # amount and account input
+        ret += batch_size * 50  # unpacking the word
+    else:
+        ret += batch_size * (20 * 68 + 12 * 4)  # accounts input
+        ret += batch_size * (32 * 68)  # amounts input
     ret += batch_size * 100  # while loop, more or less
 
     return ret
 
 
+def remove_sent_airdrops(airdrops, sent_airdrops):
+    """
+    Filters out the sent airdrops, in linear time. Airdrops are compared by lowercased address and amount,
+    every sent airdrop filters out a single occurrence (e.g. DEAD appears twice in airdrops)
+    :param airdrops: list of address-amount pairs
+    :param sent_airdrops: iterable of address-amount pairs
+    :return: list of unsent airdrops, in the original order
+    """
+    sent = Counter(_airdrop_key(airdrop) for airdrop in sent_airdrops)
+
+    unsent_airdrops = []
+    for airdrop in airdrops:
+        key = _airdrop_key(airdrop)
+        if sent[key]:
+            sent[key] -= 1
+        else:
+            unsent_airdrops.append(airdrop)
+
+    return unsent_airdrops
+
+
+def _airdrop_key(airdrop):
+    return airdrop[0].lower(), int(airdrop[1])
+
+
 def remove_estimate(unsigned):
 
     unsigned_out = []
@@ -0,0 +1,101 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Pre-flight verification of signed (external) transactions against their unsigned (local) counterparts
+"""
+
+import binascii
+import logging
+from itertools import izip
+from multiprocessing import Pool
+
+from ethereum.utils import sha3
+
+from signed_index import decode_signed
+
+
+def verify_transactions(transactions, unsigned, workers=1):
+    """
+    Compares every signed transaction with the unsigned one at the same position: nonce, gas price, gas, to, value,
+    calldata (by its keccak) and the signer. Neither of the inputs is modified.
+    The signed fields are always decoded from signedRaw, which is what gets broadcast, never taken from an index
+    :param workers: how many processes to decode in
+    :return: report, a dict with the counts checked and a list of mismatches, each with the position, the local nonce
+             and the differing fields, signed and local values of each
+    """
+    pairs = [(transaction['signedRaw'], local['tx']) for transaction, local in izip(transactions, unsigned)]
+
+    if workers > 1:
+        pool = Pool(workers)
+        try:
+            diffs = pool.map(_diff, pairs, chunksize=max(1, len(pairs) // (4 * workers)))
+        finally:
+            pool.terminate()
+    else:
+        diffs = map(_diff, pairs)
+
+    mismatches = [dict(index=index, nonce=local_tx['nonce'], fields=diff)
+                  for index, ((_, local_tx), diff) in enumerate(izip(pairs, diffs)) if diff]
+
+    report = dict(signed_count=len(transactions), unsigned_count=len(unsigned), mismatches=mismatches)
+
+    for mismatch in mismatches:
+        logging.error("mismatch! transaction {}, nonce {}: {}".format(mismatch['index'], mismatch['nonce'], mismatch['fields']))
+
+    return report
+
+
+def report_ok(report):
+    return report['signed_count'] == report['unsigned_count'] and not report['mismatches']
+
+
+def _diff(pair):
+    """
+    :return: dict of the differing fields to dicts of their signed and local values, empty if the transactions match
+    """
+    signed_raw, local_tx = pair
+    signed = _signed_fields(decode_signed(signed_raw))
+    local = _local_fields(local_tx)
+
+    return {name: dict(signed=signed[name], local=local[name])
+            for name in sorted(signed) if signed[name] != local[name]}
+
+
+def _signed_fields(decoded):
+    return {
+        'nonce': _hex_int(decoded.nonce),
+        'gasPrice': _hex_int(decoded.gasprice),
+        'gas': _hex_int(decoded.startgas),
+        'to': '0x' + binascii.hexlify(decoded.to),
+        'value': _hex_int(decoded.value),
+        'data': '0x' + binascii.hexlify(decoded.data_hash),
+        'from': '0x' + binascii.hexlify(decoded.sender),
+    }
+
+
+def _local_fields(tx):
+    return {
+        'nonce': tx['nonce'],
+        'gasPrice': tx['gasPrice'],
+        'gas': tx['gas'],
+        'to': tx['to'].lower(),
+        'value': tx['value'],
+        'data': '0x' + binascii.hexlify(sha3(binascii.unhexlify(tx['data'][2:]))),
+        'from': tx['from'].lower(),
+    }
+
+
+def _hex_int(value):
+    return '0x{:x}'.format(value)
@@ -0,0 +1,45 @@
+#   Copyright 2017 OmiseGO Pte Ltd
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import json
+import sys
+
+import click
+
+from verification import verify_transactions, report_ok
+
+logging.basicConfig(level=logging.INFO)
+
+
+@click.command()
+@click.option('--workers', default=1, help='How many processes to verify in')
+@click.argument('final-check-unsigned-file', type=click.File('rb'))
+@click.argument('signed-file', type=click.File('rb'))
+@click.argument('report-file', type=click.File('wb'))
+def verify_txs(workers, final_check_unsigned_file, signed_file, report_file):
+    signed = json.loads(signed_file.read())
+    final_check_local_transactions = json.loads(final_check_unsigned_file.read())
+
+    report = verify_transactions(signed, final_check_local_transactions, workers=workers)
+
+    logging.info("Verified transactions: {}, mismatches: {}".format(len(signed), len(report['mismatches'])))
+    report_file.write(json.dumps(report, sort_keys=True, indent=2))
+
+    if not report_ok(report):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    verify_txs()